@@ -1,12 +1,41 @@
+import time
+# Start-up timing (see finish_startup); torch, ultralytics and requests are imported on first use
+STARTED = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
 import cv2
-import time
 import os
+import json
 import numpy as np
-import requests
-from ultralytics import YOLO
+import signal
+import queue
+import threading
+from capture import FrameReader, SourceManager
+from crowd_density import TiledCrowdCounter, OccupancyGrid, ZoneMap
+from dustbin_health import DustbinMonitor, PROBLEM_LABELS
+from scheduler import ModuleScheduler, ModuleSpec
+from fire_gate import FireSmokeGate
+from tracking import IoUTracker
+from fall_cascade import PostureCheck
+from detections import Detections, ClassTable, crop_batch
+from renderer import Renderer, Scene, LOD_LEVELS
+from preprocess import FrameTensorCache
+from models import MODEL_FILES, MODULE_MODELS, CASCADE_FILES
+from threads import ThreadBudget
+from recording import DetectionRecorder
+from checkpoint import CheckpointStore
+from memory import ModelMemory
+from profiler import SamplingProfiler
+from cascade import Cascade, load_specs
+from occupancy import load_config as load_occupancy_config
+from inference_server import InferenceClient, RemoteModel
+
+IMPORTS_DONE = time.perf_counter()
+# Models the app cannot run without; the others only disable their module when missing
+REQUIRED_MODELS = ("weapon_model", "track_model", "person_model", "crowd_model")
+# People the weapon and fall passes crop, the fall tracker follows and trespassing alerts on
+PERSON_CONF = 0.25
 
 class AlertWindow(tk.Toplevel):
     def __init__(self, parent, message):
@@ -50,84 +79,386 @@ class SecuritySystemApp:
         self.weapon_alert_time = 0
         self.trespassing_alert_time = 0
         self.alert_cooldown = 5
-        self.cap = None
+        # Frames analysed per second of video in file mode (None = every frame)
+        self.file_analysis_fps = None
+        # Cameras are opened once and shared; `camera` is the app's subscription to camera 0
+        self.sources = SourceManager(linger=120.0)
+        self.camera = None
         self.video_capture = None
         self.current_frame = None
-        self.weapon_detection_mode = None
-        self.trespassing_detection_mode = None
-        self.fall_detection_mode = None
-        self.crowd_detection_mode = None
-        self.fire_detection_mode = None
-        self.dustbin_detection_mode = None
         self.fall_alert_time = 0
         self.fire_alert_time = 0
+        # Source key and timestamp (video time in file mode) of the frame being processed
+        self.frame_source = None
+        self.frame_time = 0.0
+        self.frame_index = 0
+        # Position of the frame within its own source (video frame number in file mode)
+        self.source_frame_index = 0
+        # Raw detection log while record mode is on (see recording.py)
+        self.recorder = None
+        # File-mode checkpoints every 30 s of video so long runs can resume
+        self.checkpoints = CheckpointStore(interval=30.0)
+        # Undownscaled copy of the current frame (used by the weapon crop stage)
+        self.full_frame = None
+        # Person pass shared by trespassing and fall detection: (frame_index, Detections)
+        self.person_cache = None
+        # Preprocessed input tensor of the current frame, shared by every full-frame model call
+        self.frame_tensors = FrameTensorCache()
+        self.class_tables = {}
+        self.fall_tracker = IoUTracker(match_iou=0.3, max_missed=15)
+        self.fall_posture = PostureCheck()
+        self.dustbin_monitor = DustbinMonitor(interval=30.0)
+        self.fire_gate = FireSmokeGate(safety_interval=5.0)
+        # Cascade mode: nano model first, larger model on ambiguous or high-stakes images (cascade.py)
+        self.cascade_specs = load_specs()
+        self.cascades = {}
+        self.large_models = {}
+        # Annotation drawing for every feed; process methods return a Scene
+        self.renderer = Renderer(lod='auto')
+        # Sampling profiler, toggled with Ctrl+Alt+P or SIGUSR2; writes profiles/<time>.collapsed
+        self.profiler = SamplingProfiler(interval=0.005)
+        self.profile_reported = None
         
         # Variables
         self.running = True
         self.active_module = None
+        # Per-module state: source mode, selected video, model attribute, frame processor
+        # and the last inference results (redrawn on frames the scheduler skips)
+        # "state" lists the attributes saved in file-mode checkpoints, "alert_time" the cooldown clock
         self.modules = {
-            "weapon_detection": {"active": False, "tab": None},
-            "trespassing_detection": {"active": False, "tab": None},
-            "fall_detection": {"active": False, "tab": None},
-            "crowd_detection": {"active": False, "tab": None},
-            "fire_detection": {"active": False, "tab": None},
-            "dustbin_detection": {"active": False, "tab": None}
+            "weapon_detection": {"active": False, "tab": None, "title": "Weapon detection",
+                                 "model": "weapon_model", "process": self.process_weapon_detection,
+                                 "full_resolution": True, "alert_time": "weapon_alert_time"},
+            "trespassing_detection": {"active": False, "tab": None, "title": "Trespassing detection",
+                                      "model": "track_model", "process": self.process_trespassing_detection,
+                                      "alert_time": "trespassing_alert_time"},
+            "fall_detection": {"active": False, "tab": None, "title": "Fall detection",
+                               "model": "fall_model", "process": self.process_fall_detection,
+                               "on_start": self.reset_fall_state, "alert_time": "fall_alert_time",
+                               "state": ("fall_tracker", "fall_posture")},
+            "crowd_detection": {"active": False, "tab": None, "title": "Crowd density detection",
+                                "model": "crowd_model", "process": self.process_crowd_detection,
+                                "on_start": self.reset_crowd_state,
+                                "state": ("crowd_occupancy", "crowd_counter.grid")},
+            "fire_detection": {"active": False, "tab": None, "title": "Fire detection",
+                               "model": "fire_model", "process": self.process_fire_detection,
+                               "on_start": self.reset_fire_state, "alert_time": "fire_alert_time",
+                               "state": ("fire_gate",)},
+            "dustbin_detection": {"active": False, "tab": None, "title": "Dustbin detection",
+                                  "model": "dustbin_model", "process": self.process_dustbin_detection,
+                                  "on_start": self.reset_dustbin_state, "state": ("dustbin_monitor",)}
         }
-        
-        # Initialize models
-        self.initialize_models()
-        
+        for module in self.modules.values():
+            module.update({"mode": None, "video_path": None, "last": None})
+
+        # Inference scheduling: rate is runs per second (None = every frame), deadline in seconds.
+        # The tick budget (seconds of estimated inference) is shared by all modules and cameras.
+        self.scheduler = ModuleScheduler([
+            ModuleSpec("trespassing_detection", rate=None, priority=3, deadline=0.3),
+            ModuleSpec("fire_detection", rate=None, priority=3, deadline=0.3),
+            ModuleSpec("weapon_detection", rate=None, priority=2, deadline=0.5),
+            ModuleSpec("fall_detection", rate=None, priority=2, deadline=0.5),
+            ModuleSpec("crowd_detection", rate=1.0, priority=1, deadline=1.0),
+            ModuleSpec("dustbin_detection", rate=1 / 30.0, priority=0, deadline=30.0),
+        ], budget=0.25)
+        self.scheduler_report_time = time.time()
+        
+        # CPU thread budget (thread_budget.json from `python threads.py`, if present); applied
+        # before the first model loads
+        self.thread_budget = ThreadBudget.load().single_process()
+
+        # Models load through the memory manager; MEMORY_BUDGET_MB caps models plus frame buffers
+        budget = os.environ.get("MEMORY_BUDGET_MB")
+        self.memory = ModelMemory(budget_mb=float(budget) if budget else None)
+
+        # Models are loaded after the window is up, one per event-loop turn (see load_next_model)
+        for name in MODEL_FILES:
+            setattr(self, name, None)
+        self.crowd_counter = None
+        self.crowd_occupancy = OccupancyGrid(frame_size=(640, 480))
+        # Per-zone crowd counts posted to the backend's station occupancy (zones from occupancy.json)
+        self.occupancy_config = load_occupancy_config()
+        self.zone_maps = {}
+        self.occupancy_report_time = 0.0
+        self.occupancy_failed = False
+        # Reports are posted from a daemon thread so a slow backend cannot stall the video; only the latest waits
+        self.occupancy_outbox = queue.Queue(maxsize=1)
+        self.occupancy_sender = None
+        self.models_ready = set()
+        self.model_queue = []
+        self.startup = {"imports": IMPORTS_DONE - STARTED, "models": {}}
+
         # Setup UI
         self.setup_ui()
-        
+        self.root.update_idletasks()
+        self.startup["window"] = time.perf_counter() - STARTED
+
+        self.root.bind_all("<Control-Alt-p>", lambda event: self.toggle_profiler())
+        if hasattr(signal, "SIGUSR2"):
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.toggle_profiler())
+
+        # Initialize models
+        self.initialize_models()
+
         # Start the video update thread
         self.update_video()
-    
+
     def initialize_models(self):
-        """Initialize all the required models"""
+        """Queue every model for loading, the visible tab's models first"""
+        server = os.environ.get("INFERENCE_SERVER")
+        if server:
+            self.initialize_remote_models(server)
+            return
+        self.thread_budget.apply()
+        visible = self.visible_module()
+        first = MODULE_MODELS.get(visible, ()) if visible else ()
+        self.model_queue = list(dict.fromkeys(first + REQUIRED_MODELS + tuple(MODEL_FILES)))
+        self.update_module_status()
+        self.root.after(1, self.load_next_model)
+
+    def load_next_model(self):
+        """Load and warm up one queued model, then yield to the event loop"""
+        if not self.model_queue:
+            return
+        name = self.model_queue.pop(0)
+        timing = self.startup["models"][name] = {}
+        start = time.perf_counter()
         try:
-            self.weapon_model = YOLO("weapon.pt")
-            self.track_model = YOLO("train_segmented.pt")
-            self.person_model = YOLO("yolo11n.pt")
-            self.crowd_model = YOLO("yolo11n.pt")
-            # Initialize fall detection model
-            try:
-                fall_model_path = "fall_model.pt"
-                if os.path.exists(fall_model_path):
-                    self.fall_model = YOLO(fall_model_path)
-                else:
-                    print(f"Warning: Fall detection model not found at {fall_model_path}. Fall detection will be disabled.")
-                    self.fall_model = None
-            except Exception as e:
-                print(f"Warning: Failed to initialize fall detection model: {str(e)}. Fall detection will be disabled.")
-                self.fall_model = None
-            # Initialize fire detection model
-            try:
-                fire_model_path = "fire.pt"
-                if os.path.exists(fire_model_path):
-                    self.fire_model = YOLO(fire_model_path)
-                else:
-                    print(f"Warning: Fire detection model not found at {fire_model_path}. Fire detection will be disabled.")
-                    self.fire_model = None
-            except Exception as e:
-                print(f"Warning: Failed to initialize fire detection model: {str(e)}. Fire detection will be disabled.")
-                self.fire_model = None
-
-            # Initialize dustbin health model
-            try:
-                dustbin_model_path = "dustbin.pt"
-                if os.path.exists(dustbin_model_path):
-                    self.dustbin_model = YOLO(dustbin_model_path)
-                else:
-                    print(f"Warning: Dustbin model not found at {dustbin_model_path}. Dustbin detection will be disabled.")
-                    self.dustbin_model = None
-            except Exception as e:
-                print(f"Warning: Failed to initialize dustbin model: {str(e)}. Dustbin detection will be disabled.")
-                self.dustbin_model = None
+            if self.model_available(name):
+                setattr(self, name, self.load_model(name))
+                timing["load"] = time.perf_counter() - start
+                # First inference pays for lazy initialisation (fused layers, allocator); pay it now
+                self.thread_budget.use(name)
+                start = time.perf_counter()
+                getattr(self, name)(np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)
+                timing["first_inference"] = time.perf_counter() - start
+            elif name in REQUIRED_MODELS:
+                raise FileNotFoundError(f"{MODEL_FILES[name]} not found")
+            else:
+                print(f"Warning: {name} not found at {MODEL_FILES[name]}. Its module will be disabled.")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to initialize models: {str(e)}")
+            if name in REQUIRED_MODELS:
+                messagebox.showerror("Error", f"Failed to initialize models: {str(e)}")
+                self.root.destroy()
+                return
+            print(f"Warning: Failed to initialize {name}: {str(e)}. Its module will be disabled.")
+            setattr(self, name, None)
+        self.models_ready.add(name)
+        if name == "crowd_model" and self.crowd_model is not None:
+            self.crowd_counter = TiledCrowdCounter(
+                lambda images, **kwargs: self.run_model("crowd_model", images, **kwargs),
+                self.class_table("crowd_model").ids("person"))
+        self.update_module_status()
+        if self.model_queue:
+            self.root.after(1, self.load_next_model)
+        else:
+            self.finish_startup()
+
+    def load_pending_models(self):
+        """Load whatever is still queued right away (scripts that drive the app without its event loop)"""
+        while self.model_queue:
+            self.load_next_model()
+
+    def visible_module(self):
+        """Module of the selected tab"""
+        selected = self.notebook.select()
+        return next((name for name, module in self.modules.items()
+                     if module["tab"] is not None and str(module["tab"]) == selected), None)
+
+    def module_ready(self, name):
+        return all(model in self.models_ready for model in MODULE_MODELS[name])
+
+    def update_module_status(self):
+        """Show each tab's loading state and enable its start buttons once its models are in"""
+        total = len(MODEL_FILES)
+        done = len(self.models_ready)
+        self.startup_label.config(text="" if done == total else f"Loading models {done}/{total}")
+        for name, module in self.modules.items():
+            if "status" not in module:
+                continue
+            if not self.module_ready(name):
+                text = "Loading models..."
+            elif getattr(self, module["model"]) is None:
+                text = "Model not available"
+            else:
+                text = "Ready"
+            module["status"].config(text=text)
+            if not module["active"]:
+                ready = tk.NORMAL if self.module_ready(name) else tk.DISABLED
+                module["buttons"]["start_realtime"].config(state=ready)
+                if module["video_path"] is not None:
+                    module["buttons"]["start_file"].config(state=ready)
+
+    def finish_startup(self):
+        """Write startup_report.json: import, window, model load and first-inference times"""
+        self.startup["ready"] = time.perf_counter() - STARTED
+        with open("startup_report.json", "w") as f:
+            json.dump(self.startup, f, indent=2)
+        models = self.startup["models"].values()
+        load = sum(t.get("load", 0.0) for t in models)
+        first = sum(t.get("first_inference", 0.0) for t in models)
+        self.add_alert(f"Started in {self.startup['ready']:.1f} s: imports {self.startup['imports']:.2f} s, "
+                       f"window {self.startup['window']:.2f} s, model loads {load:.1f} s, "
+                       f"first inferences {first:.1f} s (startup_report.json)")
+
+    def send_backend_alert(self, endpoint):
+        """GET an alert endpoint of the backend (api.py); returns the error, or None on success"""
+        import requests
+        try:
+            requests.get(f"http://127.0.0.1:8000/{endpoint}")
+        except requests.exceptions.RequestException as e:
+            return e
+        return None
+
+    def post_backend(self, endpoint, payload):
+        """POST JSON to the backend; returns the error, or None on success"""
+        import requests
+        try:
+            requests.post(f"http://127.0.0.1:8000/{endpoint}", json=payload, timeout=1.0).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            return e
+        return None
+
+    def model_available(self, name):
+        return os.path.exists(MODEL_FILES[name])
+
+    def load_model(self, name, path=None):
+        """Register a model with the memory manager and load it once to check its weights"""
+        path = path or MODEL_FILES[name]
+        def loader():
+            from ultralytics import YOLO
+            return YOLO(path)
+        model = self.memory.register(name, loader, key=path)
+        model.names
+        return model
+
+    def initialize_remote_models(self, url):
+        """Use the shared inference server's models instead of loading local copies"""
+        try:
+            client = InferenceClient(url)
+            served = client.models()
+        except (OSError, RuntimeError) as e:
+            messagebox.showerror("Error", f"Inference server at {url} is not reachable: {str(e)}")
             self.root.destroy()
-    
+            return
+        missing = [name for name in ("weapon_model", "track_model", "person_model", "crowd_model") if name not in served]
+        if missing:
+            messagebox.showerror("Error", f"Inference server at {url} does not serve {', '.join(missing)}")
+            self.root.destroy()
+            return
+        for name in MODEL_FILES:
+            setattr(self, name, client.model(name, served[name]) if name in served else None)
+            if name not in served:
+                print(f"Warning: {name} is not served by {url}. Its module will be disabled.")
+        self.crowd_counter = TiledCrowdCounter(
+            lambda images, **kwargs: self.run_model("crowd_model", images, **kwargs),
+            self.class_table("crowd_model").ids("person"))
+        self.models_ready.update(MODEL_FILES)
+        self.update_module_status()
+        self.finish_startup()
+
+    def class_table(self, model_name):
+        """Class-id lookup table for a model, built once"""
+        table = self.class_tables.get(model_name)
+        if table is None:
+            table = self.class_tables[model_name] = ClassTable(getattr(self, model_name).names)
+        return table
+
+    def predict(self, model_name, source, large=False, **kwargs):
+        """Run a model (its cascade counterpart when ``large``); the current frame is fed as the shared preprocessed tensor"""
+        model = self.large_models[model_name] if large else getattr(self, model_name)
+        if not isinstance(model, RemoteModel):
+            # Remote models run on the server's threads; the client process needs no torch
+            self.thread_budget.use(model_name)
+        frame = self.current_frame
+        if (frame is not None and source is frame and not isinstance(model, RemoteModel)
+                and self.frame_tensors.usable(frame, kwargs.get("imgsz"))):
+            kwargs.pop("imgsz", None)
+            source = self.frame_tensors.get(self.frame_index, frame, model.device)
+        with self.profiler.staged(f"{model_name}:large" if large else model_name):
+            return model(source, verbose=False, **kwargs)
+
+    def infer_images(self, model_name, images, large=False, **kwargs):
+        """Detections for each image of a list (a single image is passed on as-is)"""
+        results = self.predict(model_name, images[0] if len(images) == 1 else images, large=large, **kwargs)
+        return [Detections.from_result(r) for r in results]
+
+    def run_model(self, model_name, source, **kwargs):
+        """Run a model and return Detections (a list of them for a list of images)"""
+        images = source if isinstance(source, list) else [source]
+        cascade = self.cascades.get(model_name)
+        if cascade is not None and self.cascade_active(model_name):
+            detections = cascade(images, **kwargs)
+        else:
+            detections = self.infer_images(model_name, images, **kwargs)
+        return detections if isinstance(source, list) else detections[0]
+
+    def cascade_active(self, model_name):
+        """True while a running module that uses ``model_name`` has cascade mode on"""
+        return any(module["active"] and module.get("cascade") and model_name in MODULE_MODELS[name]
+                   for name, module in self.modules.items())
+
+    def enable_cascade(self, model_name):
+        """Load ``model_name``'s larger counterpart and build its cascade; False when it cannot run"""
+        if model_name in self.cascades:
+            return True
+        spec = self.cascade_specs.get(model_name)
+        small = getattr(self, model_name)
+        if spec is None or small is None or isinstance(small, RemoteModel) or not os.path.exists(spec.large):
+            return False
+        try:
+            large_model = self.load_model(f"{model_name}:large", spec.large)
+        except Exception as e:
+            self.add_alert(f"Failed to load {spec.large}: {str(e)}")
+            return False
+        if dict(large_model.names) != dict(small.names):
+            self.add_alert(f"{spec.large} has different classes than {MODEL_FILES[model_name]}; no cascade for {model_name}")
+            return False
+        self.large_models[model_name] = large_model
+        self.cascades[model_name] = Cascade(
+            spec, lambda large, images, **kwargs: self.infer_images(model_name, images, large=large, **kwargs),
+            small.names)
+        return True
+
+    def on_cascade_toggled(self, name):
+        """Turn a module's cascade mode on or off, loading the larger models on first use"""
+        module = self.modules[name]
+        if module["cascade_var"].get():
+            enabled = [model for model in MODULE_MODELS[name] if self.enable_cascade(model)]
+            if not enabled:
+                files = ", ".join(CASCADE_FILES[m] for m in MODULE_MODELS[name] if m in CASCADE_FILES)
+                messagebox.showwarning("Cascade", f"No larger model available for {module['title']} ({files}).")
+                module["cascade_var"].set(False)
+                return
+            self.add_alert(f"{module['title']}: cascade on for {', '.join(enabled)}")
+        module["cascade"] = module["cascade_var"].get()
+
+    def inference_conf(self, conf):
+        """Confidence to run a model at: the recording floor while recording"""
+        return min(conf, self.recorder.floor) if self.recorder is not None else conf
+
+    def record(self, name, detections, model=None):
+        """Log a module's unfiltered detections (frame coordinates) while recording"""
+        if self.recorder is not None:
+            names = getattr(self, model or self.modules[name]["model"]).names
+            self.recorder.add(name, self.source_frame_index, self.frame_time, self.frame_source, detections, names)
+        return detections
+
+    def record_alert(self, name, message):
+        if self.recorder is not None:
+            self.recorder.add_alert(name, self.source_frame_index, self.frame_time, self.frame_source, message)
+
+    def on_record_toggled(self):
+        """Start or stop writing raw detections to recordings/<time>.detlog"""
+        if self.record_var.get():
+            path = os.path.join("recordings", time.strftime("%Y%m%d-%H%M%S") + ".detlog")
+            self.recorder = DetectionRecorder(path, floor=0.05)
+            self.add_alert(f"Recording raw detections (conf >= {self.recorder.floor}) to {path}")
+        elif self.recorder is not None:
+            self.recorder.close()
+            self.add_alert(f"Recording stopped: {self.recorder.detections} detections in {self.recorder.path}")
+            self.recorder = None
+
     def setup_ui(self):
         """Setup the main UI components"""
         # Dark-only theme configuration
@@ -165,6 +496,36 @@ class SecuritySystemApp:
 
         main_frame = ttk.Frame(self.root, style='TFrame')
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # File mode analysis rate, shared by all modules
+        rate_frame = ttk.Frame(main_frame, style='TFrame')
+        rate_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(rate_frame, text="File analysis rate:").pack(side=tk.LEFT)
+        self.file_rate_var = tk.StringVar(value="All frames")
+        file_rate_box = ttk.Combobox(rate_frame, textvariable=self.file_rate_var, state="readonly", width=12,
+                                     values=["All frames", "10 fps", "5 fps", "2 fps", "1 fps"])
+        file_rate_box.pack(side=tk.LEFT, padx=5)
+        file_rate_box.bind("<<ComboboxSelected>>", self.on_file_rate_changed)
+
+        # Annotation level of detail; auto drops labels on crowded frames
+        ttk.Label(rate_frame, text="Overlay detail:").pack(side=tk.LEFT, padx=(15, 0))
+        self.lod_var = tk.StringVar(value=self.renderer.lod)
+        lod_box = ttk.Combobox(rate_frame, textvariable=self.lod_var, state="readonly", width=8,
+                               values=list(LOD_LEVELS))
+        lod_box.pack(side=tk.LEFT, padx=5)
+        lod_box.bind("<<ComboboxSelected>>", lambda e: setattr(self.renderer, 'lod', self.lod_var.get()))
+
+        # Record mode: models run at a low floor and every raw detection is logged for offline threshold sweeps
+        self.record_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(rate_frame, text="Record detections", variable=self.record_var,
+                        command=self.on_record_toggled).pack(side=tk.LEFT, padx=(15, 0))
+
+        # Tracked model and buffer memory against the budget
+        self.memory_label = ttk.Label(rate_frame, text=self.memory.summary())
+        self.memory_label.pack(side=tk.RIGHT)
+        self.refresh_memory_label()
+        self.startup_label = ttk.Label(rate_frame, text="")
+        self.startup_label.pack(side=tk.RIGHT, padx=(0, 15))
         
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True)
@@ -214,31 +575,13 @@ class SecuritySystemApp:
         
         self.weapon_video_label = ttk.Label(video_frame)
         self.weapon_video_label.pack(fill=tk.BOTH, expand=True)
+        self.modules["weapon_detection"]["video_label"] = self.weapon_video_label
         
         control_frame = ttk.Frame(tab, width=300)
         control_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
         control_frame.pack_propagate(False)
         
-        weapon_ctrl_frame = ttk.LabelFrame(control_frame, text="Weapon Detection")
-        weapon_ctrl_frame.pack(fill=tk.X, pady=5)
-        
-        self.select_weapon_file_btn = ttk.Button(weapon_ctrl_frame, text="Select Video File", 
-                                              command=self.select_weapon_video_file)
-        self.select_weapon_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_weapon_file_btn = ttk.Button(weapon_ctrl_frame, text="Start File Detection", 
-                                             command=lambda: self.start_weapon_detection('file'),
-                                             state=tk.DISABLED)
-        self.start_weapon_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_weapon_realtime_btn = ttk.Button(weapon_ctrl_frame, text="Start Realtime Detection", 
-                                                 command=lambda: self.start_weapon_detection('realtime'))
-        self.start_weapon_realtime_btn.pack(fill=tk.X, pady=5)
-        
-        self.stop_weapon_btn = ttk.Button(weapon_ctrl_frame, text="Stop Detection", 
-                                        command=self.stop_weapon_detection,
-                                        state=tk.DISABLED)
-        self.stop_weapon_btn.pack(fill=tk.X, pady=5)
+        self.build_source_controls("weapon_detection", control_frame, "Weapon Detection")
         
         self.confidence_var = tk.DoubleVar(value=0.5)
         confidence_frame = ttk.LabelFrame(control_frame, text="Confidence Threshold")
@@ -254,6 +597,16 @@ class SecuritySystemApp:
         
         self.confidence_var.trace_add("write", lambda *_: self.confidence_label.config(
             text=f"Current: {self.confidence_var.get():.1f}"))
+
+        # Stage 2 runs weapon_model on full-resolution person crops; the whole-frame pass is optional
+        stages_frame = ttk.LabelFrame(control_frame, text="Detection Stages")
+        stages_frame.pack(fill=tk.X, pady=5)
+        self.weapon_crops_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(stages_frame, text="Person crops (full resolution)",
+                        variable=self.weapon_crops_var).pack(anchor=tk.W, padx=5, pady=2)
+        self.weapon_full_pass_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(stages_frame, text="Whole-frame pass",
+                        variable=self.weapon_full_pass_var).pack(anchor=tk.W, padx=5, pady=2)
     
     def setup_trespassing_detection_tab(self):
         """Setup the trespassing detection module tab"""
@@ -266,31 +619,13 @@ class SecuritySystemApp:
         
         self.trespassing_video_label = ttk.Label(video_frame)
         self.trespassing_video_label.pack(fill=tk.BOTH, expand=True)
+        self.modules["trespassing_detection"]["video_label"] = self.trespassing_video_label
         
         control_frame = ttk.Frame(tab, width=300)
         control_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
         control_frame.pack_propagate(False)
         
-        trespass_ctrl_frame = ttk.LabelFrame(control_frame, text="Trespassing Detection")
-        trespass_ctrl_frame.pack(fill=tk.X, pady=5)
-        
-        self.select_trespassing_file_btn = ttk.Button(trespass_ctrl_frame, text="Select Video File", 
-                                                    command=self.select_trespassing_video_file)
-        self.select_trespassing_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_trespassing_file_btn = ttk.Button(trespass_ctrl_frame, text="Start File Detection", 
-                                                  command=lambda: self.start_trespassing_detection('file'),
-                                                  state=tk.DISABLED)
-        self.start_trespassing_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_trespassing_realtime_btn = ttk.Button(trespass_ctrl_frame, text="Start Realtime Detection", 
-                                                      command=lambda: self.start_trespassing_detection('realtime'))
-        self.start_trespassing_realtime_btn.pack(fill=tk.X, pady=5)
-        
-        self.stop_trespassing_btn = ttk.Button(trespass_ctrl_frame, text="Stop Detection", 
-                                             command=self.stop_trespassing_detection,
-                                             state=tk.DISABLED)
-        self.stop_trespassing_btn.pack(fill=tk.X, pady=5)
+        self.build_source_controls("trespassing_detection", control_frame, "Trespassing Detection")
     
     def setup_fall_detection_tab(self):
         """Setup the fall detection module tab"""
@@ -303,31 +638,13 @@ class SecuritySystemApp:
         
         self.fall_video_label = ttk.Label(video_frame)
         self.fall_video_label.pack(fill=tk.BOTH, expand=True)
+        self.modules["fall_detection"]["video_label"] = self.fall_video_label
         
         control_frame = ttk.Frame(tab, width=300)
         control_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
         control_frame.pack_propagate(False)
         
-        fall_ctrl_frame = ttk.LabelFrame(control_frame, text="Fall Detection")
-        fall_ctrl_frame.pack(fill=tk.X, pady=5)
-        
-        self.select_fall_file_btn = ttk.Button(fall_ctrl_frame, text="Select Video File", 
-                                                    command=self.select_fall_video_file)
-        self.select_fall_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_fall_file_btn = ttk.Button(fall_ctrl_frame, text="Start File Detection", 
-                                                  command=lambda: self.start_fall_detection('file'),
-                                                  state=tk.DISABLED)
-        self.start_fall_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_fall_realtime_btn = ttk.Button(fall_ctrl_frame, text="Start Realtime Detection", 
-                                                      command=lambda: self.start_fall_detection('realtime'))
-        self.start_fall_realtime_btn.pack(fill=tk.X, pady=5)
-        
-        self.stop_fall_btn = ttk.Button(fall_ctrl_frame, text="Stop Detection", 
-                                             command=self.stop_fall_detection,
-                                             state=tk.DISABLED)
-        self.stop_fall_btn.pack(fill=tk.X, pady=5)
+        self.build_source_controls("fall_detection", control_frame, "Fall Detection")
         
         # Confidence threshold for fall detection
         self.fall_confidence_var = tk.DoubleVar(value=0.5)
@@ -347,41 +664,261 @@ class SecuritySystemApp:
     
     def on_tab_changed(self, event):
         """Handle tab changes"""
-        selected_tab = self.notebook.tab(self.notebook.select(), "text")
-        
         self.stop_all_detections()
+        # Load the newly visible tab's models next
+        visible = self.visible_module()
+        if visible is not None:
+            first = [name for name in MODULE_MODELS[visible] if name in self.model_queue]
+            self.model_queue = first + [name for name in self.model_queue if name not in first]
         
         if self.video_capture is not None:
             self.video_capture.release()
             self.video_capture = None
-        
-        if selected_tab == "Weapon Detection":
-            self.modules["weapon_detection"]["active"] = True
-        elif selected_tab == "Trespassing Detection":
-            self.modules["trespassing_detection"]["active"] = True
-        elif selected_tab == "Fall Detection":
-            self.modules["fall_detection"]["active"] = True
-        elif selected_tab == "Crowd Density":
-            self.modules["crowd_detection"]["active"] = True
-        elif selected_tab == "Fire Detection":
-            self.modules["fire_detection"]["active"] = True
-        elif selected_tab == "Dustbin Health":
-            self.modules["dustbin_detection"]["active"] = True
     
+    def on_file_rate_changed(self, event=None):
+        """Update the file mode analysis rate; applies to the next opened file"""
+        value = self.file_rate_var.get()
+        self.file_analysis_fps = None if value == "All frames" else float(value.split()[0])
+
+    def open_video_file(self, path, keep_full=False):
+        """Open a video file for analysis, skipping decode of frames that will not be analysed"""
+        reader = FrameReader(path, size=(640, 480), target_fps=self.file_analysis_fps, keep_full=keep_full)
+        if reader.stride > 1:
+            self.add_alert(f"Analysing 1 of every {reader.stride} frames of {os.path.basename(path)}")
+        return reader
+
     def stop_all_detections(self):
         """Stop all active detections"""
-        if self.modules["weapon_detection"]["active"]:
-            self.stop_weapon_detection()
-        if self.modules["trespassing_detection"]["active"]:
-            self.stop_trespassing_detection()
-        if self.modules["fall_detection"]["active"]:
-            self.stop_fall_detection()
-        if self.modules["crowd_detection"]["active"]:
-            self.stop_crowd_detection()
-        if self.modules["fire_detection"]["active"]:
-            self.stop_fire_detection()
-        if self.modules["dustbin_detection"]["active"]:
-            self.stop_dustbin_detection()
+        for name, module in self.modules.items():
+            if module["active"]:
+                self.stop_detection(name)
+
+    def build_source_controls(self, name, parent, title):
+        """Create the file/realtime/stop buttons shared by every module tab"""
+        ctrl_frame = ttk.LabelFrame(parent, text=title)
+        ctrl_frame.pack(fill=tk.X, pady=5)
+
+        buttons = {
+            "select": ttk.Button(ctrl_frame, text="Select Video File",
+                                 command=lambda: self.select_video_file(name)),
+            "start_file": ttk.Button(ctrl_frame, text="Start File Detection",
+                                     command=lambda: self.start_detection(name, 'file'),
+                                     state=tk.DISABLED),
+            "start_realtime": ttk.Button(ctrl_frame, text="Start Realtime Detection",
+                                         command=lambda: self.start_detection(name, 'realtime')),
+            "stop": ttk.Button(ctrl_frame, text="Stop Detection",
+                               command=lambda: self.stop_detection(name),
+                               state=tk.DISABLED),
+        }
+        for button in buttons.values():
+            button.pack(fill=tk.X, pady=5)
+        self.modules[name]["buttons"] = buttons
+        if any(model in CASCADE_FILES for model in MODULE_MODELS[name]):
+            self.modules[name]["cascade_var"] = tk.BooleanVar(value=False)
+            ttk.Checkbutton(ctrl_frame, text="Cascade to larger model", variable=self.modules[name]["cascade_var"],
+                            command=lambda: self.on_cascade_toggled(name)).pack(fill=tk.X, pady=5)
+        # Loading state of the module's models (see update_module_status)
+        status = ttk.Label(ctrl_frame, text="Loading models...")
+        status.pack(fill=tk.X, pady=(0, 5))
+        self.modules[name]["status"] = status
+
+    def select_video_file(self, name):
+        """Select video file for a module"""
+        file_path = filedialog.askopenfilename(
+            title="Select Video File",
+            filetypes=[("Video files", "*.mp4 *.avi *.mov")]
+        )
+        if file_path:
+            module = self.modules[name]
+            module["video_path"] = file_path
+            self.add_alert(f"{module['title']} video set: {os.path.basename(file_path)}")
+            if self.module_ready(name):
+                module["buttons"]["start_file"].config(state=tk.NORMAL)
+
+    def start_detection(self, name, mode):
+        """Start a module in specified mode"""
+        module = self.modules[name]
+        if not self.module_ready(name):
+            messagebox.showinfo("Loading", f"{module['title']} models are still loading.")
+            return
+        if getattr(self, module["model"], None) is None:
+            messagebox.showerror("Error", f"{module['title']} model not available. Please ensure the model file exists.")
+            return
+
+        if mode == 'file' and module["video_path"] is None:
+            messagebox.showwarning("Warning", "Please select a video file first!")
+            return
+
+        module["mode"] = mode
+        if mode == 'realtime':
+            if self.camera is None:
+                self.camera = self.sources.subscribe(0)
+        else:
+            # One file is read at a time: other file runs stop (and checkpoint) and their reader is released
+            for other, m in self.modules.items():
+                if other != name and m["active"] and m["mode"] == 'file':
+                    self.stop_detection(other)
+            if self.video_capture is not None:
+                self.video_capture.release()
+            self.video_capture = self.open_video_file(module["video_path"], keep_full=module.get("full_resolution", False))
+
+        module["last"] = None
+        self.scheduler.forget(name)
+        self.renderer.forget(name)
+        if "on_start" in module:
+            module["on_start"](mode)
+        if mode == 'file' and not self.resume_from_checkpoint(name):
+            self.video_capture.release()
+            self.video_capture = None
+            module["mode"] = None
+            return
+        for model in MODULE_MODELS[name]:
+            if model in self.cascades:
+                self.cascades[model].reset()
+        module["started"] = time.perf_counter()
+        module["active"] = True
+        self.add_alert(f"{module['title']} started ({mode} mode)")
+
+        buttons = module["buttons"]
+        buttons["select"].config(state=tk.DISABLED)
+        buttons["start_file"].config(state=tk.DISABLED)
+        buttons["start_realtime"].config(state=tk.DISABLED)
+        buttons["stop"].config(state=tk.NORMAL)
+
+    def stop_detection(self, name, finished=False):
+        """Stop a module and report how its schedule held up.
+
+        A file run that is stopped early keeps a checkpoint to resume from;
+        one that reached the end of the video has its checkpoint removed.
+        """
+        module = self.modules[name]
+        if module["mode"] == 'file' and self.video_capture is not None:
+            if finished:
+                self.checkpoints.clear(module["video_path"], name)
+            elif self.video_capture.frame_index >= 0:
+                self.save_checkpoint(name)
+        module["active"] = False
+        module["mode"] = None
+
+        if self.video_capture is not None:
+            self.video_capture.release()
+            self.video_capture = None
+
+        if self.camera is not None and not any(m["active"] for m in self.modules.values()):
+            # The device stays open for a while, so restarting (e.g. after a tab switch) is instant
+            health = self.camera.source.health()
+            self.add_alert(f"{self.camera.key}: {health['fps']:.1f} fps, up {100 * health['availability']:.0f}% of "
+                           f"the time, {health['reconnects']} reconnect(s), {health['decode_errors']} read error(s)")
+            self.camera.close()
+            self.camera = None
+
+        stats = self.scheduler.stats(name).values()
+        runs = sum(s["runs"] for s in stats)
+        draw = self.renderer.stats(name).get(name)
+        draw = f", draw {draw['mean_ms']:.1f} ms/frame" if draw else ""
+        if runs:
+            misses = sum(s["deadline_misses"] for s in stats)
+            skipped = sum(s["skipped"] for s in stats)
+            fps = runs / max(time.perf_counter() - module["started"], 1e-6)
+            cascade = ""
+            if module.get("cascade"):
+                for model in MODULE_MODELS[name]:
+                    if model in self.cascades:
+                        c = self.cascades[model].stats()
+                        cascade += (f", {model} escalated {100 * c['escalation_rate']:.0f}% "
+                                    f"({c['escalated']}/{c['images']}, {c['over_budget']} over budget)")
+            self.add_alert(f"{module['title']} stopped ({runs} runs at {fps:.1f} fps, {skipped} deferred, "
+                           f"{misses} deadline misses{draw}{cascade})")
+        else:
+            self.add_alert(f"{module['title']} stopped")
+
+        buttons = module["buttons"]
+        buttons["select"].config(state=tk.NORMAL)
+        buttons["start_file"].config(state=tk.NORMAL if module["video_path"] else tk.DISABLED)
+        buttons["start_realtime"].config(state=tk.NORMAL)
+        buttons["stop"].config(state=tk.DISABLED)
+
+    def checkpoint_state(self, name):
+        """Everything a file run of ``name`` needs to continue after the current frame"""
+        module = self.modules[name]
+        state = {
+            "objects": {path: self.get_path(path) for path in module.get("state", ())},
+            "tasks": {task: s for task, s in self.scheduler.tasks.items() if task[0] == name},
+            "last": module["last"],
+            "recorder": None if self.recorder is None else (self.recorder.path, self.recorder.position()),
+        }
+        if "alert_time" in module:
+            # Cooldowns run on wall time; keep how long ago the last alert was
+            state["alert_age"] = time.time() - getattr(self, module["alert_time"])
+        return state
+
+    def get_path(self, path):
+        obj = self
+        for attr in path.split("."):
+            obj = getattr(obj, attr)
+        return obj
+
+    def set_path(self, path, value):
+        owner, _, attr = path.rpartition(".")
+        setattr(self.get_path(owner) if owner else self, attr, value)
+
+    def save_checkpoint(self, name):
+        module = self.modules[name]
+        self.checkpoints.save(module["video_path"], name, self.video_capture.frame_index, self.frame_time,
+                              self.checkpoint_state(name))
+
+    def resume_from_checkpoint(self, name):
+        """Offer to continue an interrupted file run; outputs written after the checkpoint are rolled back.
+
+        Returns False when the run must not start: rolling the detection log
+        back would also drop what other running modules recorded since.
+        """
+        module = self.modules[name]
+        checkpoint = self.checkpoints.load(module["video_path"], name)
+        if checkpoint is None:
+            return True
+        position = time.strftime('%H:%M:%S', time.gmtime(checkpoint["time"]))
+        if not messagebox.askyesno("Resume", f"{module['title']} stopped at {position} in this video. Resume from there?"):
+            self.checkpoints.clear(module["video_path"], name)
+            return True
+
+        state = checkpoint["state"]
+        others = [m["title"] for other, m in self.modules.items() if other != name and m["active"]]
+        if state["recorder"] is not None and self.recorder is not None and others:
+            messagebox.showwarning("Resume", f"Stop {', '.join(others)} first: resuming rolls back the detection "
+                                             f"log, which would also drop what they recorded since {position}.")
+            return False
+        for path, value in state["objects"].items():
+            self.set_path(path, value)
+        self.scheduler.tasks.update(state["tasks"])
+        module["last"] = state["last"]
+        if "alert_age" in state:
+            setattr(self, module["alert_time"], time.time() - state["alert_age"])
+        if state["recorder"] is not None:
+            log_path, written = state["recorder"]
+            if self.recorder is None or self.recorder.path != log_path:
+                if self.recorder is not None:
+                    self.recorder.close()
+                self.recorder = DetectionRecorder(log_path)
+                self.record_var.set(True)
+            self.recorder.truncate(written)
+        self.video_capture.seek(frame_index=checkpoint["frame_index"] + self.video_capture.stride)
+        self.add_alert(f"{module['title']} resuming at {position}")
+        return True
+
+    def reset_crowd_state(self, mode):
+        self.crowd_occupancy.reset()
+
+    def reset_fall_state(self, mode):
+        self.fall_tracker.reset()
+        self.fall_posture.reset()
+
+    def reset_fire_state(self, mode):
+        self.fire_gate.reset()
+
+    def reset_dustbin_state(self, mode):
+        if mode == 'file':
+            self.dustbin_monitor.reset(camera=self.modules["dustbin_detection"]["video_path"])
 
     def setup_crowd_detection_tab(self):
         """Setup the crowd density detection module tab"""
@@ -394,37 +931,30 @@ class SecuritySystemApp:
 
         self.crowd_video_label = ttk.Label(video_frame)
         self.crowd_video_label.pack(fill=tk.BOTH, expand=True)
+        self.modules["crowd_detection"]["video_label"] = self.crowd_video_label
 
         control_frame = ttk.Frame(tab, width=300)
         control_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
         control_frame.pack_propagate(False)
 
-        crowd_ctrl_frame = ttk.LabelFrame(control_frame, text="Crowd Density Detection")
-        crowd_ctrl_frame.pack(fill=tk.X, pady=5)
-
-        self.select_crowd_file_btn = ttk.Button(crowd_ctrl_frame, text="Select Video File", 
-                                                command=self.select_crowd_video_file)
-        self.select_crowd_file_btn.pack(fill=tk.X, pady=5)
-
-        self.start_crowd_file_btn = ttk.Button(crowd_ctrl_frame, text="Start File Detection", 
-                                               command=lambda: self.start_crowd_detection('file'),
-                                               state=tk.DISABLED)
-        self.start_crowd_file_btn.pack(fill=tk.X, pady=5)
-
-        self.start_crowd_realtime_btn = ttk.Button(crowd_ctrl_frame, text="Start Realtime Detection", 
-                                                   command=lambda: self.start_crowd_detection('realtime'))
-        self.start_crowd_realtime_btn.pack(fill=tk.X, pady=5)
-
-        self.stop_crowd_btn = ttk.Button(crowd_ctrl_frame, text="Stop Detection", 
-                                          command=self.stop_crowd_detection,
-                                          state=tk.DISABLED)
-        self.stop_crowd_btn.pack(fill=tk.X, pady=5)
+        self.build_source_controls("crowd_detection", control_frame, "Crowd Density Detection")
 
         self.crowd_count_var = tk.IntVar(value=0)
         count_frame = ttk.LabelFrame(control_frame, text="People Count")
         count_frame.pack(fill=tk.X, pady=5)
         self.crowd_count_label = ttk.Label(count_frame, text="Current: 0")
         self.crowd_count_label.pack(fill=tk.X, padx=5, pady=5)
+        self.crowd_average_label = ttk.Label(count_frame, text="Average: 0.0")
+        self.crowd_average_label.pack(fill=tk.X, padx=5, pady=(0, 5))
+
+        density_frame = ttk.LabelFrame(control_frame, text="High Density")
+        density_frame.pack(fill=tk.X, pady=5)
+        self.crowd_tiled_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(density_frame, text="Tiled counting (adaptive)",
+                        variable=self.crowd_tiled_var).pack(anchor=tk.W, padx=5, pady=2)
+        self.crowd_heatmap_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(density_frame, text="Show density heatmap",
+                        variable=self.crowd_heatmap_var).pack(anchor=tk.W, padx=5, pady=2)
 
         self.crowd_confidence_var = tk.DoubleVar(value=0.4)
         conf_frame = ttk.LabelFrame(control_frame, text="Confidence Threshold")
@@ -438,83 +968,75 @@ class SecuritySystemApp:
         self.crowd_confidence_var.trace_add("write", lambda *_: self.crowd_conf_label.config(
             text=f"Current: {self.crowd_confidence_var.get():.1f}"))
 
-    def select_crowd_video_file(self):
-        """Select video file for crowd density detection"""
-        file_path = filedialog.askopenfilename(
-            title="Select Video File",
-            filetypes=[("Video files", "*.mp4 *.avi *.mov")]
-        )
-        if file_path:
-            self.crowd_video_path = file_path
-            self.add_alert(f"Crowd detection video set: {os.path.basename(file_path)}")
-            self.start_crowd_file_btn.config(state=tk.NORMAL)
-
-    def start_crowd_detection(self, mode):
-        """Start crowd density detection in specified mode"""
-        self.crowd_detection_mode = mode
-
-        if mode == 'file' and not hasattr(self, 'crowd_video_path'):
-            messagebox.showwarning("Warning", "Please select a video file first!")
-            return
-
-        if mode == 'realtime':
-            if self.cap is None:
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        else:
-            self.video_capture = cv2.VideoCapture(self.crowd_video_path)
-
-        self.modules["crowd_detection"]["active"] = True
-        self.add_alert(f"Crowd density detection started ({mode} mode)")
-
-        self.select_crowd_file_btn.config(state=tk.DISABLED)
-        self.start_crowd_file_btn.config(state=tk.DISABLED)
-        self.start_crowd_realtime_btn.config(state=tk.DISABLED)
-        self.stop_crowd_btn.config(state=tk.NORMAL)
-
-    def stop_crowd_detection(self):
-        """Stop crowd density detection"""
-        self.modules["crowd_detection"]["active"] = False
-        self.crowd_detection_mode = None
-
-        if self.video_capture is not None:
-            self.video_capture.release()
-            self.video_capture = None
-
-        if self.cap is not None and not any(module["active"] for module in self.modules.values()):
-            self.cap.release()
-            self.cap = None
-
-        self.add_alert("Crowd density detection stopped")
-
-        self.select_crowd_file_btn.config(state=tk.NORMAL)
-        self.start_crowd_file_btn.config(state=tk.NORMAL if hasattr(self, 'crowd_video_path') else tk.DISABLED)
-        self.start_crowd_realtime_btn.config(state=tk.NORMAL)
-        self.stop_crowd_btn.config(state=tk.DISABLED)
-
-    def process_crowd_detection(self, frame):
+    def process_crowd_detection(self, frame, infer=True):
         """Process frame for crowd density detection and counting"""
-        display_frame = frame.copy()
-        count_person = 0
-
-        results = self.crowd_model(frame, conf=self.crowd_confidence_var.get(), verbose=False)
-        res0 = results[0]
-        for box in res0.boxes:
-            cls = int(box.cls[0])
-            if self.crowd_model.names[cls] == 'person':
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
-                count_person += 1
-
-        self.crowd_count_var.set(count_person)
-        self.crowd_count_label.config(text=f"Current: {count_person}")
-        cv2.putText(display_frame, f"People: {count_person}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 0), 2)
-
-        return display_frame
+        scene = Scene()
+        module = self.modules["crowd_detection"]
+
+        if infer:
+            # Tiles are only used when the previous frame was dense; quiet frames cost one pass
+            self.crowd_counter.max_grid = 4 if self.crowd_tiled_var.get() else 1
+            conf = self.crowd_confidence_var.get()
+            people = self.crowd_counter.count(frame, conf, floor=self.inference_conf(conf))
+            people = self.record("crowd_detection", people).above(conf)
+            module["last"] = people
+            self.crowd_occupancy.update(people.xyxy)
+            self.report_occupancy(people)
+
+            count_person = len(people)
+            average = self.crowd_occupancy.rolling_average()
+            self.crowd_count_var.set(count_person)
+            self.crowd_count_label.config(text=f"Current: {count_person}")
+            self.crowd_average_label.config(text=f"Average: {average:.1f}")
+
+        if module["last"] is None:
+            return scene
+        people = module["last"]
+
+        if self.crowd_heatmap_var.get():
+            heatmap, occupied = self.crowd_occupancy.heatmap()
+            scene.overlay(occupied, heatmap, alpha=0.45)
+        scene.add_boxes(people.xyxy, "crowd")
+        scene.add_text(f"People: {len(people)}", (10, 30), "hud")
+        if self.crowd_counter.grid > 1:
+            scene.add_text(f"Tiles: {self.crowd_counter.grid}x{self.crowd_counter.grid}", (10, 60), "hud_small")
+
+        return scene
     
+    def report_occupancy(self, people):
+        """Post this camera's per-zone counts to the backend, at most once a second"""
+        now = time.time()
+        if now < self.occupancy_report_time + 1.0:
+            return
+        self.occupancy_report_time = now
+        camera = os.path.basename(str(self.frame_source))
+        zones = self.zone_maps.get(camera)
+        if zones is None:
+            zones = self.zone_maps[camera] = ZoneMap(self.occupancy_config["cameras"].get(camera, {}), camera)
+        payload = {"camera": camera, "zones": zones.counts(people.xyxy)}
+        try:
+            self.occupancy_outbox.get_nowait()
+        except queue.Empty:
+            pass
+        self.occupancy_outbox.put(payload)
+        if self.occupancy_sender is None:
+            self.occupancy_sender = threading.Thread(target=self.send_occupancy, name="occupancy", daemon=True)
+            self.occupancy_sender.start()
+
+    def send_occupancy(self):
+        """Sender thread: post queued reports and hand each outcome back to the Tk thread"""
+        while True:
+            error = self.post_backend("occupancy", self.occupancy_outbox.get())
+            self.root.after(0, self.occupancy_posted, error)
+
+    def occupancy_posted(self, error):
+        if error is not None:
+            # Backend not running: try again in 30 s instead of on every count
+            self.occupancy_report_time = time.time() + 30.0
+            if not self.occupancy_failed:
+                self.add_alert(f"Occupancy reporting paused: {error}")
+        self.occupancy_failed = error is not None
+
     def setup_fire_detection_tab(self):
         """Setup the fire detection module tab"""
         tab = ttk.Frame(self.notebook)
@@ -526,31 +1048,13 @@ class SecuritySystemApp:
         
         self.fire_video_label = ttk.Label(video_frame)
         self.fire_video_label.pack(fill=tk.BOTH, expand=True)
+        self.modules["fire_detection"]["video_label"] = self.fire_video_label
         
         control_frame = ttk.Frame(tab, width=300)
         control_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
         control_frame.pack_propagate(False)
         
-        fire_ctrl_frame = ttk.LabelFrame(control_frame, text="Fire Detection")
-        fire_ctrl_frame.pack(fill=tk.X, pady=5)
-        
-        self.select_fire_file_btn = ttk.Button(fire_ctrl_frame, text="Select Video File", 
-                                                    command=self.select_fire_video_file)
-        self.select_fire_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_fire_file_btn = ttk.Button(fire_ctrl_frame, text="Start File Detection", 
-                                                  command=lambda: self.start_fire_detection('file'),
-                                                  state=tk.DISABLED)
-        self.start_fire_file_btn.pack(fill=tk.X, pady=5)
-        
-        self.start_fire_realtime_btn = ttk.Button(fire_ctrl_frame, text="Start Realtime Detection", 
-                                                      command=lambda: self.start_fire_detection('realtime'))
-        self.start_fire_realtime_btn.pack(fill=tk.X, pady=5)
-        
-        self.stop_fire_btn = ttk.Button(fire_ctrl_frame, text="Stop Detection", 
-                                             command=self.stop_fire_detection,
-                                             state=tk.DISABLED)
-        self.stop_fire_btn.pack(fill=tk.X, pady=5)
+        self.build_source_controls("fire_detection", control_frame, "Fire Detection")
         
         # Confidence threshold for fire detection
         self.fire_confidence_var = tk.DoubleVar(value=0.5)
@@ -567,120 +1071,74 @@ class SecuritySystemApp:
         
         self.fire_confidence_var.trace_add("write", lambda *_: self.fire_confidence_label.config(
             text=f"Current: {self.fire_confidence_var.get():.1f}"))
+
+        # Colour/flicker pre-filter: fire_model only sees frames (or crops) with candidates
+        gate_frame = ttk.LabelFrame(control_frame, text="Pre-filter")
+        gate_frame.pack(fill=tk.X, pady=5)
+        self.fire_gate_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(gate_frame, text="Colour/flicker gate",
+                        variable=self.fire_gate_var).pack(anchor=tk.W, padx=5, pady=2)
+        self.fire_gate_label = ttk.Label(gate_frame, text="Model runs: -")
+        self.fire_gate_label.pack(anchor=tk.W, padx=5, pady=2)
     
-    def select_fire_video_file(self):
-        """Select video file for fire detection"""
-        file_path = filedialog.askopenfilename(
-            title="Select Video File",
-            filetypes=[("Video files", "*.mp4 *.avi *.mov")]
-        )
-        if file_path:
-            self.fire_video_path = file_path
-            self.add_alert(f"Fire detection video set: {os.path.basename(file_path)}")
-            self.start_fire_file_btn.config(state=tk.NORMAL)
-    
-    def start_fire_detection(self, mode):
-        """Start fire detection in specified mode"""
-        if self.fire_model is None:
-            messagebox.showerror("Error", "Fire detection model not available. Please ensure the model file exists.")
-            return
-            
-        self.fire_detection_mode = mode
-        
-        if mode == 'file' and not hasattr(self, 'fire_video_path'):
-            messagebox.showwarning("Warning", "Please select a video file first!")
-            return
-            
-        if mode == 'realtime':
-            if self.cap is None:
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        else:
-            self.video_capture = cv2.VideoCapture(self.fire_video_path)
-        
-        self.modules["fire_detection"]["active"] = True
-        self.add_alert(f"Fire detection started ({mode} mode)")
-        
-        self.select_fire_file_btn.config(state=tk.DISABLED)
-        self.start_fire_file_btn.config(state=tk.DISABLED)
-        self.start_fire_realtime_btn.config(state=tk.DISABLED)
-        self.stop_fire_btn.config(state=tk.NORMAL)
-    
-    def stop_fire_detection(self):
-        """Stop fire detection"""
-        self.modules["fire_detection"]["active"] = False
-        self.fire_detection_mode = None
-        
-        if self.video_capture is not None:
-            self.video_capture.release()
-            self.video_capture = None
-            
-        if self.cap is not None and not any(module["active"] for module in self.modules.values()):
-            self.cap.release()
-            self.cap = None
-        
-        self.add_alert("Fire detection stopped")
-        
-        self.select_fire_file_btn.config(state=tk.NORMAL)
-        self.start_fire_file_btn.config(state=tk.NORMAL if hasattr(self, 'fire_video_path') else tk.DISABLED)
-        self.start_fire_realtime_btn.config(state=tk.NORMAL)
-        self.stop_fire_btn.config(state=tk.DISABLED)
-    
-    def process_fire_detection(self, frame):
+    def process_fire_detection(self, frame, infer=True):
         """Process frame for fire and smoke detection with 5-second alert delay"""
+        scene = Scene()
         if self.fire_model is None:
-            return frame
-            
-        display_frame = frame.copy()
-        fire_detected = False
-        smoke_detected = False
-        
-        results = self.fire_model(frame, stream=True, conf=self.fire_confidence_var.get(), verbose=False)
-        
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = box.conf[0].item()
-                cls = int(box.cls[0])
-                label = self.fire_model.names[cls]
-                
-                if label == "Fire":
-                    fire_detected = True
-                    
-                    # Draw bounding box in orange/red for fire detection
-                    cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 69, 255), 3)
-                    cv2.putText(display_frame, f'FIRE {confidence:.2f}', (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 69, 255), 2)
-                    
-                elif label == "smoke":
-                    smoke_detected = True
-                    
-                    # Draw bounding box in gray/white for smoke detection
-                    cv2.rectangle(display_frame, (x1, y1), (x2, y2), (192, 192, 192), 3)
-                    cv2.putText(display_frame, f'SMOKE {confidence:.2f}', (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (192, 192, 192), 2)
-        
-        # Send alert if fire or smoke detected (after processing all boxes)
-        current_time = time.time()
-        if (fire_detected or smoke_detected) and current_time - self.fire_alert_time > self.alert_cooldown:
-            if fire_detected and smoke_detected:
-                alert_message = "🚨 Fire and Smoke detected!"
-            elif fire_detected:
-                alert_message = "🚨 Fire detected!"
+            return scene
+
+        module = self.modules["fire_detection"]
+        table = self.class_table("fire_model")
+
+        if infer:
+            conf = self.fire_confidence_var.get()
+            detections = Detections()
+            height, width = frame.shape[:2]
+            if self.fire_gate_var.get():
+                region = self.fire_gate.check(frame, self.frame_time)
+                self.fire_gate_label.config(text=f"Model runs: {100 * self.fire_gate.pass_rate:.0f}% of frames")
             else:
-                alert_message = "🚨 Smoke detected!"
-            
-            self.add_alert(alert_message, is_important=True)
-            try:
-                response = requests.get("http://127.0.0.1:8000/fire_alert")
-                self.fire_alert_time = current_time
-            except requests.exceptions.RequestException as e:
-                self.add_alert(f"Error sending alert: {e}")
+                region = (0, 0, width, height)
+
+            if region is not None:
+                ox, oy, ex, ey = region
+                source = frame if region == (0, 0, width, height) else frame[oy:ey, ox:ex]
+                detections = self.run_model("fire_model", source, conf=self.inference_conf(conf))
+                detections = detections.of_class(table, "fire", "smoke").translate(ox, oy)
+            detections = self.record("fire_detection", detections).above(conf)
+            module["last"] = detections
+
+            is_fire = table.mask("fire")[detections.cls]
+            fire_detected = bool(is_fire.any())
+            smoke_detected = bool((~is_fire).any())
+
+            # Send alert if fire or smoke detected (after processing all boxes)
+            current_time = time.time()
+            if (fire_detected or smoke_detected) and current_time - self.fire_alert_time > self.alert_cooldown:
+                if fire_detected and smoke_detected:
+                    alert_message = "🚨 Fire and Smoke detected!"
+                elif fire_detected:
+                    alert_message = "🚨 Fire detected!"
+                else:
+                    alert_message = "🚨 Smoke detected!"
+                
+                self.add_alert(alert_message, is_important=True)
+                self.record_alert("fire_detection", alert_message)
+                error = self.send_backend_alert("fire_alert")
+                if error is None:
+                    self.fire_alert_time = current_time
+                else:
+                    self.add_alert(f"Error sending alert: {error}")
+
+        detections = module["last"]
+        if not detections:
+            return scene
+        is_fire = table.mask("fire")[detections.cls]
+        fire, smoke = detections[is_fire], detections[~is_fire]
+        scene.add_boxes(fire.xyxy, "fire", [f'FIRE {c:.2f}' for c in fire.conf])
+        scene.add_boxes(smoke.xyxy, "smoke", [f'SMOKE {c:.2f}' for c in smoke.conf])
         
-        return display_frame
+        return scene
 
     def setup_dustbin_detection_tab(self):
         """Setup the dustbin health detection module tab"""
@@ -693,31 +1151,13 @@ class SecuritySystemApp:
 
         self.dustbin_video_label = ttk.Label(video_frame)
         self.dustbin_video_label.pack(fill=tk.BOTH, expand=True)
+        self.modules["dustbin_detection"]["video_label"] = self.dustbin_video_label
 
         control_frame = ttk.Frame(tab, width=300)
         control_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
         control_frame.pack_propagate(False)
 
-        dustbin_ctrl_frame = ttk.LabelFrame(control_frame, text="Dustbin Health Detection")
-        dustbin_ctrl_frame.pack(fill=tk.X, pady=5)
-
-        self.select_dustbin_file_btn = ttk.Button(dustbin_ctrl_frame, text="Select Video File", 
-                                                  command=self.select_dustbin_video_file)
-        self.select_dustbin_file_btn.pack(fill=tk.X, pady=5)
-
-        self.start_dustbin_file_btn = ttk.Button(dustbin_ctrl_frame, text="Start File Detection", 
-                                                 command=lambda: self.start_dustbin_detection('file'),
-                                                 state=tk.DISABLED)
-        self.start_dustbin_file_btn.pack(fill=tk.X, pady=5)
-
-        self.start_dustbin_realtime_btn = ttk.Button(dustbin_ctrl_frame, text="Start Realtime Detection", 
-                                                      command=lambda: self.start_dustbin_detection('realtime'))
-        self.start_dustbin_realtime_btn.pack(fill=tk.X, pady=5)
-
-        self.stop_dustbin_btn = ttk.Button(dustbin_ctrl_frame, text="Stop Detection", 
-                                            command=self.stop_dustbin_detection,
-                                            state=tk.DISABLED)
-        self.stop_dustbin_btn.pack(fill=tk.X, pady=5)
+        self.build_source_controls("dustbin_detection", control_frame, "Dustbin Health Detection")
 
         # Confidence threshold for dustbin detection
         self.dustbin_confidence_var = tk.DoubleVar(value=0.5)
@@ -739,266 +1179,48 @@ class SecuritySystemApp:
         self.dustbin_counts_text = tk.Text(control_frame, height=10, state=tk.DISABLED)
         self.dustbin_counts_text.pack(fill=tk.BOTH, expand=False, padx=5, pady=5)
 
-    def select_dustbin_video_file(self):
-        """Select video file for dustbin health detection"""
-        file_path = filedialog.askopenfilename(
-            title="Select Video File",
-            filetypes=[("Video files", "*.mp4 *.avi *.mov")]
-        )
-        if file_path:
-            self.dustbin_video_path = file_path
-            self.add_alert(f"Dustbin detection video set: {os.path.basename(file_path)}")
-            self.start_dustbin_file_btn.config(state=tk.NORMAL)
-
-    def start_dustbin_detection(self, mode):
-        """Start dustbin detection in specified mode"""
+    def process_dustbin_detection(self, frame, infer=True):
+        """Process frame for dustbin health on a low-rate sampling schedule"""
+        scene = Scene()
         if getattr(self, 'dustbin_model', None) is None:
-            messagebox.showerror("Error", "Dustbin model not available. Ensure dustbin.pt exists.")
-            return
-
-        self.dustbin_detection_mode = mode
-
-        if mode == 'file' and not hasattr(self, 'dustbin_video_path'):
-            messagebox.showwarning("Warning", "Please select a video file first!")
-            return
-
-        if mode == 'realtime':
-            if self.cap is None:
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        else:
-            self.video_capture = cv2.VideoCapture(self.dustbin_video_path)
-
-        self.modules["dustbin_detection"]["active"] = True
-        self.add_alert(f"Dustbin detection started ({mode} mode)")
-
-        self.select_dustbin_file_btn.config(state=tk.DISABLED)
-        self.start_dustbin_file_btn.config(state=tk.DISABLED)
-        self.start_dustbin_realtime_btn.config(state=tk.DISABLED)
-        self.stop_dustbin_btn.config(state=tk.NORMAL)
-
-    def stop_dustbin_detection(self):
-        """Stop dustbin detection"""
-        self.modules["dustbin_detection"]["active"] = False
-        self.dustbin_detection_mode = None
-
-        if self.video_capture is not None:
-            self.video_capture.release()
-            self.video_capture = None
-
-        if self.cap is not None and not any(module["active"] for module in self.modules.values()):
-            self.cap.release()
-            self.cap = None
-
-        self.add_alert("Dustbin detection stopped")
-
-        self.select_dustbin_file_btn.config(state=tk.NORMAL)
-        self.start_dustbin_file_btn.config(state=tk.NORMAL if hasattr(self, 'dustbin_video_path') else tk.DISABLED)
-        self.start_dustbin_realtime_btn.config(state=tk.NORMAL)
-        self.stop_dustbin_btn.config(state=tk.DISABLED)
-
-    def process_dustbin_detection(self, frame):
-        """Process frame for dustbin health detection and counts"""
-        if getattr(self, 'dustbin_model', None) is None:
-            return frame
-
-        display_frame = frame.copy()
-        results = self.dustbin_model(frame, conf=self.dustbin_confidence_var.get(), verbose=False)
-        res0 = results[0]
-
-        # Count per label
-        counts = {}
-        for box in res0.boxes:
-            cls = int(box.cls[0])
-            label = self.dustbin_model.names[cls]
-            counts[label] = counts.get(label, 0) + 1
-
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(display_frame, f"{label}", (x1, y1 - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-        # Update counts panel
+            return scene
+
+        camera = self.frame_source
+        if infer:
+            conf = self.dustbin_confidence_var.get()
+            bins = self.run_model("dustbin_model", frame, conf=self.inference_conf(conf))
+            bins = self.record("dustbin_detection", bins).above(conf)
+            labels = bins.labels(self.class_table("dustbin_model"))
+            changes = self.dustbin_monitor.sample(camera, bins.xyxy, labels, self.frame_time)
+            if changes:
+                for track, old, new in changes:
+                    if new is None:
+                        self.add_alert(f"Bin #{track.bin_id} no longer visible (was {old})")
+                    else:
+                        self.add_alert(f"Bin #{track.bin_id}: {old or 'new'} -> {new}",
+                                       is_important=new in PROBLEM_LABELS)
+                        if new in PROBLEM_LABELS:
+                            self.record_alert("dustbin_detection", f"Bin #{track.bin_id}: {new}")
+                self.update_dustbin_panel()
+            # Warm-up samples come faster than the scheduled rate
+            self.scheduler.set_next_due(("dustbin_detection", camera), self.dustbin_monitor.next_due(camera))
+
+        # Bins are drawn from their tracked state so the overlay stays up between samples
+        for track in self.dustbin_monitor.camera_bins(camera):
+            style = "bin_problem" if track.state in PROBLEM_LABELS else "bin_ok"
+            scene.add_boxes(track.box, style, [f"#{track.bin_id} {track.state or 'pending'}"])
+
+        return scene
+
+    def update_dustbin_panel(self):
+        """Refresh the station-wide bin inventory; called only when a bin changes state"""
+        inventory = self.dustbin_monitor.inventory()
         self.dustbin_counts_text.config(state=tk.NORMAL)
         self.dustbin_counts_text.delete('1.0', tk.END)
-        for name in ['Broken trash can', 'Close_empty', 'Close_full', 'Healthy trash can', 'Open_empty', 'Open_full', 'Trash flow', 'closed', 'empty', 'full']:
-            self.dustbin_counts_text.insert(tk.END, f"{name}: {counts.get(name, 0)}\n")
+        self.dustbin_counts_text.insert(tk.END, f"Bins tracked: {len(self.dustbin_monitor.bins)}\n")
+        for name in self.dustbin_model.names.values():
+            self.dustbin_counts_text.insert(tk.END, f"{name}: {inventory.get(name, 0)}\n")
         self.dustbin_counts_text.config(state=tk.DISABLED)
-
-        return display_frame
-    
-    def select_weapon_video_file(self):
-        """Select video file for weapon detection"""
-        file_path = filedialog.askopenfilename(
-            title="Select Video File",
-            filetypes=[("Video files", "*.mp4 *.avi *.mov")]
-        )
-        if file_path:
-            self.weapon_video_path = file_path
-            self.add_alert(f"Weapon detection video set: {os.path.basename(file_path)}")
-            self.start_weapon_file_btn.config(state=tk.NORMAL)
-    
-    def start_weapon_detection(self, mode):
-        """Start weapon detection in specified mode"""
-        self.weapon_detection_mode = mode
-        
-        if mode == 'file' and not hasattr(self, 'weapon_video_path'):
-            messagebox.showwarning("Warning", "Please select a video file first!")
-            return
-            
-        if mode == 'realtime':
-            if self.cap is None:
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        else:
-            self.video_capture = cv2.VideoCapture(self.weapon_video_path)
-        
-        self.modules["weapon_detection"]["active"] = True
-        self.add_alert(f"Weapon detection started ({mode} mode)")
-        
-        self.select_weapon_file_btn.config(state=tk.DISABLED)
-        self.start_weapon_file_btn.config(state=tk.DISABLED)
-        self.start_weapon_realtime_btn.config(state=tk.DISABLED)
-        self.stop_weapon_btn.config(state=tk.NORMAL)
-    
-    def stop_weapon_detection(self):
-        """Stop weapon detection"""
-        self.modules["weapon_detection"]["active"] = False
-        self.weapon_detection_mode = None
-        
-        if self.video_capture is not None:
-            self.video_capture.release()
-            self.video_capture = None
-            
-        if self.cap is not None and not any(module["active"] for module in self.modules.values()):
-            self.cap.release()
-            self.cap = None
-        
-        self.add_alert("Weapon detection stopped")
-        
-        self.select_weapon_file_btn.config(state=tk.NORMAL)
-        self.start_weapon_file_btn.config(state=tk.NORMAL if hasattr(self, 'weapon_video_path') else tk.DISABLED)
-        self.start_weapon_realtime_btn.config(state=tk.NORMAL)
-        self.stop_weapon_btn.config(state=tk.DISABLED)
-    
-    def select_trespassing_video_file(self):
-        """Select video file for trespassing detection"""
-        file_path = filedialog.askopenfilename(
-            title="Select Video File",
-            filetypes=[("Video files", "*.mp4 *.avi *.mov")]
-        )
-        if file_path:
-            self.trespassing_video_path = file_path
-            self.add_alert(f"Trespassing detection video set: {os.path.basename(file_path)}")
-            self.start_trespassing_file_btn.config(state=tk.NORMAL)
-    
-    def start_trespassing_detection(self, mode):
-        """Start trespassing detection in specified mode"""
-        self.trespassing_detection_mode = mode
-        
-        if mode == 'file' and not hasattr(self, 'trespassing_video_path'):
-            messagebox.showwarning("Warning", "Please select a video file first!")
-            return
-            
-        if mode == 'realtime':
-            if self.cap is None:
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        else:
-            self.video_capture = cv2.VideoCapture(self.trespassing_video_path)
-        
-        self.modules["trespassing_detection"]["active"] = True
-        self.add_alert(f"Trespassing detection started ({mode} mode)")
-        
-        self.select_trespassing_file_btn.config(state=tk.DISABLED)
-        self.start_trespassing_file_btn.config(state=tk.DISABLED)
-        self.start_trespassing_realtime_btn.config(state=tk.DISABLED)
-        self.stop_trespassing_btn.config(state=tk.NORMAL)
-    
-    def stop_trespassing_detection(self):
-        """Stop trespassing detection"""
-        self.modules["trespassing_detection"]["active"] = False
-        self.trespassing_detection_mode = None
-        
-        if self.video_capture is not None:
-            self.video_capture.release()
-            self.video_capture = None
-            
-        if self.cap is not None and not any(module["active"] for module in self.modules.values()):
-            self.cap.release()
-            self.cap = None
-        
-        self.add_alert("Trespassing detection stopped")
-        
-        self.select_trespassing_file_btn.config(state=tk.NORMAL)
-        self.start_trespassing_file_btn.config(state=tk.NORMAL if hasattr(self, 'trespassing_video_path') else tk.DISABLED)
-        self.start_trespassing_realtime_btn.config(state=tk.NORMAL)
-        self.stop_trespassing_btn.config(state=tk.DISABLED)
-    
-    def select_fall_video_file(self):
-        """Select video file for fall detection"""
-        file_path = filedialog.askopenfilename(
-            title="Select Video File",
-            filetypes=[("Video files", "*.mp4 *.avi *.mov")]
-        )
-        if file_path:
-            self.fall_video_path = file_path
-            self.add_alert(f"Fall detection video set: {os.path.basename(file_path)}")
-            self.start_fall_file_btn.config(state=tk.NORMAL)
-    
-    def start_fall_detection(self, mode):
-        """Start fall detection in specified mode"""
-        if self.fall_model is None:
-            messagebox.showerror("Error", "Fall detection model not available. Please ensure the model file exists.")
-            return
-            
-        self.fall_detection_mode = mode
-        
-        if mode == 'file' and not hasattr(self, 'fall_video_path'):
-            messagebox.showwarning("Warning", "Please select a video file first!")
-            return
-            
-        if mode == 'realtime':
-            if self.cap is None:
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        else:
-            self.video_capture = cv2.VideoCapture(self.fall_video_path)
-        
-        self.modules["fall_detection"]["active"] = True
-        self.add_alert(f"Fall detection started ({mode} mode)")
-        
-        self.select_fall_file_btn.config(state=tk.DISABLED)
-        self.start_fall_file_btn.config(state=tk.DISABLED)
-        self.start_fall_realtime_btn.config(state=tk.DISABLED)
-        self.stop_fall_btn.config(state=tk.NORMAL)
-    
-    def stop_fall_detection(self):
-        """Stop fall detection"""
-        self.modules["fall_detection"]["active"] = False
-        self.fall_detection_mode = None
-        
-        if self.video_capture is not None:
-            self.video_capture.release()
-            self.video_capture = None
-            
-        if self.cap is not None and not any(module["active"] for module in self.modules.values()):
-            self.cap.release()
-            self.cap = None
-        
-        self.add_alert("Fall detection stopped")
-        
-        self.select_fall_file_btn.config(state=tk.NORMAL)
-        self.start_fall_file_btn.config(state=tk.NORMAL if hasattr(self, 'fall_video_path') else tk.DISABLED)
-        self.start_fall_realtime_btn.config(state=tk.NORMAL)
-        self.stop_fall_btn.config(state=tk.DISABLED)
     
     def add_alert(self, message, is_important=False):
         """Add message to alert log"""
@@ -1023,249 +1245,294 @@ class SecuritySystemApp:
         """Show popup alert window"""
         AlertWindow(self.root, message)
     
-    def process_weapon_detection(self, frame):
+    def process_weapon_detection(self, frame, infer=True):
         """Process frame for weapon detection with 5-second alert delay"""
-        display_frame = frame.copy()
-        weapon_detected = False
-        
-        results = self.weapon_model(frame, stream=True, conf=self.confidence_var.get(), verbose=False)
-        
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = box.conf[0].item()
-                cls = int(box.cls[0])
-                label = self.weapon_model.names[cls]
-                
-                if label.lower() == "weapon":
-                    weapon_detected = True
-                    
-                    cv2.rectangle(display_frame, (x1, y1), (x2, y2), (255, 0, 255), 3)
-                    cv2.putText(display_frame, f'{label} {confidence:.2f}', (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                    
-                    current_time = time.time()
-                    if current_time - self.weapon_alert_time > self.alert_cooldown:
-                        alert_message = "🚨 Weapon detected!"
-                        self.add_alert(alert_message, is_important=True)
-                        try:
-                            response = requests.get("http://127.0.0.1:8000/weapon_alert")
-                            self.weapon_alert_time = current_time
-                        except requests.exceptions.RequestException as e:
-                            self.add_alert(f"Error sending alert: {e}")
-        
-        if not weapon_detected:
-            self.weapon_alert_sent = False
+        scene = Scene()
+        module = self.modules["weapon_detection"]
+        table = self.class_table("weapon_model")
+
+        if infer:
+            conf = self.confidence_var.get()
+            stages = []
+            if self.weapon_crops_var.get():
+                stages.append(self.detect_weapons_on_people(frame, self.inference_conf(conf)))
+            if self.weapon_full_pass_var.get():
+                stages.append(self.run_model("weapon_model", frame, conf=self.inference_conf(conf)).of_class(table, "weapon"))
+            detections = Detections.concat(stages).nms()
+            detections = self.record("weapon_detection", detections).above(conf)
+            module["last"] = detections
+
+            if len(detections):
+                current_time = time.time()
+                if current_time - self.weapon_alert_time > self.alert_cooldown:
+                    alert_message = "🚨 Weapon detected!"
+                    self.add_alert(alert_message, is_important=True)
+                    self.record_alert("weapon_detection", alert_message)
+                    error = self.send_backend_alert("weapon_alert")
+                    if error is None:
+                        self.weapon_alert_time = current_time
+                    else:
+                        self.add_alert(f"Error sending alert: {error}")
+            else:
+                self.weapon_alert_sent = False
+
+        detections = module["last"]
+        if not detections:
+            return scene
+        scene.add_boxes(detections.xyxy, "weapon",
+                        [f'{label} {c:.2f}' for label, c in zip(detections.labels(table), detections.conf)])
         
-        return display_frame
+        return scene
     
-    def process_trespassing_detection(self, frame):
+    def detect_people(self, frame, conf=PERSON_CONF):
+        """Run the yolo11n person pass once per frame and share it between modules.
+
+        The pass goes down to the recording floor while recording; callers get
+        the people above ``conf`` (all of them with None).
+        """
+        if self.person_cache is None or self.person_cache[0] != self.frame_index:
+            person_ids = self.class_table("person_model").ids("person")
+            people = self.run_model("person_model", frame, conf=self.inference_conf(PERSON_CONF),
+                                    classes=person_ids.tolist())
+            self.person_cache = (self.frame_index, people)
+        people = self.person_cache[1]
+        return people if conf is None else people.above(conf)
+
+    def detect_weapons_on_people(self, frame, conf, imgsz=320):
+        """Second stage: batch full-resolution person crops through weapon_model.
+
+        Boxes are mapped back to ``frame`` coordinates.
+        """
+        people = self.detect_people(frame)
+        if len(people) == 0:
+            return Detections()
+        full = self.full_frame if self.full_frame is not None else frame
+        sx = full.shape[1] / float(frame.shape[1])
+        sy = full.shape[0] / float(frame.shape[0])
+        crops, offsets, _ = crop_batch(full, people.xyxy * np.array([sx, sy, sx, sy], dtype=np.float32), margin=0.25)
+        if not crops:
+            return Detections()
+
+        results = self.run_model("weapon_model", crops, conf=conf, imgsz=imgsz)
+        weapons = Detections.concat([d.translate(ox, oy, 1 / sx, 1 / sy) for d, (ox, oy) in zip(results, offsets)])
+        return weapons.of_class(self.class_table("weapon_model"), "weapon")
+
+    def process_trespassing_detection(self, frame, infer=True):
         """Process frame for trespassing detection with 5-second alert delay"""
-        display_frame = frame.copy()
+        scene = Scene()
         height, width = frame.shape[:2]
-        person_detected_on_track = False
-        
-        track_results = self.track_model(frame, verbose=False)[0]
-        track_mask = None
-
-        if track_results.masks:
-            masks = track_results.masks.data.cpu().numpy()
-            combined_mask = np.any(masks > 0.5, axis=0).astype(np.uint8)
-            mask_resized = cv2.resize(combined_mask, (width, height))
-            track_mask = mask_resized
-
-            colored_mask = np.zeros_like(frame)
-            colored_mask[track_mask == 1] = (0, 0, 255)
-            display_frame = cv2.addWeighted(display_frame, 1.0, colored_mask, 0.5, 0)
-
-        person_results = self.person_model(frame, verbose=False)[0]
-
-        for box in person_results.boxes:
-            cls = int(box.cls[0])
-            if self.person_model.names[cls] == 'person':
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-
-                cv2.circle(display_frame, (cx, cy), 5, (0, 255, 0), -1)
-                cv2.putText(display_frame, "Person", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-                if track_mask is not None and track_mask[cy, cx] == 1:
-                    person_detected_on_track = True
-
-        current_time = time.time()
-        if person_detected_on_track and current_time - self.trespassing_alert_time > self.alert_cooldown:
-            alert_message = "🚨 Person detected on railway track!"
-            self.add_alert(alert_message, is_important=True)
-            try:
-                res = requests.get("http://127.0.0.1:8000/track_alert")
-                self.trespassing_alert_time = current_time
-            except Exception as e:
-                self.add_alert(f"Failed to send alert: {e}")
-        elif not person_detected_on_track:
-            self.trespassing_alert_sent = False
-        
-        return display_frame
+        module = self.modules["trespassing_detection"]
+
+        if infer:
+            person_detected_on_track = False
+            track_results = self.predict("track_model", frame)[0]
+            track_mask = None
+
+            if track_results.masks:
+                masks = track_results.masks.data
+                masks = masks.cpu().numpy() if hasattr(masks, "cpu") else masks
+                combined_mask = np.any(masks > 0.5, axis=0).astype(np.uint8)
+                track_mask = cv2.resize(combined_mask, (width, height))
+
+            people = self.record("trespassing_detection", self.detect_people(frame, conf=None), model="person_model")
+            people = people.above(PERSON_CONF)
+            if track_mask is not None and len(people):
+                centers = people.centers()
+                cx = np.clip(centers[:, 0], 0, width - 1)
+                cy = np.clip(centers[:, 1], 0, height - 1)
+                person_detected_on_track = bool((track_mask[cy, cx] == 1).any())
+            module["last"] = (None if track_mask is None else track_mask == 1, people)
+
+            current_time = time.time()
+            if person_detected_on_track and current_time - self.trespassing_alert_time > self.alert_cooldown:
+                alert_message = "🚨 Person detected on railway track!"
+                self.add_alert(alert_message, is_important=True)
+                self.record_alert("trespassing_detection", alert_message)
+                error = self.send_backend_alert("track_alert")
+                if error is None:
+                    self.trespassing_alert_time = current_time
+                else:
+                    self.add_alert(f"Failed to send alert: {error}")
+            elif not person_detected_on_track:
+                self.trespassing_alert_sent = False
+
+        if module["last"] is None:
+            return scene
+        track_mask, people = module["last"]
+        scene.overlay(track_mask, (0, 0, 255), alpha=0.5)
+        scene.add_points(people.centers(), "person")
+        scene.add_labels(people.xyxy, "person", ["Person"] * len(people))
+        
+        return scene
     
-    def process_fall_detection(self, frame):
-        """Process frame for fall detection with 5-second alert delay"""
+    def process_fall_detection(self, frame, infer=True):
+        """Process frame for fall detection as a person -> posture -> fall_model cascade"""
+        scene = Scene()
         if self.fall_model is None:
-            return frame
-            
-        display_frame = frame.copy()
-        fall_detected = False
-        
-        results = self.fall_model(frame, stream=True, conf=self.fall_confidence_var.get(), verbose=False)
-        
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = box.conf[0].item()
-                cls = int(box.cls[0])
-                label = self.fall_model.names[cls]
-                
-                if label.lower() == "fall-detected":
-                    fall_detected = True
-                    
-                    # Draw bounding box in red for fall detection
-                    cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-                    cv2.putText(display_frame, f'FALL {confidence:.2f}', (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    
-                    current_time = time.time()
-                    if current_time - self.fall_alert_time > self.alert_cooldown:
-                        alert_message = "🚨 Fall detected!"
-                        self.add_alert(alert_message, is_important=True)
-                        try:
-                            response = requests.get("http://127.0.0.1:8000/fall_alert")
-                            self.fall_alert_time = current_time
-                        except requests.exceptions.RequestException as e:
-                            self.add_alert(f"Error sending alert: {e}")
-                elif label.lower() == "nofall":
-                    # Draw bounding box in green for no-fall
-                    cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.putText(display_frame, f'No Fall {confidence:.2f}', (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        return display_frame
+            return scene
+
+        module = self.modules["fall_detection"]
+        table = self.class_table("fall_model")
+
+        if infer:
+            # Stage 1: shared person pass; empty frames stop here
+            people = self.detect_people(frame)
+            track_ids = self.fall_tracker.update(people.xyxy, self.frame_time)
+            people = Detections(people.xyxy, people.conf, people.cls, track_ids)
+
+            # Stage 2: cheap posture screen per track
+            suspects = self.fall_posture.suspects([self.fall_tracker.tracks[t] for t in track_ids], self.frame_time)
+            suspect = np.isin(track_ids, [t.track_id for t in suspects])
+
+            # Stage 3: suspicious person crops batched through fall_model in one call
+            conf = self.fall_confidence_var.get()
+            found = Detections()
+            crops, offsets, _ = crop_batch(frame, people.xyxy[suspect])
+            if crops:
+                results = self.run_model("fall_model", crops, conf=self.inference_conf(conf))
+                found = Detections.concat([d.translate(ox, oy) for d, (ox, oy) in zip(results, offsets)])
+                found = found.of_class(table, "fall-detected", "nofall")
+            found = self.record("fall_detection", found).above(conf)
+            module["last"] = (people[~suspect], found)
+
+            if table.mask("fall-detected")[found.cls].any():
+                current_time = time.time()
+                if current_time - self.fall_alert_time > self.alert_cooldown:
+                    alert_message = "🚨 Fall detected!"
+                    self.add_alert(alert_message, is_important=True)
+                    self.record_alert("fall_detection", alert_message)
+                    error = self.send_backend_alert("fall_alert")
+                    if error is None:
+                        self.fall_alert_time = current_time
+                    else:
+                        self.add_alert(f"Error sending alert: {error}")
+
+        if module["last"] is None:
+            return scene
+        cleared, found = module["last"]
+        # People cleared by the posture check without running fall_model
+        scene.add_boxes(cleared.xyxy, "person_cleared")
+        is_fall = table.mask("fall-detected")[found.cls]
+        fallen, upright = found[is_fall], found[~is_fall]
+        scene.add_boxes(fallen.xyxy, "fall", [f'FALL {c:.2f}' for c in fallen.conf])
+        scene.add_boxes(upright.xyxy, "no_fall", [f'No Fall {c:.2f}' for c in upright.conf])
+        
+        return scene
     
+    def read_frame(self):
+        """Read the next frame for the first active module's source"""
+        for name, module in self.modules.items():
+            if not module["active"]:
+                continue
+            if module["mode"] == 'realtime' and self.camera is not None:
+                # Never wait on the Tk thread; update_video polls again in 10 ms
+                ret, frame = self.camera.read(timeout=0)
+                self.frame_source, self.frame_time = self.camera.key, self.camera.timestamp
+                self.source_frame_index = self.camera.seq
+                self.full_frame = frame if ret else None
+                return frame if ret else None
+            if self.video_capture is not None:
+                ret, frame = self.video_capture.read()
+                self.frame_source = self.video_capture.path
+                self.frame_time = self.video_capture.timestamp_ms / 1000.0
+                self.source_frame_index = self.video_capture.frame_index
+                self.full_frame = self.video_capture.full_frame
+                if not ret:
+                    self.stop_detection(name, finished=True)
+                    return None
+                return frame
+            return None
+        return None
+
+    def show_frame(self, name, frame):
+        """Show a processed BGR frame in a module's feed"""
+        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        img = Image.fromarray(img)
+        imgtk = ImageTk.PhotoImage(image=img)
+        label = self.modules[name]["video_label"]
+        label.imgtk = imgtk
+        label.configure(image=imgtk)
+
+    def report_deadline_misses(self):
+        """Log scheduler deadline misses at most every 10 seconds"""
+        if time.time() - self.scheduler_report_time < 10:
+            return
+        self.scheduler_report_time = time.time()
+        for (name, camera), count in self.scheduler.new_misses().items():
+            self.add_alert(f"Scheduler: {self.modules[name]['title']} missed {count} deadline(s) on {camera}")
+
+    def report_stream_health(self):
+        """Log camera reconnects as they happen"""
+        for camera, message in self.sources.new_events():
+            health = self.sources.health().get(camera, {})
+            self.add_alert(f"{camera}: {message} (reconnects: {health.get('reconnects', 0)}, "
+                           f"errors: {health.get('decode_errors', 0)})")
+
+    def toggle_profiler(self, duration=30.0):
+        """Start a sampling session of ``duration`` seconds, or end the running one early"""
+        if self.profiler.running:
+            self.profiler.stop()
+        else:
+            self.profiler.start(duration=duration)
+            self.add_alert(f"Profiling for {duration:.0f} s (Ctrl+Alt+P to stop)")
+
+    def report_profile(self):
+        """Announce a finished profiling session once"""
+        path = self.profiler.path
+        if path is None or path == self.profile_reported or self.profiler.running:
+            return
+        self.profile_reported = path
+        top = ", ".join(f"{group} {100 * share:.0f}%" for share, group in self.profiler.summary())
+        self.add_alert(f"Profile written to {path} ({self.profiler.samples} samples, "
+                       f"{100 * self.profiler.overhead():.2f}% sampler overhead): {top}")
+
+    def refresh_memory_label(self):
+        usage = self.memory.usage()
+        self.memory_label.config(text=self.memory.summary() + f" (process {usage['rss']:.0f} MB)")
+        self.root.after(2000, self.refresh_memory_label)
+
+    def analyse_frame(self, frame):
+        """Run every active module on a 640x480 frame; returns each module's annotated frame"""
+        self.current_frame = frame
+        rendered = {}
+        active = [name for name, module in self.modules.items() if module["active"]]
+        granted = self.scheduler.plan(self.frame_time, [(name, self.frame_source) for name in active])
+        granted = {task[0] for task in granted}
+        for name in active:
+            infer = name in granted
+            self.profiler.tag(name, "inference" if infer else "redraw")
+            start = time.perf_counter()
+            scene = self.modules[name]["process"](frame, infer=infer)
+            if infer:
+                self.scheduler.completed((name, self.frame_source), self.frame_time,
+                                         time.perf_counter() - start)
+            # Drawing is timed separately by the renderer
+            self.profiler.tag(name, "draw")
+            rendered[name] = self.renderer.render(frame, scene, name)
+            module = self.modules[name]
+            if module["mode"] == 'file' and self.checkpoints.due(module["video_path"], name, self.frame_time):
+                self.save_checkpoint(name)
+        self.profiler.tag(None)
+        self.memory.set_buffer("frame tensors", self.frame_tensors.nbytes)
+        self.memory.set_buffer("overlay buffers", self.renderer.nbytes())
+        self.frame_tensors.retire(self.frame_index)
+        return rendered
+
     def update_video(self):
         """Main video update loop"""
         if self.running:
-            frame = None
-            if self.modules["weapon_detection"]["active"]:
-                if self.weapon_detection_mode == 'realtime' and self.cap is not None:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        frame = None
-                elif self.video_capture is not None:
-                    ret, frame = self.video_capture.read()
-                    if not ret:
-                        self.stop_weapon_detection()
-                        frame = None
-            elif self.modules["trespassing_detection"]["active"]:
-                if self.trespassing_detection_mode == 'realtime' and self.cap is not None:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        frame = None
-                elif self.video_capture is not None:
-                    ret, frame = self.video_capture.read()
-                    if not ret:
-                        self.stop_trespassing_detection()
-                        frame = None
-            elif self.modules["fall_detection"]["active"]:
-                if self.fall_detection_mode == 'realtime' and self.cap is not None:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        frame = None
-                elif self.video_capture is not None:
-                    ret, frame = self.video_capture.read()
-                    if not ret:
-                        self.stop_fall_detection()
-                        frame = None
-            elif self.modules["crowd_detection"]["active"]:
-                if self.crowd_detection_mode == 'realtime' and self.cap is not None:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        frame = None
-                elif self.video_capture is not None:
-                    ret, frame = self.video_capture.read()
-                    if not ret:
-                        self.stop_crowd_detection()
-                        frame = None
-            elif self.modules["fire_detection"]["active"]:
-                if self.fire_detection_mode == 'realtime' and self.cap is not None:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        frame = None
-                elif self.video_capture is not None:
-                    ret, frame = self.video_capture.read()
-                    if not ret:
-                        self.stop_fire_detection()
-                        frame = None
-            elif self.modules["dustbin_detection"]["active"]:
-                if self.dustbin_detection_mode == 'realtime' and self.cap is not None:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        frame = None
-                elif self.video_capture is not None:
-                    ret, frame = self.video_capture.read()
-                    if not ret:
-                        self.stop_dustbin_detection()
-                        frame = None
+            frame = self.read_frame()
             
             if frame is not None:
-                frame = cv2.resize(frame, (640, 480))
-                
-                if self.modules["weapon_detection"]["active"]:
-                    processed_frame = self.process_weapon_detection(frame)
-                    img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(img)
-                    imgtk = ImageTk.PhotoImage(image=img)
-                    self.weapon_video_label.imgtk = imgtk
-                    self.weapon_video_label.configure(image=imgtk)
-                
-                if self.modules["trespassing_detection"]["active"]:
-                    processed_frame = self.process_trespassing_detection(frame)
-                    img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(img)
-                    imgtk = ImageTk.PhotoImage(image=img)
-                    self.trespassing_video_label.imgtk = imgtk
-                    self.trespassing_video_label.configure(image=imgtk)
-                
-                if self.modules["fall_detection"]["active"]:
-                    processed_frame = self.process_fall_detection(frame)
-                    img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(img)
-                    imgtk = ImageTk.PhotoImage(image=img)
-                    self.fall_video_label.imgtk = imgtk
-                    self.fall_video_label.configure(image=imgtk)
-
-                if self.modules["crowd_detection"]["active"]:
-                    processed_frame = self.process_crowd_detection(frame)
-                    img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(img)
-                    imgtk = ImageTk.PhotoImage(image=img)
-                    self.crowd_video_label.imgtk = imgtk
-                    self.crowd_video_label.configure(image=imgtk)
-
-                if self.modules["fire_detection"]["active"]:
-                    processed_frame = self.process_fire_detection(frame)
-                    img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(img)
-                    imgtk = ImageTk.PhotoImage(image=img)
-                    self.fire_video_label.imgtk = imgtk
-                    self.fire_video_label.configure(image=imgtk)
-
-                if self.modules["dustbin_detection"]["active"]:
-                    processed_frame = self.process_dustbin_detection(frame)
-                    img = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(img)
-                    imgtk = ImageTk.PhotoImage(image=img)
-                    self.dustbin_video_label.imgtk = imgtk
-                    self.dustbin_video_label.configure(image=imgtk)
+                self.frame_index += 1
+                if frame.shape[1] != 640 or frame.shape[0] != 480:
+                    frame = cv2.resize(frame, (640, 480))
+                for name, rendered in self.analyse_frame(frame).items():
+                    self.show_frame(name, rendered)
+                self.report_deadline_misses()
+        self.report_stream_health()
+        self.report_profile()
+        self.sources.sweep()
         
         self.root.after(10, self.update_video)
     
@@ -1273,10 +1540,11 @@ class SecuritySystemApp:
         """Cleanup and exit application"""
         self.running = False
         
-        if self.cap is not None:
-            self.cap.release()
+        self.sources.close()
         if self.video_capture is not None:
             self.video_capture.release()
+        if self.recorder is not None:
+            self.recorder.close()
         
         self.root.destroy()
 
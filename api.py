@@ -1,7 +1,21 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import time
+from typing import Dict
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from occupancy import StationOccupancy, load_config
 
 app = FastAPI()
 
+# Station-wide occupancy from the consoles' crowd counts (see occupancy.py)
+occupancy = StationOccupancy(load_config()["thresholds"])
+# One queue per connected /occupancy/events stream
+subscribers = set()
+
 # API endpoint to send an alert when a weapon is detected
 @app.get("/weapon_alert")
 def send_weapon_alert():
@@ -28,6 +42,61 @@ def crime_alert():
     print(f"⚠️ ALERT: Criminal Activity Detected!!")
     return {"alert": "Crime activity detected and alert triggered!"}
 
+class OccupancyReport(BaseModel):
+    camera: str
+    zones: Dict[str, int]
+
+
+def publish(events):
+    """Print threshold events and push them to every event stream"""
+    for event in events:
+        print(f"⚠️ OCCUPANCY: {event['area']} {event['state']} {event['threshold']} (smoothed {event['ewma']:.0f})")
+        for queue in subscribers:
+            if not queue.full():
+                queue.put_nowait(event)
+    return events
+
+
+@app.on_event("startup")
+async def expire_quiet_cameras():
+    async def loop():
+        while True:
+            await asyncio.sleep(5.0)
+            publish(occupancy.tick(time.time()))
+    asyncio.get_running_loop().create_task(loop())
+
+
+# API endpoint a console posts its per-zone crowd counts to (about once a second)
+@app.post("/occupancy")
+async def report_occupancy(report: OccupancyReport):
+    return {"events": publish(occupancy.report(report.camera, report.zones, time.time()))}
+
+@app.get("/occupancy")
+async def station_occupancy():
+    return occupancy.snapshot(time.time())
+
+# Server-sent events: one `data: {...}` line per threshold crossing
+@app.get("/occupancy/events")
+async def occupancy_events():
+    queue = asyncio.Queue(maxsize=100)
+
+    async def stream():
+        subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            subscribers.discard(queue)
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.get("/occupancy/{area}")
+async def area_occupancy(area: str):
+    snapshot = occupancy.snapshot(time.time(), area)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No counts for {area}")
+    return snapshot
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
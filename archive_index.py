@@ -0,0 +1,287 @@
+"""Persistent search index over recorded detections and alerts.
+
+Detection logs written in record mode (``recording.py``) are ingested into a
+SQLite database with one row per detection and per alert. Rows are keyed by
+absolute time, with secondary indexes on camera, module, class and a coarse
+spatial cell of the box's foot point, so typical archive questions are index
+lookups instead of rescans of the raw logs::
+
+    python archive_index.py build archive.db recordings/*.detlog --start-time 2025-03-01T00:00
+    python archive_index.py query archive.db --label person --module trespassing \\
+        --zone "track 2" --zones zones.json --from 2025-03-01T02:00 --to 2025-03-01T04:00 --frames
+    python archive_index.py query archive.db --label smoke --min-conf 0.6 --since 7d
+
+``zones.json`` names regions per camera in 640x480 frame pixels, e.g.
+``{"platform3.mp4": {"track 2": [0, 300, 640, 480]}}``. Ingesting is
+incremental: re-running ``build`` only adds runs appended since last time,
+and re-reads a log from the point it was rolled back to when a file run was
+resumed from a checkpoint in between.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+import numpy as np
+
+from recording import DetectionLog
+
+# Spatial cells over the 640x480 analysis frame
+CELL = 32
+FRAME_SIZE = (640, 480)
+GRID_COLS = FRAME_SIZE[0] // CELL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (path TEXT PRIMARY KEY, runs INTEGER, alerts INTEGER, generation INTEGER DEFAULT 0);
+CREATE TABLE IF NOT EXISTS detections (
+    time REAL, camera TEXT, module TEXT, label TEXT, conf REAL, frame INTEGER,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL, cell INTEGER, log INTEGER, run INTEGER
+);
+CREATE TABLE IF NOT EXISTS alerts (time REAL, camera TEXT, module TEXT, frame INTEGER, message TEXT,
+                                   log INTEGER, seq INTEGER);
+CREATE INDEX IF NOT EXISTS det_time ON detections (time);
+CREATE INDEX IF NOT EXISTS det_camera ON detections (camera, time);
+CREATE INDEX IF NOT EXISTS det_module ON detections (module, time);
+CREATE INDEX IF NOT EXISTS det_label ON detections (label, conf);
+CREATE INDEX IF NOT EXISTS det_cell ON detections (cell, time);
+CREATE INDEX IF NOT EXISTS alert_time ON alerts (time);
+CREATE INDEX IF NOT EXISTS alert_module ON alerts (module, time);
+"""
+# Added after the first release; older databases get them on open (their existing rows stay NULL)
+COLUMNS = {"logs": [("generation", "INTEGER DEFAULT 0")],
+           "detections": [("log", "INTEGER"), ("run", "INTEGER")],
+           "alerts": [("log", "INTEGER"), ("seq", "INTEGER")]}
+LOG_INDEXES = """
+CREATE INDEX IF NOT EXISTS det_log ON detections (log, run);
+CREATE INDEX IF NOT EXISTS alert_log ON alerts (log, seq);
+"""
+
+
+def foot_cells(xyxy):
+    """Spatial cell of each box's bottom-centre point"""
+    fx = np.clip(((xyxy[:, 0] + xyxy[:, 2]) * 0.5) // CELL, 0, GRID_COLS - 1)
+    fy = np.clip(xyxy[:, 3] // CELL, 0, FRAME_SIZE[1] // CELL - 1)
+    return (fy * GRID_COLS + fx).astype(np.int64)
+
+
+def region_cells(region):
+    """Cells overlapping an x1, y1, x2, y2 region"""
+    x1, y1, x2, y2 = region
+    cols = range(max(0, int(x1 // CELL)), min(GRID_COLS, int(x2 // CELL) + 1))
+    rows = range(max(0, int(y1 // CELL)), min(FRAME_SIZE[1] // CELL, int(y2 // CELL) + 1))
+    return [r * GRID_COLS + c for r in rows for c in cols]
+
+
+def parse_time(value):
+    """ISO time, epoch seconds, or a relative ``7d`` / ``12h`` / ``30m`` before now"""
+    if value is None:
+        return None
+    units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+    if value[-1] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class ArchiveIndex:
+    """SQLite-backed index of detection and alert records"""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        for table, columns in COLUMNS.items():
+            existing = {row[1] for row in self.db.execute(f"PRAGMA table_info({table})")}
+            for name, kind in columns:
+                if name not in existing:
+                    self.db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+        self.db.executescript(LOG_INDEXES)
+
+    def add_log(self, log_path, start_time=None):
+        """Ingest runs and alerts added to ``log_path`` since the last call.
+
+        Camera sources are stamped in wall time already. File sources are
+        stamped in video time and are offset by ``start_time`` (epoch
+        seconds), defaulting to when the log was created. When the log was
+        rolled back since (a resumed file run), the rows from the rollback
+        point on are dropped and read again.
+        """
+        log = DetectionLog(log_path)
+        key = os.path.abspath(log_path)
+        self.db.execute("INSERT OR IGNORE INTO logs (path, runs, alerts, generation) VALUES (?, 0, 0, 0)", (key,))
+        log_id, done_runs, done_alerts, done_generation = self.db.execute(
+            "SELECT rowid, runs, alerts, generation FROM logs WHERE path = ?", (key,)).fetchone()
+        generation = log.meta.get("generation", 0)
+        if generation != done_generation:
+            for rolled, runs, alerts in log.meta.get("rollbacks", []):
+                if rolled > done_generation:
+                    done_runs, done_alerts = min(done_runs, runs), min(done_alerts, alerts)
+            self.db.execute("DELETE FROM detections WHERE log = ? AND run >= ?", (log_id, done_runs))
+            self.db.execute("DELETE FROM alerts WHERE log = ? AND seq >= ?", (log_id, done_alerts))
+        offset = log.meta.get("created", 0.0) if start_time is None else start_time
+        modules, sources = log.meta["modules"], log.meta["sources"]
+        labels = {m: {int(k): v for k, v in names.items()} for m, names in log.meta["classes"].items()}
+
+        def stamp(source, t):
+            return t if source.startswith("camera:") else offset + t
+
+        rows = []
+        for run in range(done_runs, len(log)):
+            detections = log.detections(run)
+            if not len(detections):
+                continue
+            module = modules[int(log.runs["module"][run])]
+            source = sources[int(log.runs["source"][run])]
+            t = stamp(source, float(log.runs["time"][run]))
+            frame = int(log.runs["frame_index"][run])
+            names = labels.get(module, {})
+            cells = foot_cells(detections.xyxy)
+            for (x1, y1, x2, y2), conf, cls, cell in zip(detections.xyxy.tolist(), detections.conf.tolist(),
+                                                         detections.cls.tolist(), cells.tolist()):
+                rows.append((t, source, module, names.get(cls, str(cls)), conf, frame, x1, y1, x2, y2, cell,
+                             log_id, run))
+        self.db.executemany("INSERT INTO detections (time, camera, module, label, conf, frame, x1, y1, x2, y2, "
+                            "cell, log, run) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        alerts = log.alerts()
+        self.db.executemany("INSERT INTO alerts (time, camera, module, frame, message, log, seq) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            (stamp(a["source"], a["time"]), a["source"], a["module"], a["frame_index"], a["message"], log_id, seq)
+            for seq, a in enumerate(alerts[done_alerts:], start=done_alerts)])
+        self.db.execute("UPDATE logs SET runs = ?, alerts = ?, generation = ? WHERE rowid = ?",
+                        (len(log), len(alerts), generation, log_id))
+        self.db.commit()
+        return len(rows)
+
+    @staticmethod
+    def _filters(start, end, camera, module):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("time >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("time <= ?")
+            params.append(end)
+        if camera is not None:
+            clauses.append("camera LIKE ?")
+            params.append(f"%{camera}")
+        if module is not None:
+            clauses.append("(module = ? OR module = ?)")
+            params += [module, f"{module}_detection"]
+        return clauses, params
+
+    def query(self, start=None, end=None, camera=None, module=None, label=None, min_conf=None,
+              region=None, limit=None):
+        """Detections matching every given filter, oldest first.
+
+        ``region`` is an x1, y1, x2, y2 box; a detection matches when its
+        foot point lies inside it.
+        """
+        clauses, params = self._filters(start, end, camera, module)
+        if label is not None:
+            clauses.append("label = ? COLLATE NOCASE")
+            params.append(label)
+        if min_conf is not None:
+            clauses.append("conf >= ?")
+            params.append(min_conf)
+        if region is not None:
+            cells = region_cells(region)
+            clauses.append(f"cell IN ({', '.join('?' * len(cells))})")
+            params += cells
+            clauses.append("(x1 + x2) / 2 BETWEEN ? AND ? AND y2 BETWEEN ? AND ?")
+            params += [region[0], region[2], region[1], region[3]]
+        sql = "SELECT time, camera, module, label, conf, frame, x1, y1, x2, y2 FROM detections"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY time"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.db.execute(sql, params).fetchall()
+
+    def frames(self, **filters):
+        """Distinct (camera, frame, time) with at least one matching detection"""
+        seen, frames = set(), []
+        for t, camera, _, _, _, frame, *_ in self.query(**filters):
+            if (camera, frame) not in seen:
+                seen.add((camera, frame))
+                frames.append((camera, frame, t))
+        return frames
+
+    def alerts(self, start=None, end=None, camera=None, module=None):
+        clauses, params = self._filters(start, end, camera, module)
+        sql = "SELECT time, camera, module, frame, message FROM alerts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self.db.execute(sql + " ORDER BY time", params).fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+def load_zone(zones_path, name, camera=None):
+    """Look up a named region, preferring the given camera's definition"""
+    with open(zones_path) as f:
+        zones = json.load(f)
+    for cam, regions in zones.items():
+        if name in regions and (camera is None or camera.endswith(cam)):
+            return regions[name]
+    raise KeyError(f"Zone {name!r} not found in {zones_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the detection archive index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Ingest detection logs")
+    build.add_argument("db")
+    build.add_argument("logs", nargs="+")
+    build.add_argument("--start-time", help="Wall time of frame 0 for file sources (ISO or epoch)")
+    query = sub.add_parser("query", help="Search detections or alerts")
+    query.add_argument("db")
+    query.add_argument("--from", dest="start")
+    query.add_argument("--to", dest="end")
+    query.add_argument("--since", help="Relative start, e.g. 7d or 12h")
+    query.add_argument("--camera")
+    query.add_argument("--module")
+    query.add_argument("--label")
+    query.add_argument("--min-conf", type=float)
+    query.add_argument("--zone", help="Named region from --zones")
+    query.add_argument("--zones", default="zones.json")
+    query.add_argument("--frames", action="store_true", help="List matching frames instead of detections")
+    query.add_argument("--alerts", action="store_true", help="Search alerts instead of detections")
+    query.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    index = ArchiveIndex(args.db)
+    if args.command == "build":
+        start_time = parse_time(args.start_time)
+        for path in args.logs:
+            print(f"{path}: {index.add_log(path, start_time)} new detections")
+        return
+
+    start = parse_time(args.since) if args.since else parse_time(args.start)
+    end = parse_time(args.end)
+    began = time.perf_counter()
+    if args.alerts:
+        rows = index.alerts(start, end, args.camera, args.module)
+        for t, camera, module, frame, message in rows:
+            print(f"{datetime.fromtimestamp(t):%Y-%m-%d %H:%M:%S} {camera} #{frame} {module}: {message}")
+    else:
+        region = load_zone(args.zones, args.zone, args.camera) if args.zone else None
+        filters = dict(start=start, end=end, camera=args.camera, module=args.module, label=args.label,
+                       min_conf=args.min_conf, region=region, limit=args.limit)
+        if args.frames:
+            rows = index.frames(**filters)
+            for camera, frame, t in rows:
+                print(f"{datetime.fromtimestamp(t):%Y-%m-%d %H:%M:%S} {camera} #{frame}")
+        else:
+            rows = index.query(**filters)
+            for t, camera, module, label, conf, frame, x1, y1, x2, y2 in rows:
+                print(f"{datetime.fromtimestamp(t):%Y-%m-%d %H:%M:%S} {camera} #{frame} {module} {label} "
+                      f"{conf:.2f} [{x1:.0f}, {y1:.0f}, {x2:.0f}, {y2:.0f}]")
+    print(f"{len(rows)} result(s) in {1000 * (time.perf_counter() - began):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
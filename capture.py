@@ -0,0 +1,474 @@
+import threading
+import queue
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+
+class FrameReader:
+    """Prefetching video file reader that only decodes the frames it returns.
+
+    Frames between analysed frames are skipped with ``grab()`` so they are
+    demuxed but never converted to BGR or copied out of the decoder. Decoding,
+    colour conversion and resizing happen on a background thread and are
+    handed over through a small queue. The reader exposes the same ``read()``
+    and ``release()`` calls as ``cv2.VideoCapture`` so it can be dropped into
+    the existing file-mode code paths. With ``keep_full`` the decoded
+    full-resolution frame is kept alongside the resized one as ``full_frame``.
+    """
+
+    # Beyond this many skipped frames a container seek is cheaper than grabbing
+    SEEK_STRIDE = 250
+
+    def __init__(self, path, size=(640, 480), stride=1, target_fps=None, prefetch=8, hw_accel=True,
+                 keep_full=False):
+        self.path = path
+        self.size = size
+        self.keep_full = keep_full
+        self.full_frame = None
+        self.cap = self._open(path, hw_accel)
+        self.source_fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if target_fps:
+            stride = max(1, int(round(self.source_fps / float(target_fps))))
+        self.stride = max(1, int(stride))
+
+        # Index and timestamp of the last frame handed out by read()
+        self.frame_index = -1
+        self.timestamp_ms = 0.0
+
+        self._position = 0
+        self._generation = 0
+        self._eof = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._queue = queue.Queue(maxsize=max(1, prefetch))
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _open(path, hw_accel):
+        """Open the file, asking for hardware decoding when this OpenCV build supports it"""
+        if hw_accel and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            try:
+                cap = cv2.VideoCapture(path, cv2.CAP_ANY,
+                                       [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+                if cap.isOpened():
+                    return cap
+            except cv2.error:
+                pass
+        return cv2.VideoCapture(path)
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def _skip(self, count):
+        """Advance ``count`` frames without decoding them to BGR"""
+        if count <= 0:
+            return True
+        if count >= self.SEEK_STRIDE:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self._position + count)
+            self._position += count
+            return self.frame_count <= 0 or self._position < self.frame_count
+        for _ in range(count):
+            if not self.cap.grab():
+                return False
+            self._position += 1
+        return True
+
+    def _decode_loop(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                generation = self._generation
+                if self._eof:
+                    frame = None
+                else:
+                    index = self._position
+                    ok, frame = self.cap.read()
+                    timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+                    self._position += 1
+                    if ok:
+                        ok = self._skip(self.stride - 1)
+                        self._eof = not ok
+                    else:
+                        frame = None
+                        self._eof = True
+
+            if frame is None:
+                self._put((generation, None, None, None, None))
+                # Nothing left to decode until someone seeks or releases
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            full = frame if self.keep_full else None
+            if self.size is not None and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+                frame = cv2.resize(frame, tuple(self.size), interpolation=cv2.INTER_AREA)
+            self._put((generation, index, timestamp, frame, full))
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if item[0] != self._generation:
+                    return
+
+    def read(self):
+        """Return ``(ok, frame)`` for the next analysed frame"""
+        while not self._stopped.is_set():
+            try:
+                generation, index, timestamp, frame, full = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if not self._thread.is_alive():
+                    return False, None
+                continue
+            if generation != self._generation:
+                continue
+            if frame is None:
+                return False, None
+            self.frame_index = index
+            self.timestamp_ms = timestamp
+            self.full_frame = full
+            return True, frame
+        return False, None
+
+    def seek(self, timestamp_ms=None, frame_index=None):
+        """Jump to a timestamp (ms) or frame index; prefetched frames are discarded"""
+        with self._lock:
+            self._generation += 1
+            if frame_index is None:
+                self.cap.set(cv2.CAP_PROP_POS_MSEC, float(timestamp_ms or 0))
+                frame_index = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+            else:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_index))
+            self._position = int(frame_index)
+            self._eof = False
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+        self._wake.set()
+
+    def release(self):
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join(timeout=1.0)
+        with self._lock:
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+
+
+class StreamWatchdog:
+    """Health checks and reconnect policy for one live stream.
+
+    A stream is considered broken when no frame has arrived for
+    ``stall_timeout`` seconds, after ``max_errors`` failed reads in a row,
+    when the picture has not changed for ``frozen_timeout`` seconds and at
+    least ``frozen_samples`` frames (a hung encoder keeps resending its last
+    frame; a sampled pixel moving by more than ``frozen_delta`` grey levels
+    counts as a change), or when the measured
+    rate stays below ``min_fps_ratio`` of the nominal rate. Reconnects back
+    off exponentially from ``backoff`` up to ``max_backoff`` seconds; the
+    delay resets once a connection has been healthy for ``fps_window``.
+    """
+
+    def __init__(self, nominal_fps=30.0, stall_timeout=3.0, max_errors=30, frozen_timeout=5.0,
+                 min_fps_ratio=0.3, fps_window=5.0, backoff=0.5, max_backoff=30.0, frozen_delta=1,
+                 frozen_samples=10):
+        self.nominal_fps = nominal_fps
+        self.stall_timeout = stall_timeout
+        self.max_errors = max_errors
+        self.frozen_timeout = frozen_timeout
+        self.frozen_delta = frozen_delta
+        self.frozen_samples = frozen_samples
+        self.min_fps_ratio = min_fps_ratio
+        self.fps_window = fps_window
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.started = time.monotonic()
+        self.connected_at = None
+        self.uptime = 0.0
+        self.attempts = 0
+        self.reconnects = 0
+        self.decode_errors = 0
+        self.consecutive_errors = 0
+        self.frozen = 0
+        self.last_frame = None
+        self.last_change = None
+        self.signature = None
+        self.unchanged = 0
+        self.times = deque()
+        self.events = deque(maxlen=100)
+
+    def connected(self, now):
+        self.connected_at = now
+        self.last_frame = self.last_change = now
+        self.consecutive_errors = 0
+        self.signature = None
+        self.unchanged = 0
+        self.times.clear()
+
+    def disconnected(self, now, reason):
+        if self.connected_at is not None:
+            self.uptime += now - self.connected_at
+        self.connected_at = None
+        self.reconnects += 1
+        self.events.append((now, f"{reason}, reconnecting"))
+
+    def next_backoff(self):
+        """Seconds to wait before the next connection attempt"""
+        delay = 0.0 if self.attempts == 0 else min(self.max_backoff, self.backoff * 2 ** (self.attempts - 1))
+        self.attempts += 1
+        return delay
+
+    def frame(self, frame, now):
+        self.last_frame = now
+        self.consecutive_errors = 0
+        self.times.append(now)
+        while self.times and now - self.times[0] > self.fps_window:
+            self.times.popleft()
+        # A sparse pixel sample, compared with the one taken at the last change so slow drift adds up;
+        # the tolerance absorbs decoder rounding on a re-sent frame
+        signature = frame[::32, ::32].astype(np.int16)
+        if self.signature is None or np.abs(signature - self.signature).max() > self.frozen_delta:
+            self.last_change = now
+            self.signature = signature
+            self.unchanged = 0
+        else:
+            self.unchanged += 1
+        if self.attempts and now - self.connected_at >= self.fps_window:
+            self.attempts = 0
+
+    def error(self, now):
+        self.decode_errors += 1
+        self.consecutive_errors += 1
+
+    def fps(self, now=None):
+        now = time.monotonic() if now is None else now
+        if len(self.times) < 2:
+            return 0.0
+        return (len(self.times) - 1) / max(now - self.times[0], 1e-6)
+
+    def problem(self, now):
+        """Why the stream should be reopened, or None while it looks healthy"""
+        if self.connected_at is None:
+            return None
+        if now - self.last_frame > self.stall_timeout:
+            return f"no frames for {now - self.last_frame:.0f} s"
+        if self.consecutive_errors >= self.max_errors:
+            return f"{self.consecutive_errors} failed reads"
+        if now - self.last_change > self.frozen_timeout and self.unchanged >= self.frozen_samples:
+            self.frozen += 1
+            return f"picture frozen for {now - self.last_change:.0f} s"
+        if now - self.connected_at > 2 * self.fps_window and self.fps(now) < self.min_fps_ratio * self.nominal_fps:
+            return f"rate fell to {self.fps(now):.1f} fps"
+        return None
+
+    def stats(self, now=None):
+        now = time.monotonic() if now is None else now
+        up = self.uptime + (now - self.connected_at if self.connected_at is not None else 0.0)
+        return {"connected": self.connected_at is not None, "uptime": up,
+                "availability": up / max(now - self.started, 1e-6), "fps": self.fps(now),
+                "decode_errors": self.decode_errors, "reconnects": self.reconnects, "frozen": self.frozen}
+
+
+class CameraSource:
+    """One live camera, read continuously on a background thread.
+
+    Only the newest frame is kept; a consumer that falls behind skips
+    straight to it instead of working through a backlog. ``device`` is a
+    camera index or a stream URL. A ``StreamWatchdog`` reopens the device
+    when it stalls, freezes or slows down.
+    """
+
+    def __init__(self, device=0, fps=30, size=(640, 480), watchdog=None):
+        self.device = device
+        self.fps = fps
+        self.size = size
+        self.watchdog = watchdog or StreamWatchdog(nominal_fps=fps)
+        self.cap = None
+        self.subscribers = 0
+        self.idle_since = time.monotonic()
+        self.frames = 0
+
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        params = []
+        # Bound how long a dead network stream can block open() and read()
+        for prop in ("CAP_PROP_OPEN_TIMEOUT_MSEC", "CAP_PROP_READ_TIMEOUT_MSEC"):
+            if hasattr(cv2, prop):
+                params += [getattr(cv2, prop), int(1000 * self.watchdog.stall_timeout)]
+        try:
+            cap = cv2.VideoCapture(self.device, cv2.CAP_ANY, params)
+        except (cv2.error, TypeError):
+            cap = cv2.VideoCapture(self.device)
+        cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.size is not None:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+        return cap
+
+    def _read_loop(self):
+        watchdog = self.watchdog
+        while not self._stopped.is_set():
+            if self.cap is None:
+                if self._stopped.wait(watchdog.next_backoff()):
+                    break
+                cap = self._open()
+                if not cap.isOpened():
+                    cap.release()
+                    watchdog.events.append((time.monotonic(), f"could not open {self.device}"))
+                    continue
+                self.cap = cap
+                watchdog.connected(time.monotonic())
+                continue
+
+            ok, frame = self.cap.read()
+            now = time.monotonic()
+            if ok:
+                watchdog.frame(frame, now)
+                with self._cond:
+                    self._frame = frame
+                    self._timestamp = time.time()
+                    self._seq += 1
+                    self.frames += 1
+                    self._cond.notify_all()
+            else:
+                watchdog.error(now)
+                time.sleep(0.01)
+
+            reason = watchdog.problem(now)
+            if reason is not None:
+                watchdog.disconnected(now, reason)
+                self.cap.release()
+                self.cap = None
+
+    def newest(self, after=0, timeout=None):
+        """``(seq, timestamp, frame)`` of the newest frame later than ``after``, or None on timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after or self._stopped.is_set(), timeout):
+                return None
+            if self._seq <= after:
+                return None
+            return self._seq, self._timestamp, self._frame
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def health(self):
+        return self.watchdog.stats()
+
+    def release(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        if self.cap is not None:
+            self.cap.release()
+
+
+class Subscription:
+    """A consumer's view of a shared camera; each frame is returned at most once"""
+
+    def __init__(self, manager, key, source):
+        self.manager = manager
+        self.key = key
+        self.source = source
+        self.seq = 0
+        self.timestamp = 0.0
+
+    def read(self, timeout=0.1):
+        """Return ``(ok, frame)`` with the newest frame not yet seen by this subscriber.
+
+        Waits up to ``timeout`` seconds for one; event loops pass 0 and poll.
+        """
+        newest = self.source.newest(self.seq, timeout)
+        if newest is None:
+            return False, None
+        self.seq, self.timestamp, frame = newest
+        return True, frame
+
+    def close(self):
+        self.manager.unsubscribe(self)
+
+
+class SourceManager:
+    """Owns every camera the app reads, opening each device at most once.
+
+    Any number of modules can subscribe to a camera. When the last one
+    unsubscribes the device stays open for ``linger`` seconds (forever when
+    None), so switching tabs or modules reuses the open handle instead of
+    reconnecting. ``sweep`` closes cameras that have been idle longer.
+    """
+
+    def __init__(self, linger=120.0, fps=30, size=(640, 480)):
+        self.linger = linger
+        self.fps = fps
+        self.size = size
+        self.sources = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(device):
+        return f"camera:{device}"
+
+    def subscribe(self, device=0):
+        with self._lock:
+            key = self.key(device)
+            source = self.sources.get(key)
+            if source is None:
+                source = self.sources[key] = CameraSource(device, self.fps, self.size)
+            source.subscribers += 1
+            return Subscription(self, key, source)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            source = self.sources.get(subscription.key)
+            if source is not None and source is subscription.source:
+                source.subscribers = max(0, source.subscribers - 1)
+                if source.subscribers == 0:
+                    source.idle_since = time.monotonic()
+
+    def sweep(self, now=None):
+        """Close cameras nobody has used for ``linger`` seconds"""
+        if self.linger is None:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [k for k, s in self.sources.items() if s.subscribers == 0 and now - s.idle_since > self.linger]
+            for key in idle:
+                self.sources.pop(key).release()
+
+    def health(self):
+        """Watchdog statistics per open camera"""
+        with self._lock:
+            return {key: source.health() for key, source in self.sources.items()}
+
+    def new_events(self):
+        """``(camera, message)`` for every watchdog event since the last call"""
+        events = []
+        with self._lock:
+            for key, source in self.sources.items():
+                while source.watchdog.events:
+                    events.append((key, source.watchdog.events.popleft()[1]))
+        return events
+
+    def close(self):
+        with self._lock:
+            for source in self.sources.values():
+                source.release()
+            self.sources.clear()
@@ -0,0 +1,196 @@
+"""Confidence-driven model cascades: the small model first, a larger one on ambiguity.
+
+Every image (a frame, or one crop or tile of a batch) goes through the
+module's usual nano model, run at the bottom of the uncertain band. An image
+is escalated to the larger model (``models.CASCADE_FILES``) when one of its
+detections falls in the band ``[low, high)`` or is of a high-stakes class
+(``escalate``, e.g. weapon or fire). Everything else keeps the nano result.
+Escalations are capped at ``max_rate`` images per second, so a scene that
+stays ambiguous cannot turn the cascade into "always run the large model".
+
+Bands and budgets come from ``cascade.json`` when present
+(``{"person_model": {"high": 0.45, "max_rate": 2}}``) on top of
+``DEFAULT_SPECS``.
+
+``python cascade.py person_model --video clip.mp4`` runs the nano model, the
+large model and the cascade on the same frames and prints each one's fps,
+the cascade's escalation rate and how many of the large model's boxes the
+other two find.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from detections import ClassTable, Detections
+from models import MODEL_FILES, CASCADE_FILES
+
+DEFAULT_PATH = "cascade.json"
+
+DEFAULT_SPECS = {
+    "person_model": {"low": 0.25, "high": 0.5, "max_rate": 5.0},
+    "crowd_model": {"low": 0.25, "high": 0.5, "max_rate": 2.0},
+    "weapon_model": {"low": 0.2, "high": 0.7, "escalate": ["weapon"], "max_rate": 10.0},
+    "fire_model": {"low": 0.2, "high": 0.6, "escalate": ["fire", "smoke"], "max_rate": 5.0},
+}
+
+
+class CascadeSpec:
+    """When one model's images go to its larger counterpart.
+
+    ``low`` and ``high`` bound the uncertain confidence band, ``escalate``
+    lists high-stakes labels whose detections are always confirmed and
+    ``max_rate`` is the escalation budget in images per second (None is
+    unlimited).
+    """
+
+    def __init__(self, large, low=0.25, high=0.5, escalate=(), max_rate=None):
+        self.large = large
+        self.low = low
+        self.high = high
+        self.escalate = tuple(escalate)
+        self.max_rate = max_rate
+
+
+def load_specs(path=DEFAULT_PATH):
+    """Specs for every model with a larger counterpart, with ``path`` overriding the defaults"""
+    overrides = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            overrides = json.load(f)
+    specs = {}
+    for name, large in CASCADE_FILES.items():
+        config = dict(DEFAULT_SPECS.get(name, {}))
+        config.update(overrides.get(name, {}))
+        specs[name] = CascadeSpec(config.pop("large", large), **config)
+    return specs
+
+
+class Cascade:
+    """Runs one model's cascade and keeps its escalation statistics.
+
+    ``infer(large, images, **kwargs)`` runs the small (``large=False``) or
+    large model on a list of images and returns one ``Detections`` per image.
+    Both models must share class names.
+    """
+
+    def __init__(self, spec, infer, names):
+        self.spec = spec
+        self.infer = infer
+        self.escalate_ids = ClassTable(names).ids(*spec.escalate)
+        self.tokens = self.burst
+        self.refilled = None
+        self.reset()
+
+    @property
+    def burst(self):
+        return max(1.0, self.spec.max_rate or 0.0)
+
+    def reset(self):
+        self.images = 0
+        self.escalated = 0
+        self.over_budget = 0
+        self.small_time = 0.0
+        self.large_time = 0.0
+
+    def take(self, wanted, now):
+        """How many of ``wanted`` escalations the budget allows at ``now``"""
+        if self.spec.max_rate is None:
+            return wanted
+        if self.refilled is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.spec.max_rate)
+        self.refilled = now
+        allowed = min(wanted, int(self.tokens))
+        self.tokens -= allowed
+        return allowed
+
+    def needs_large(self, detections):
+        """0 = keep, 1 = uncertain, 2 = high-stakes class present"""
+        if len(detections) == 0:
+            return 0
+        if len(self.escalate_ids) and np.isin(detections.cls, self.escalate_ids).any():
+            return 2
+        return int(((detections.conf >= self.spec.low) & (detections.conf < self.spec.high)).any())
+
+    def __call__(self, images, conf=0.25, **kwargs):
+        """Detections per image (each above ``conf``), escalating the images that need it"""
+        start = time.perf_counter()
+        small = self.infer(False, images, conf=min(conf, self.spec.low), **kwargs)
+        now = time.perf_counter()
+        self.small_time += now - start
+        self.images += len(images)
+
+        urgency = np.array([self.needs_large(d) for d in small], dtype=np.int64)
+        wanted = np.flatnonzero(urgency)
+        allowed = self.take(len(wanted), now)
+        self.over_budget += len(wanted) - allowed
+        results = [d.above(conf) for d in small]
+        if allowed:
+            # High-stakes images first, then the most uncertain ones
+            chosen = sorted(wanted[np.argsort(-urgency[wanted], kind="stable")][:allowed])
+            large = self.infer(True, [images[i] for i in chosen], conf=conf, **kwargs)
+            for i, detections in zip(chosen, large):
+                results[i] = detections
+            self.escalated += allowed
+            self.large_time += time.perf_counter() - now
+        return results
+
+    def stats(self):
+        return {"images": self.images, "escalated": self.escalated, "over_budget": self.over_budget,
+                "escalation_rate": self.escalated / self.images if self.images else 0.0,
+                "small_time": self.small_time, "large_time": self.large_time}
+
+
+def recall(found, reference, iou=0.5):
+    """Share of ``reference`` boxes that ``found`` has a box for (IoU >= ``iou``)"""
+    from tracking import iou_matrix
+    total = sum(len(r) for r in reference)
+    if not total:
+        return 1.0
+    hits = sum(int((iou_matrix(r.xyxy, f.xyxy) >= iou).any(axis=1).sum()) for f, r in zip(found, reference) if len(f))
+    return hits / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a model, its larger counterpart and the cascade of both")
+    parser.add_argument("model", choices=sorted(CASCADE_FILES))
+    parser.add_argument("--video", help="Clip to run on (random frames when omitted)")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--config", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    from threads import load_frames
+    spec = load_specs(args.config)[args.model]
+    models = {False: YOLO(MODEL_FILES[args.model]), True: YOLO(spec.large)}
+
+    def infer(large, images, **kwargs):
+        return [Detections.from_result(r) for r in models[large](images, verbose=False, **kwargs)]
+
+    frames = load_frames(args.video, args.frames)
+    for model in models.values():
+        model(frames[0], verbose=False)
+    runs = {}
+    for label, run in (("small", lambda f: infer(False, [f], conf=args.conf)),
+                       ("large", lambda f: infer(True, [f], conf=args.conf))):
+        start = time.perf_counter()
+        runs[label] = [run(frame)[0] for frame in frames]
+        runs[label + "_fps"] = len(frames) / (time.perf_counter() - start)
+    cascade = Cascade(spec, infer, models[False].names)
+    start = time.perf_counter()
+    runs["cascade"] = [cascade([frame], conf=args.conf)[0] for frame in frames]
+    runs["cascade_fps"] = len(frames) / (time.perf_counter() - start)
+
+    print(f"{'run':<8} {'fps':>7} {'recall vs large':>16}")
+    for label in ("small", "large", "cascade"):
+        print(f"{label:<8} {runs[label + '_fps']:>7.1f} {recall(runs[label], runs['large']):>16.1%}")
+    stats = cascade.stats()
+    print(f"\nEscalated {stats['escalated']}/{stats['images']} frames ({stats['escalation_rate']:.1%}), "
+          f"{stats['over_budget']} over the {spec.max_rate} /s budget")
+
+
+if __name__ == "__main__":
+    main()
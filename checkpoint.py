@@ -0,0 +1,74 @@
+import hashlib
+import os
+import pickle
+
+VERSION = 1
+
+
+class CheckpointStore:
+    """Periodic, atomically written checkpoints for file-mode runs.
+
+    One checkpoint is kept per (video, module). It holds the position of the
+    last fully processed frame plus whatever state the caller needs to carry
+    on (trackers, cooldowns, output positions). Checkpoints are written to a
+    temporary file and renamed into place, so a crash mid-write leaves the
+    previous one intact. A checkpoint whose video has changed size or
+    modification time is ignored.
+    """
+
+    def __init__(self, directory="checkpoints", interval=30.0):
+        self.directory = directory
+        self.interval = interval
+        self.last_saved = {}
+
+    def path(self, video_path, module):
+        key = hashlib.sha1(f"{os.path.abspath(video_path)}|{module}".encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{module}-{key}.ckpt")
+
+    @staticmethod
+    def fingerprint(video_path):
+        stat = os.stat(video_path)
+        return stat.st_size, int(stat.st_mtime)
+
+    def due(self, video_path, module, video_time):
+        """True when ``interval`` seconds of video have passed since the last save"""
+        last = self.last_saved.get((video_path, module))
+        if last is None:
+            self.last_saved[(video_path, module)] = video_time
+            return False
+        return video_time - last >= self.interval
+
+    def save(self, video_path, module, frame_index, video_time, state):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(video_path, module)
+        checkpoint = {"version": VERSION, "video": os.path.abspath(video_path), "module": module,
+                      "fingerprint": self.fingerprint(video_path), "frame_index": frame_index,
+                      "time": video_time, "state": state}
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self.last_saved[(video_path, module)] = video_time
+
+    def load(self, video_path, module):
+        """The saved checkpoint for this video and module, or None"""
+        path = self.path(video_path, module)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                checkpoint = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if checkpoint.get("version") != VERSION or checkpoint["fingerprint"] != self.fingerprint(video_path):
+            return None
+        self.last_saved[(video_path, module)] = checkpoint["time"]
+        return checkpoint
+
+    def clear(self, video_path, module):
+        self.last_saved.pop((video_path, module), None)
+        path = self.path(video_path, module)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,170 @@
+import math
+from collections import deque
+import cv2
+import numpy as np
+from detections import Detections
+
+
+def make_tiles(width, height, rows, cols, overlap=0.2):
+    """Return a (rows*cols, 4) array of x1, y1, x2, y2 tiles covering the frame with fractional overlap"""
+    tile_w = width / (cols - (cols - 1) * overlap)
+    tile_h = height / (rows - (rows - 1) * overlap)
+    xs = np.arange(cols) * tile_w * (1 - overlap)
+    ys = np.arange(rows) * tile_h * (1 - overlap)
+    gx, gy = np.meshgrid(xs, ys)
+    tiles = np.stack([gx.ravel(), gy.ravel(), gx.ravel() + tile_w, gy.ravel() + tile_h], axis=1)
+    tiles = np.round(tiles).astype(np.int32)
+    np.clip(tiles[:, 0::2], 0, width, out=tiles[:, 0::2])
+    np.clip(tiles[:, 1::2], 0, height, out=tiles[:, 1::2])
+    return tiles
+
+
+class TiledCrowdCounter:
+    """Person counter that slices busy frames into overlapping tiles.
+
+    Quiet frames cost a single full-frame pass. When the previous frame was
+    crowded (or its people were small), the next frame is split into an
+    adaptive grid; the full frame and all tiles go through the model in one
+    batched call and the boxes are merged back with cross-tile NMS.
+    ``infer(images, **kwargs)`` must return one Detections per image.
+    """
+
+    def __init__(self, infer, person_ids, overlap=0.2, max_grid=4, people_per_tile=25,
+                 small_person_frac=0.12, tile_imgsz=640):
+        self.infer = infer
+        self.person_ids = [int(i) for i in person_ids]
+        self.overlap = overlap
+        self.max_grid = max_grid
+        self.people_per_tile = people_per_tile
+        self.small_person_frac = small_person_frac
+        self.tile_imgsz = tile_imgsz
+        self.grid = 1
+
+    def choose_grid(self, xyxy, frame_height):
+        """Pick the grid size for the next frame from this frame's detections"""
+        count = len(xyxy)
+        if count == 0:
+            return 1
+        median_h = float(np.median(xyxy[:, 3] - xyxy[:, 1]))
+        grid = math.ceil(math.sqrt(count / self.people_per_tile))
+        if median_h < self.small_person_frac * frame_height:
+            grid = max(grid, 2)
+        return int(min(max(grid, 1), self.max_grid))
+
+    def count(self, frame, conf, floor=None):
+        """Return the Detections of people in ``frame``.
+
+        With ``floor`` the model runs at that lower confidence and everything
+        above it is returned; the tile grid is still chosen from ``conf``.
+        """
+        height, width = frame.shape[:2]
+        if self.grid > 1:
+            tiles = make_tiles(width, height, self.grid, self.grid, self.overlap)
+            offsets = np.vstack([[0, 0, 0, 0], tiles])
+            images = [frame] + [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        else:
+            offsets = np.zeros((1, 4), dtype=np.int32)
+            images = [frame]
+
+        results = self.infer(images, conf=conf if floor is None else floor,
+                             classes=self.person_ids or None, imgsz=self.tile_imgsz)
+        people = Detections.concat([d.translate(ox, oy) for d, (ox, oy, _, _) in zip(results, offsets)])
+        if len(images) > 1:
+            people = people.nms()
+
+        self.grid = self.choose_grid(people.above(conf).xyxy, height)
+        return people
+
+
+class OccupancyGrid:
+    """Time-decayed occupancy grid over person foot points.
+
+    Each update bins the bottom-centre of every box into a coarse grid with a
+    single ``bincount`` and folds it into an exponentially decayed heatmap.
+    Rolling averages of the count are kept with running sums so they cost
+    O(1) per frame.
+    """
+
+    def __init__(self, frame_size=(640, 480), cell=16, decay=0.97, windows=(30, 300)):
+        self.width, self.height = frame_size
+        self.cell = cell
+        self.cols = int(math.ceil(self.width / cell))
+        self.rows = int(math.ceil(self.height / cell))
+        self.decay = decay
+        self.heat = np.zeros((self.rows, self.cols), dtype=np.float32)
+        self.windows = {w: deque(maxlen=w) for w in windows}
+        self.sums = {w: 0 for w in windows}
+
+    def update(self, xyxy):
+        """Add one frame of person boxes"""
+        if len(xyxy):
+            fx = np.clip(((xyxy[:, 0] + xyxy[:, 2]) * 0.5) // self.cell, 0, self.cols - 1).astype(np.int64)
+            fy = np.clip(xyxy[:, 3] // self.cell, 0, self.rows - 1).astype(np.int64)
+            occupancy = np.bincount(fy * self.cols + fx, minlength=self.rows * self.cols)
+            occupancy = occupancy.reshape(self.rows, self.cols).astype(np.float32)
+        else:
+            occupancy = 0.0
+        self.heat *= self.decay
+        self.heat += (1 - self.decay) * occupancy
+
+        count = len(xyxy)
+        for w, samples in self.windows.items():
+            if len(samples) == samples.maxlen:
+                self.sums[w] -= samples[0]
+            samples.append(count)
+            self.sums[w] += count
+
+    def rolling_average(self, window=None):
+        """Mean count over the last ``window`` updates (the shortest window by default)"""
+        window = window or min(self.windows)
+        samples = self.windows[window]
+        return self.sums[window] / len(samples) if samples else 0.0
+
+    def heatmap(self):
+        """Return a BGR colour heatmap at frame resolution and a mask of its non-empty area"""
+        peak = float(self.heat.max())
+        if peak <= 0:
+            return None, None
+        norm = (self.heat * (255.0 / peak)).astype(np.uint8)
+        norm = cv2.resize(norm, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+        return cv2.applyColorMap(norm, cv2.COLORMAP_JET), norm > 8
+
+    def overlay(self, frame, alpha=0.45):
+        """Blend the heatmap into ``frame`` in place where there is occupancy"""
+        colored, mask = self.heatmap()
+        if colored is None or frame.shape[:2] != mask.shape:
+            return frame
+        frame[mask] = (frame[mask] * (1 - alpha) + colored[mask] * alpha).astype(np.uint8)
+        return frame
+
+    def reset(self):
+        self.heat.fill(0)
+        for w in self.windows:
+            self.windows[w].clear()
+            self.sums[w] = 0
+
+
+class ZoneMap:
+    """Counts person foot points per named zone of one camera's view.
+
+    The polygons (frame coordinates, see ``occupancy.json``) are rasterised
+    once into a label image, so counting is one lookup per box. Points
+    outside every zone are dropped; with no zones the whole frame is the
+    single zone ``default``.
+    """
+
+    def __init__(self, polygons, default, frame_size=(640, 480)):
+        self.width, self.height = frame_size
+        self.names = list(polygons) or [default]
+        self.labels = np.zeros((self.height, self.width), dtype=np.int32) if polygons else None
+        for i, points in enumerate(polygons.values(), start=1):
+            cv2.fillPoly(self.labels, [np.asarray(points, dtype=np.int32).reshape(-1, 1, 2)], i)
+
+    def counts(self, xyxy):
+        """``{zone: people}`` for the boxes of one frame"""
+        if self.labels is None:
+            return {self.names[0]: len(xyxy)}
+        fx = np.clip((xyxy[:, 0] + xyxy[:, 2]) * 0.5, 0, self.width - 1).astype(np.int64)
+        fy = np.clip(xyxy[:, 3], 0, self.height - 1).astype(np.int64)
+        found = np.bincount(self.labels[fy, fx], minlength=len(self.names) + 1)
+        return {name: int(found[i]) for i, name in enumerate(self.names, start=1)}
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class ClassTable:
+    """Class-id lookup table for one model's ``names``.
+
+    Label comparisons are done once here so per-frame filtering is an
+    array lookup (``table.mask('weapon')[dets.cls]``) instead of a string
+    compare per box.
+    """
+
+    def __init__(self, names):
+        self.names = dict(names)
+        size = max(self.names) + 1 if self.names else 0
+        self.labels = np.array([self.names.get(i, '') for i in range(size)], dtype=object)
+        self._by_label = {}
+        for i, name in self.names.items():
+            self._by_label.setdefault(name.lower(), []).append(i)
+
+    def ids(self, *labels):
+        """Class ids matching any of ``labels`` (case-insensitive)"""
+        ids = [i for label in labels for i in self._by_label.get(label.lower(), [])]
+        return np.array(sorted(ids), dtype=np.int64)
+
+    def id(self, label):
+        ids = self.ids(label)
+        return int(ids[0]) if len(ids) else -1
+
+    def mask(self, *labels):
+        """Boolean lookup table indexed by class id"""
+        lut = np.zeros(len(self.labels), dtype=bool)
+        lut[self.ids(*labels)] = True
+        return lut
+
+
+class Detections:
+    """Struct-of-arrays detection set: xyxy (N, 4), conf (N,), cls (N,), track_id (N,)"""
+
+    __slots__ = ('xyxy', 'conf', 'cls', 'track_id')
+
+    def __init__(self, xyxy=None, conf=None, cls=None, track_id=None):
+        self.xyxy = np.zeros((0, 4), dtype=np.float32) if xyxy is None else np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        n = len(self.xyxy)
+        self.conf = np.ones(n, dtype=np.float32) if conf is None else np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.zeros(n, dtype=np.int64) if cls is None else np.asarray(cls, dtype=np.int64).reshape(-1)
+        self.track_id = np.full(n, -1, dtype=np.int64) if track_id is None else np.asarray(track_id, dtype=np.int64).reshape(-1)
+
+    @classmethod
+    def from_result(cls, result):
+        """Build from an Ultralytics result with a single device-to-host copy"""
+        boxes = getattr(result, 'boxes', None)
+        if boxes is None or len(boxes) == 0:
+            return cls()
+        data = boxes.data
+        data = data.cpu().numpy() if hasattr(data, 'cpu') else np.asarray(data)
+        # Columns are x1, y1, x2, y2, [track_id,] conf, cls
+        track_id = data[:, 4] if data.shape[1] == 7 else None
+        return cls(data[:, :4], data[:, -2], data[:, -1], track_id)
+
+    @classmethod
+    def concat(cls, items):
+        items = [d for d in items if len(d)]
+        if not items:
+            return cls()
+        return cls(np.concatenate([d.xyxy for d in items]), np.concatenate([d.conf for d in items]),
+                   np.concatenate([d.cls for d in items]), np.concatenate([d.track_id for d in items]))
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    def __getitem__(self, index):
+        return Detections(self.xyxy[index], self.conf[index], self.cls[index], self.track_id[index])
+
+    def of_class(self, table, *labels):
+        """Subset whose class is one of ``labels``"""
+        lut = table.mask(*labels)
+        if len(self) == 0 or len(lut) == 0:
+            return Detections()
+        return self[lut[np.clip(self.cls, 0, len(lut) - 1)]]
+
+    def above(self, conf):
+        return self[self.conf >= conf]
+
+    def labels(self, table):
+        """Class names as an object array"""
+        return table.labels[self.cls] if len(self) else np.zeros(0, dtype=object)
+
+    def translate(self, dx, dy, sx=1.0, sy=1.0):
+        """Boxes shifted by (dx, dy) and then scaled by (sx, sy)"""
+        offset = np.array([dx, dy, dx, dy], dtype=np.float32)
+        scale = np.array([sx, sy, sx, sy], dtype=np.float32)
+        return Detections((self.xyxy + offset) * scale, self.conf, self.cls, self.track_id)
+
+    def nms(self, iou_thresh=0.5, ios_thresh=0.7):
+        if len(self) < 2:
+            return self
+        return self[merge_boxes(self.xyxy, self.conf, iou_thresh, ios_thresh)]
+
+    def centers(self):
+        """Integer box centres as (N, 2)"""
+        return ((self.xyxy[:, :2] + self.xyxy[:, 2:]) * 0.5).astype(np.int64)
+
+    def boxes_int(self):
+        return self.xyxy.astype(np.int64)
+
+
+def merge_boxes(xyxy, scores, iou_thresh=0.5, ios_thresh=0.7):
+    """Greedy NMS that also suppresses boxes mostly contained in a stronger one.
+
+    Intersection-over-smaller catches the partial boxes produced where a tile
+    or crop boundary cuts through an object, which plain IoU lets through.
+    Returns the indices of the kept boxes.
+    """
+    if len(xyxy) == 0:
+        return np.zeros(0, dtype=np.int64)
+    x1, y1, x2, y2 = xyxy[:, 0], xyxy[:, 1], xyxy[:, 2], xyxy[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.maximum(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0)
+        ih = np.maximum(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0)
+        inter = iw * ih
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        ios = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        order = rest[(iou < iou_thresh) & (ios < ios_thresh)]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def crop_batch(frame, boxes, margin=0.2, min_size=32):
+    """Cut padded crops for each box.
+
+    Returns ``(crops, offsets, indices)``: the crop images, their (x, y)
+    origin in the frame and the index of the box each crop came from.
+    """
+    height, width = frame.shape[:2]
+    crops, offsets, indices = [], [], []
+    for i, (x1, y1, x2, y2) in enumerate(np.asarray(boxes, dtype=np.float32).reshape(-1, 4)):
+        mx = max((x2 - x1) * margin, min_size / 2)
+        my = max((y2 - y1) * margin, min_size / 2)
+        cx1, cy1 = int(max(0, x1 - mx)), int(max(0, y1 - my))
+        cx2, cy2 = int(min(width, x2 + mx)), int(min(height, y2 + my))
+        if cx2 - cx1 < 2 or cy2 - cy1 < 2:
+            continue
+        crops.append(frame[cy1:cy2, cx1:cx2])
+        offsets.append((cx1, cy1))
+        indices.append(i)
+    return crops, offsets, indices
@@ -0,0 +1,467 @@
+"""Segment-parallel processing of long recordings.
+
+The coordinator splits a video at keyframes into segments and hands each
+segment to a worker. Workers only do the expensive part, inference: each one
+runs the chosen modules' models over its frames (after a short pre-roll that
+primes trackers and the fire gate) and writes the raw detections to its own
+detection log (``recording.py`` format). The coordinator then merges the
+segment logs in time order into one log for the whole file and replays it
+sequentially to apply everything stateful across segment boundaries: person
+tracks are stitched with one IoU tracker, dustbin states are voted with one
+DustbinMonitor and alert cooldowns are applied in video time.
+
+Local run with 8 worker processes::
+
+    python distributed.py process archive.mp4 --workers 8 --out runs/archive
+
+Across machines that share a filesystem, enqueue the segments and start
+workers wherever the models and the video are reachable::
+
+    python distributed.py process archive.mp4 --queue /shared/queue --workers 0 --out /shared/runs/archive
+    python distributed.py worker /shared/queue          # on each node
+
+The merged ``<video>.detlog`` works with ``recording.py`` threshold sweeps and
+``archive_index.py``; events are written to ``events.jsonl``.
+"""
+import argparse
+import glob
+import json
+import math
+import multiprocessing as mp
+import os
+import shutil
+import socket
+import subprocess
+import time
+import uuid
+import cv2
+import numpy as np
+
+from capture import FrameReader
+from crowd_density import TiledCrowdCounter
+from detections import ClassTable, Detections, crop_batch
+from dustbin_health import DustbinMonitor, PROBLEM_LABELS
+from fall_cascade import PostureCheck
+from fire_gate import FireSmokeGate
+from models import MODEL_FILES, MODULE_MODELS
+from recording import DetectionLog, DetectionRecorder
+from threads import ThreadBudget
+from tracking import IoUTracker, iou_matrix
+
+# Seconds between samples for the low-rate modules, aligned to video time
+SAMPLE_PERIODS = {"crowd_detection": 1.0, "dustbin_detection": 30.0}
+# Alert threshold per module, matching the UI sliders' defaults
+DEFAULT_CONF = {"weapon_detection": 0.5, "trespassing_detection": 0.25, "fall_detection": 0.5,
+                "fire_detection": 0.5, "dustbin_detection": 0.5}
+EVENT_CLASSES = {"fall_detection": ("fall-detected",), "fire_detection": ("fire", "smoke")}
+PERSON_MODULES = ("weapon_detection", "trespassing_detection", "fall_detection")
+# People the weapon and fall passes crop and the tracker follows, as in the UI (``UI.PERSON_CONF``)
+PERSON_CONF = 0.25
+
+
+def keyframe_times(path):
+    """Keyframe timestamps (seconds) from ffprobe, or None when ffprobe is unavailable"""
+    command = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+               "-show_entries", "frame=pts_time", "-of", "csv=p=0", path]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, check=True, timeout=600).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return sorted(float(line) for line in output.split() if line.replace(".", "", 1).isdigit())
+
+
+def plan_segments(path, count, min_seconds=60.0):
+    """Split ``path`` into about ``count`` frame ranges that start on keyframes"""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+    count = max(1, min(count, int(frames / fps / min_seconds) or 1))
+    targets = [frames * i / count for i in range(1, count)]
+
+    keyframes = keyframe_times(path)
+    if keyframes:
+        key_frames = np.array([round(t * fps) for t in keyframes])
+        cuts = sorted({int(key_frames[np.argmin(np.abs(key_frames - t))]) for t in targets})
+    else:
+        # No keyframe list; OpenCV seeks by decoding from the previous keyframe, which is still exact
+        cuts = [int(t) for t in targets]
+    bounds = [0] + [c for c in cuts if 0 < c < frames] + [frames]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a], fps
+
+
+class SegmentAnalyzer:
+    """Headless per-frame inference for the modules a worker was asked to run.
+
+    Mirrors the inference half of the UI's ``process_*`` methods at a floor
+    confidence; alerting, cooldowns and state votes are left to the
+    coordinator.
+    """
+
+    def __init__(self, modules, floor=0.05):
+        from ultralytics import YOLO
+        self.modules = modules
+        self.floor = floor
+        needed = {model for module in modules for model in MODULE_MODELS[module]}
+        self.models = {name: YOLO(MODEL_FILES[name]) for name in needed}
+        self.tables = {name: ClassTable(model.names) for name, model in self.models.items()}
+        self.tracker = IoUTracker(match_iou=0.3, max_missed=15)
+        self.posture = PostureCheck()
+        self.gate = FireSmokeGate(safety_interval=5.0)
+        # Trespassing records the people themselves, so its pass goes down to the floor
+        self.person_conf = min([self.floor if module == "trespassing_detection" else PERSON_CONF
+                                for module in PERSON_MODULES if module in modules] or [PERSON_CONF])
+        if "crowd_detection" in modules:
+            self.crowd = TiledCrowdCounter(lambda images, **kw: self.run("crowd_model", images, **kw),
+                                           self.tables["crowd_model"].ids("person"))
+
+    def run(self, name, source, **kwargs):
+        results = self.models[name](source, verbose=False, **kwargs)
+        detections = [Detections.from_result(r) for r in results]
+        return detections if isinstance(source, list) else detections[0]
+
+    def names(self, module):
+        return self.models["person_model" if module == "trespassing_detection" else MODULE_MODELS[module][-1]].names
+
+    def analyze(self, frame, full, t, dt):
+        """Raw detections per module for one frame: ``[(module, Detections), ...]``"""
+        out = []
+        people = everyone = None
+        if set(PERSON_MODULES) & set(self.modules):
+            everyone = self.run("person_model", frame, conf=self.person_conf,
+                                classes=self.tables["person_model"].ids("person").tolist())
+            people = everyone.above(PERSON_CONF)
+            out.append(("person", Detections(people.xyxy, people.conf, people.cls)))
+
+        if "weapon_detection" in self.modules:
+            sx, sy = full.shape[1] / float(frame.shape[1]), full.shape[0] / float(frame.shape[0])
+            crops, offsets, _ = crop_batch(full, people.xyxy * np.array([sx, sy, sx, sy], dtype=np.float32), margin=0.25)
+            weapons = Detections()
+            if crops:
+                results = self.run("weapon_model", crops, conf=self.floor, imgsz=320)
+                weapons = Detections.concat([d.translate(ox, oy, 1 / sx, 1 / sy) for d, (ox, oy) in zip(results, offsets)])
+            out.append(("weapon_detection", weapons.of_class(self.tables["weapon_model"], "weapon").nms()))
+
+        if "trespassing_detection" in self.modules:
+            on_track = Detections()
+            result = self.models["track_model"](frame, verbose=False)[0]
+            if result.masks is not None and len(everyone):
+                height, width = frame.shape[:2]
+                mask = np.any(result.masks.data.cpu().numpy() > 0.5, axis=0).astype(np.uint8)
+                mask = cv2.resize(mask, (width, height))
+                centers = everyone.centers()
+                hit = mask[np.clip(centers[:, 1], 0, height - 1), np.clip(centers[:, 0], 0, width - 1)] == 1
+                on_track = everyone[hit]
+            out.append(("trespassing_detection", on_track))
+
+        if "fall_detection" in self.modules:
+            ids = self.tracker.update(people.xyxy, t)
+            suspects = self.posture.suspects([self.tracker.tracks[i] for i in ids], t)
+            suspect = np.isin(ids, [s.track_id for s in suspects])
+            found = Detections()
+            crops, offsets, _ = crop_batch(frame, people.xyxy[suspect])
+            if crops:
+                results = self.run("fall_model", crops, conf=self.floor)
+                found = Detections.concat([d.translate(ox, oy) for d, (ox, oy) in zip(results, offsets)])
+            out.append(("fall_detection", found.of_class(self.tables["fall_model"], "fall-detected", "nofall")))
+
+        if "crowd_detection" in self.modules and first_in_period(t, dt, SAMPLE_PERIODS["crowd_detection"]):
+            out.append(("crowd_detection", self.crowd.count(frame, 0.25, floor=self.floor)))
+
+        if "fire_detection" in self.modules:
+            region = self.gate.check(frame, t)
+            if region is not None:
+                ox, oy, ex, ey = region
+                fire = self.run("fire_model", frame[oy:ey, ox:ex], conf=self.floor)
+                out.append(("fire_detection", fire.of_class(self.tables["fire_model"], "fire", "smoke").translate(ox, oy)))
+            else:
+                out.append(("fire_detection", Detections()))
+
+        if "dustbin_detection" in self.modules and first_in_period(t, dt, SAMPLE_PERIODS["dustbin_detection"]):
+            out.append(("dustbin_detection", self.run("dustbin_model", frame, conf=self.floor)))
+        return out
+
+
+def first_in_period(t, dt, period):
+    """True for the first analysed frame of each ``period`` of video time, wherever a segment starts"""
+    return math.floor(t / period) != math.floor((t - dt) / period)
+
+
+def process_segment(job):
+    """Worker entry point: analyse one segment into its own detection log"""
+    budget = ThreadBudget.load()
+    budget.apply(job.get("worker", 0))
+    analyzer = SegmentAnalyzer(job["modules"], floor=job["floor"])
+    keep_full = "weapon_detection" in job["modules"]
+    reader = FrameReader(job["video"], stride=job["stride"], keep_full=keep_full, hw_accel=False)
+    stride = reader.stride
+    dt = stride / reader.source_fps
+
+    # Pre-roll primes trackers, posture history and the fire gate background; its output is dropped
+    start = max(0, job["start"] - int(job["preroll"] * reader.source_fps))
+    start = int(math.ceil(start / stride)) * stride
+    if os.path.exists(job["output"]):
+        shutil.rmtree(job["output"])
+    recorder = DetectionRecorder(job["output"], floor=job["floor"])
+    reader.seek(frame_index=start)
+    frames = 0
+    try:
+        while True:
+            ok, frame = reader.read()
+            if not ok or reader.frame_index >= job["end"]:
+                break
+            t = reader.timestamp_ms / 1000.0
+            results = analyzer.analyze(frame, reader.full_frame if keep_full else frame, t, dt)
+            if reader.frame_index < job["start"]:
+                continue
+            for module, detections in results:
+                names = analyzer.models["person_model"].names if module == "person" else analyzer.names(module)
+                recorder.add(module, reader.frame_index, t, job["video"], detections, names)
+            frames += 1
+    finally:
+        reader.release()
+        recorder.close()
+    return {"segment": job["segment"], "frames": frames, "output": job["output"]}
+
+
+class FileQueue:
+    """Job queue on a shared directory.
+
+    Jobs are JSON files in ``pending/``; a worker claims one by renaming it
+    into ``running/`` (atomic on one filesystem, so two workers never get the
+    same job) and moves it to ``done/`` with its result.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        for state in ("pending", "running", "done"):
+            os.makedirs(os.path.join(directory, state), exist_ok=True)
+
+    def put(self, job):
+        name = f"{job['run']}-{job['segment']:05d}.json"
+        tmp = os.path.join(self.directory, name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp, os.path.join(self.directory, "pending", name))
+
+    def claim(self):
+        for path in sorted(glob.glob(os.path.join(self.directory, "pending", "*.json"))):
+            name = os.path.basename(path)
+            target = os.path.join(self.directory, "running", f"{name}.{socket.gethostname()}-{os.getpid()}")
+            try:
+                os.rename(path, target)
+            except OSError:
+                continue
+            with open(target) as f:
+                return target, json.load(f)
+        return None, None
+
+    def finish(self, claimed, job, result):
+        with open(os.path.join(self.directory, "done", f"{job['run']}-{job['segment']:05d}.json"), "w") as f:
+            json.dump(dict(job, result=result), f)
+        os.remove(claimed)
+
+    def results(self, run):
+        done = []
+        for path in glob.glob(os.path.join(self.directory, "done", f"{run}-*.json")):
+            with open(path) as f:
+                done.append(json.load(f)["result"])
+        return done
+
+
+def run_worker(queue_dir, wait=False, poll=5.0):
+    """Process queued segments until the queue is empty (or forever with ``wait``)"""
+    queue = FileQueue(queue_dir)
+    while True:
+        claimed, job = queue.claim()
+        if job is None:
+            if not wait:
+                return
+            time.sleep(poll)
+            continue
+        print(f"segment {job['segment']} of {job['video']} [{job['start']}, {job['end']})")
+        try:
+            result = process_segment(job)
+        except Exception as e:
+            # Report the failure instead of dying with the job stuck in running/
+            print(f"segment {job['segment']} failed: {e}")
+            result = {"segment": job["segment"], "frames": 0, "output": job["output"], "error": f"{type(e).__name__}: {e}"}
+        queue.finish(claimed, job, result)
+
+
+def merge_segments(outputs, path):
+    """Concatenate segment logs (already in time order) into one log"""
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    merged = None
+    for output in outputs:
+        log = DetectionLog(output)
+        if merged is None:
+            merged = DetectionRecorder(path, floor=log.floor)
+        modules, sources = log.meta["modules"], log.meta["sources"]
+        for run in range(len(log)):
+            module = modules[int(log.runs["module"][run])]
+            merged.add(module, int(log.runs["frame_index"][run]), float(log.runs["time"][run]),
+                       sources[int(log.runs["source"][run])], log.detections(run),
+                       log.meta["classes"].get(module))
+    if merged is None:
+        merged = DetectionRecorder(path)
+    merged.close()
+    return path
+
+
+def derive_events(log_path, conf=None, cooldown=5.0):
+    """Replay a merged log in time order and return the alert events.
+
+    Person tracks are stitched over the whole file, so fall events keep one
+    track id across segment boundaries; cooldowns and dustbin votes run in
+    video time exactly as a sequential run would apply them.
+    """
+    conf = dict(DEFAULT_CONF, **(conf or {}))
+    log = DetectionLog(log_path)
+    recorder = DetectionRecorder(log_path)
+    modules, sources = log.meta["modules"], log.meta["sources"]
+    tables = {m: ClassTable({int(k): v for k, v in names.items()}) for m, names in log.meta["classes"].items()}
+    tracker = IoUTracker(match_iou=0.3, max_missed=15)
+    bins = DustbinMonitor(interval=0.0, warmup_interval=0.0)
+    last_alert = {}
+    person_boxes, person_ids = np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    events = []
+
+    for run in range(len(log)):
+        module = modules[int(log.runs["module"][run])]
+        t, frame = float(log.runs["time"][run]), int(log.runs["frame_index"][run])
+        source = sources[int(log.runs["source"][run])]
+        detections = log.detections(run)
+        if module == "person":
+            person_boxes = detections.xyxy
+            person_ids = tracker.update(person_boxes, t)
+            continue
+        if module == "crowd_detection":
+            continue
+
+        detections = detections.above(conf[module])
+        if module in EVENT_CLASSES:
+            detections = detections.of_class(tables[module], *EVENT_CLASSES[module])
+
+        if module == "dustbin_detection":
+            labels = detections.labels(tables[module])
+            for track, old, new in bins.sample(source, detections.xyxy, labels, t):
+                if new in PROBLEM_LABELS:
+                    events.append({"time": t, "frame": frame, "module": module, "message": f"Bin #{track.bin_id}: {new}"})
+            continue
+        if not len(detections) or t - last_alert.get(module, -np.inf) <= cooldown:
+            continue
+
+        last_alert[module] = t
+        event = {"time": t, "frame": frame, "module": module,
+                 "message": f"{module.replace('_detection', '').capitalize()} detected",
+                 "labels": sorted(set(detections.labels(tables[module]).tolist()))}
+        if len(person_ids) and module in PERSON_MODULES:
+            overlap = iou_matrix(detections.xyxy, person_boxes)
+            event["tracks"] = sorted({int(person_ids[j]) for j in overlap.argmax(axis=1)})
+        events.append(event)
+
+    for event in events:
+        recorder.add_alert(event["module"], event["frame"], event["time"], sources[0] if sources else "", event["message"])
+    recorder.close()
+    return events
+
+
+class Coordinator:
+    """Plans segments, dispatches them and merges the results"""
+
+    def __init__(self, video, modules, out, workers=4, target_fps=None, floor=0.05, preroll=5.0,
+                 queue_dir=None):
+        self.video = os.path.abspath(video)
+        self.modules = list(modules)
+        self.out = out
+        self.workers = workers
+        self.target_fps = target_fps
+        self.floor = floor
+        self.preroll = preroll
+        self.queue_dir = queue_dir
+        # Unique per run, so results a shared queue kept from an earlier run of the same video never count
+        name = os.path.splitext(os.path.basename(self.video))[0]
+        self.run_id = f"{name}-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def jobs(self):
+        segments, fps = plan_segments(self.video, max(self.workers, 1) * 4)
+        stride = max(1, int(round(fps / self.target_fps))) if self.target_fps else 1
+        return [{"run": self.run_id, "segment": i, "video": self.video, "start": a, "end": b, "stride": stride,
+                 "modules": self.modules, "floor": self.floor, "preroll": self.preroll, "worker": i % max(self.workers, 1),
+                 "output": os.path.join(os.path.abspath(self.out), "segments", f"seg-{i:05d}.detlog")}
+                for i, (a, b) in enumerate(segments)]
+
+    def run(self, poll=5.0):
+        started = time.perf_counter()
+        jobs = self.jobs()
+        os.makedirs(os.path.join(self.out, "segments"), exist_ok=True)
+        if self.queue_dir:
+            queue = FileQueue(self.queue_dir)
+            for job in jobs:
+                queue.put(job)
+            local = [mp.get_context("spawn").Process(target=run_worker, args=(self.queue_dir,))
+                     for _ in range(self.workers)]
+            for p in local:
+                p.start()
+            while True:
+                # Checked before the results, so a worker that finishes the last job and exits is not a failure
+                stopped = local and not any(p.is_alive() for p in local)
+                results = queue.results(self.run_id)
+                if len(results) >= len(jobs):
+                    break
+                if stopped:
+                    # With --workers 0 remote workers may still come; otherwise nobody will finish the rest
+                    missing = sorted(set(range(len(jobs))) - {r["segment"] for r in results})
+                    raise RuntimeError(f"Local workers exited with segments {missing} unfinished")
+                time.sleep(poll)
+            for p in local:
+                p.join()
+            failed = sorted((r for r in results if r.get("error")), key=lambda r: r["segment"])
+            if failed:
+                raise RuntimeError("; ".join(f"segment {r['segment']}: {r['error']}" for r in failed))
+        else:
+            # Local stand-in for the queue: a process pool over the same jobs
+            with mp.get_context("spawn").Pool(max(self.workers, 1)) as pool:
+                for result in pool.imap_unordered(process_segment, jobs):
+                    print(f"segment {result['segment']}: {result['frames']} frames")
+        analysed = time.perf_counter() - started
+
+        name = os.path.splitext(os.path.basename(self.video))[0]
+        merged = merge_segments([job["output"] for job in jobs], os.path.join(self.out, f"{name}.detlog"))
+        events = derive_events(merged)
+        with open(os.path.join(self.out, "events.jsonl"), "w") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        return {"segments": len(jobs), "events": len(events), "analysis_seconds": analysed,
+                "total_seconds": time.perf_counter() - started, "log": merged}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segment-parallel processing of a long recording")
+    sub = parser.add_subparsers(dest="command", required=True)
+    process = sub.add_parser("process", help="Split, analyse and merge one video")
+    process.add_argument("video")
+    process.add_argument("--modules", nargs="+", default=list(MODULE_MODELS), choices=list(MODULE_MODELS))
+    process.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                         help="Local worker processes (0 = only remote workers on --queue)")
+    process.add_argument("--fps", type=float, help="Frames analysed per second of video (default: all)")
+    process.add_argument("--out", default="runs")
+    process.add_argument("--queue", help="Shared queue directory for workers on other nodes")
+    worker = sub.add_parser("worker", help="Process segments from a shared queue")
+    worker.add_argument("queue")
+    worker.add_argument("--wait", action="store_true", help="Keep polling when the queue is empty")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        run_worker(args.queue, wait=args.wait)
+        return
+    summary = Coordinator(args.video, args.modules, args.out, workers=args.workers, target_fps=args.fps,
+                          queue_dir=args.queue).run()
+    print(f"{summary['segments']} segments, {summary['events']} events, analysis {summary['analysis_seconds']:.1f} s, "
+          f"total {summary['total_seconds']:.1f} s -> {summary['log']}")
+
+
+if __name__ == "__main__":
+    main()
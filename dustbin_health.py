@@ -0,0 +1,131 @@
+from collections import Counter, deque
+import numpy as np
+
+# States that need someone to go and look at the bin
+PROBLEM_LABELS = {'Broken trash can', 'Close_full', 'Open_full', 'Trash flow', 'full'}
+
+
+def box_iou(box, boxes):
+    """IoU of one x1, y1, x2, y2 box against an (N, 4) array"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    iw = np.maximum(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0)
+    ih = np.maximum(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0)
+    inter = iw * ih
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-6)
+
+
+class BinTrack:
+    """One physical bin seen by one camera, with a short history of sampled labels"""
+
+    def __init__(self, bin_id, camera, box, votes):
+        self.bin_id = bin_id
+        self.camera = camera
+        self.box = np.asarray(box, dtype=np.float32)
+        self.votes = deque(maxlen=votes)
+        self.state = None
+        self.missed = 0
+
+    def vote(self, label, min_votes):
+        """Record a sampled label; return the new state if the majority changed"""
+        self.votes.append(label)
+        if len(self.votes) < min_votes:
+            return None
+        label, hits = Counter(self.votes).most_common(1)[0]
+        if hits * 2 > len(self.votes) and label != self.state:
+            self.state = label
+            return label
+        return None
+
+
+class DustbinMonitor:
+    """Low-rate bin health sampler shared by every camera.
+
+    Bins are static and change state over minutes, so each camera is sampled
+    on a fixed schedule (after a short warm-up burst) instead of every frame;
+    ``next_due`` tells the module scheduler when the next sample is wanted.
+    Sampled detections are matched to known bins by IoU and each bin's state
+    is the majority of its recent votes, which filters single-sample
+    misclassifications. Callers only need to refresh panels or raise events
+    when ``sample`` reports a change.
+    """
+
+    def __init__(self, interval=30.0, warmup_interval=1.0, warmup_samples=3, votes=5,
+                 min_votes=2, match_iou=0.3, forget_after=3):
+        self.interval = interval
+        self.warmup_interval = warmup_interval
+        self.warmup_samples = warmup_samples
+        self.votes = votes
+        self.min_votes = min_votes
+        self.match_iou = match_iou
+        self.forget_after = forget_after
+        self.bins = {}
+        self._next_id = 1
+        self._next_sample = {}
+        self._samples_taken = {}
+
+    def next_due(self, camera):
+        """Time (seconds) at which ``camera`` should next be sampled"""
+        return self._next_sample.get(camera, float('-inf'))
+
+    def sample(self, camera, boxes, labels, now):
+        """Fold one sampled frame into the bin states.
+
+        ``boxes`` is an (N, 4) array and ``labels`` the matching class names.
+        Returns a list of ``(bin, old_state, new_state)`` changes; a bin that
+        disappears is reported with ``new_state`` None.
+        """
+        taken = self._samples_taken.get(camera, 0) + 1
+        self._samples_taken[camera] = taken
+        wait = self.warmup_interval if taken < self.warmup_samples else self.interval
+        self._next_sample[camera] = now + wait
+
+        tracks = [b for b in self.bins.values() if b.camera == camera]
+        unmatched = set(range(len(tracks)))
+        changes = []
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        for box, label in zip(boxes, labels):
+            best, best_iou = None, self.match_iou
+            if unmatched:
+                candidates = sorted(unmatched)
+                ious = box_iou(box, [tracks[i].box for i in candidates])
+                j = int(np.argmax(ious))
+                if ious[j] >= best_iou:
+                    best = candidates[j]
+            if best is None:
+                track = BinTrack(self._next_id, camera, box, self.votes)
+                self._next_id += 1
+                self.bins[track.bin_id] = track
+            else:
+                unmatched.discard(best)
+                track = tracks[best]
+                track.box = 0.7 * track.box + 0.3 * box
+                track.missed = 0
+            old = track.state
+            new = track.vote(label, self.min_votes)
+            if new is not None:
+                changes.append((track, old, new))
+
+        for i in unmatched:
+            track = tracks[i]
+            track.missed += 1
+            if track.missed >= self.forget_after:
+                del self.bins[track.bin_id]
+                if track.state is not None:
+                    changes.append((track, track.state, None))
+        return changes
+
+    def camera_bins(self, camera):
+        return [b for b in self.bins.values() if b.camera == camera]
+
+    def inventory(self):
+        """Station-wide count of confirmed bins per state"""
+        return Counter(b.state for b in self.bins.values() if b.state is not None)
+
+    def reset(self, camera=None):
+        for bin_id in [k for k, b in self.bins.items() if camera is None or b.camera == camera]:
+            del self.bins[bin_id]
+        for schedule in (self._next_sample, self._samples_taken):
+            for key in [k for k in schedule if camera is None or k == camera]:
+                del schedule[key]
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class PostureCheck:
+    """Cheap per-track fall screen run before fall_model.
+
+    A track is suspicious when its box is wider than it is tall (lying
+    down), when its centroid drops faster than ``drop_speed`` box heights per
+    second, or when its height collapses relative to its recent maximum.
+    Suspicion is held for ``hold`` seconds so a person who stays down keeps
+    being confirmed by the model.
+    """
+
+    def __init__(self, aspect=0.9, drop_speed=1.0, collapse=0.6, window=0.6, hold=3.0):
+        self.aspect = aspect
+        self.drop_speed = drop_speed
+        self.collapse = collapse
+        self.window = window
+        self.hold = hold
+        self.suspect_until = {}
+
+    def is_suspicious(self, track, now):
+        x1, y1, x2, y2 = track.box
+        w, h = x2 - x1, max(y2 - y1, 1.0)
+        suspicious = w / h >= self.aspect
+
+        if not suspicious and len(track.history) > 1:
+            past = [(t, b) for t, b in track.history if now - t <= self.window]
+            if len(past) > 1:
+                # Drop speed measured from the latest highest centroid in the window
+                centres = np.array([(b[1] + b[3]) * 0.5 for _, b in past])
+                top = len(centres) - 1 - int(np.argmin(centres[::-1]))
+                t0, b0 = past[top]
+                h0 = max(b0[3] - b0[1], 1.0)
+                dt = max(now - t0, 1e-3)
+                drop = ((y1 + y2) * 0.5 - centres[top]) / h0 / dt
+                heights = np.array([b[3] - b[1] for _, b in past])
+                suspicious = drop >= self.drop_speed or h / max(heights.max(), 1.0) <= self.collapse
+
+        if suspicious:
+            self.suspect_until[track.track_id] = now + self.hold
+        return suspicious or self.suspect_until.get(track.track_id, float('-inf')) >= now
+
+    def suspects(self, tracks, now):
+        """Return the subset of ``tracks`` that should go to fall_model"""
+        live = {t.track_id for t in tracks}
+        for track_id in [k for k in self.suspect_until if k not in live and self.suspect_until[k] < now]:
+            del self.suspect_until[track_id]
+        return [t for t in tracks if self.is_suspicious(t, now)]
+
+    def reset(self):
+        self.suspect_until.clear()
+
@@ -0,0 +1,180 @@
+"""Cheap colour/flicker gate that decides when fire_model has to run.
+
+Run ``python fire_gate.py CLIP_DIR`` to measure the gate's recall and model
+pass rate on a local labelled clip set. ``CLIP_DIR/labels.json`` maps each
+clip file name to a list of ``[first_frame, last_frame]`` ranges that contain
+fire or smoke, e.g. ``{"platform3_bin_fire.mp4": [[120, 860]], "quiet.mp4": []}``.
+"""
+import argparse
+import json
+import os
+import cv2
+import numpy as np
+
+
+class FireSmokeGate:
+    """Vectorized HSV + temporal flicker pre-filter for fire and smoke.
+
+    Works on a small downscaled copy of the frame. A pixel is a flame
+    candidate when it has a flame hue, is saturated and bright, and a smoke
+    candidate when it is grey, mid-bright and low-saturation; either kind
+    must also flicker against a running background. Connected candidate
+    regions become crops for the full model. The full frame is still sent
+    to the model every ``safety_interval`` seconds so a miss by the gate
+    cannot hide a fire for long.
+    """
+
+    def __init__(self, work_width=160, flame_hue=(0, 35), flame_sat=110, flame_val=170,
+                 smoke_sat=45, smoke_val=(90, 220), flicker=12, background_rate=0.05,
+                 min_area=0.002, safety_interval=5.0, crop_margin=0.15, max_crop_frac=0.5):
+        self.work_width = work_width
+        self.flame_hue = flame_hue
+        self.flame_sat = flame_sat
+        self.flame_val = flame_val
+        self.smoke_sat = smoke_sat
+        self.smoke_val = smoke_val
+        self.flicker = flicker
+        self.background_rate = background_rate
+        self.min_area = min_area
+        self.safety_interval = safety_interval
+        self.crop_margin = crop_margin
+        self.max_crop_frac = max_crop_frac
+        self.background = None
+        self.last_full_pass = None
+        self.frames = 0
+        self.model_runs = 0
+
+    def candidate_mask(self, frame):
+        """Return the low-resolution candidate mask and its scale factor to frame pixels"""
+        height, width = frame.shape[:2]
+        scale = width / float(self.work_width)
+        small = cv2.resize(frame, (self.work_width, max(1, int(round(height / scale)))),
+                           interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+
+        flame = (h >= self.flame_hue[0]) & (h <= self.flame_hue[1]) & (s >= self.flame_sat) & (v >= self.flame_val)
+        smoke = (s <= self.smoke_sat) & (v >= self.smoke_val[0]) & (v <= self.smoke_val[1])
+
+        value = v.astype(np.float32)
+        if self.background is None or self.background.shape != value.shape:
+            self.background = value.copy()
+            moving = np.ones_like(flame)
+        else:
+            moving = np.abs(value - self.background) >= self.flicker
+            cv2.accumulateWeighted(value, self.background, self.background_rate)
+
+        mask = ((flame | smoke) & moving).astype(np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+        return mask, scale
+
+    def regions(self, frame):
+        """Candidate boxes (x1, y1, x2, y2) in frame pixels"""
+        mask, scale = self.candidate_mask(frame)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        min_pixels = self.min_area * mask.size
+        boxes = [stats[i, :4] for i in range(1, count) if stats[i, cv2.CC_STAT_AREA] >= min_pixels]
+        if not boxes:
+            return np.zeros((0, 4), dtype=np.int32)
+        boxes = np.array(boxes, dtype=np.float32)
+        boxes[:, 2:] += boxes[:, :2]
+        return np.round(boxes * scale).astype(np.int32)
+
+    def check(self, frame, now):
+        """Decide what the full model should see for this frame.
+
+        Returns None when the model can be skipped, ``(0, 0, w, h)`` for a
+        full-frame pass, or a single crop box around all candidate regions.
+        """
+        self.frames += 1
+        height, width = frame.shape[:2]
+        boxes = self.regions(frame)
+
+        if self.last_full_pass is None or now - self.last_full_pass >= self.safety_interval:
+            self.last_full_pass = now
+            self.model_runs += 1
+            return (0, 0, width, height)
+        if len(boxes) == 0:
+            return None
+
+        self.model_runs += 1
+        x1, y1 = boxes[:, :2].min(axis=0)
+        x2, y2 = boxes[:, 2:].max(axis=0)
+        mx, my = (x2 - x1) * self.crop_margin + 16, (y2 - y1) * self.crop_margin + 16
+        x1, y1 = int(max(0, x1 - mx)), int(max(0, y1 - my))
+        x2, y2 = int(min(width, x2 + mx)), int(min(height, y2 + my))
+        if (x2 - x1) * (y2 - y1) > self.max_crop_frac * width * height:
+            self.last_full_pass = now
+            return (0, 0, width, height)
+        return (x1, y1, x2, y2)
+
+    @property
+    def pass_rate(self):
+        return self.model_runs / self.frames if self.frames else 0.0
+
+    def reset(self):
+        self.background = None
+        self.last_full_pass = None
+        self.frames = 0
+        self.model_runs = 0
+
+
+def evaluate_clips(clip_dir, gate_kwargs=None, size=(640, 480)):
+    """Run the gate (without the safety net) over labelled clips.
+
+    Returns a dict with recall on positive frames, pass rate on negative
+    frames and the overall fraction of frames that would reach the model.
+    """
+    with open(os.path.join(clip_dir, "labels.json")) as f:
+        labels = json.load(f)
+
+    positives = passed_positives = negatives = passed_negatives = 0
+    for clip, ranges in labels.items():
+        gate = FireSmokeGate(**dict(gate_kwargs or {}, safety_interval=float('inf')))
+        gate.last_full_pass = 0.0
+        cap = cv2.VideoCapture(os.path.join(clip_dir, clip))
+        index = 0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frame = cv2.resize(frame, size)
+            passed = gate.check(frame, 0.0) is not None
+            if any(start <= index <= end for start, end in ranges):
+                positives += 1
+                passed_positives += passed
+            else:
+                negatives += 1
+                passed_negatives += passed
+            index += 1
+        cap.release()
+
+    total = positives + negatives
+    return {
+        "frames": total,
+        "recall": passed_positives / positives if positives else None,
+        "negative_pass_rate": passed_negatives / negatives if negatives else None,
+        "model_fraction": (passed_positives + passed_negatives) / total if total else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the fire/smoke pre-filter on labelled clips")
+    parser.add_argument("clip_dir", help="Directory with clips and labels.json")
+    parser.add_argument("--flicker", type=float, nargs="+", default=[6, 12, 20])
+    parser.add_argument("--flame-sat", type=int, nargs="+", default=[80, 110, 140])
+    parser.add_argument("--min-area", type=float, nargs="+", default=[0.001, 0.002, 0.005])
+    args = parser.parse_args()
+
+    print(f"{'flicker':>8} {'flame_sat':>9} {'min_area':>8} {'recall':>7} {'neg_pass':>8} {'model%':>7}")
+    for flicker in args.flicker:
+        for flame_sat in args.flame_sat:
+            for min_area in args.min_area:
+                m = evaluate_clips(args.clip_dir, {"flicker": flicker, "flame_sat": flame_sat, "min_area": min_area})
+                recall = "-" if m["recall"] is None else f"{m['recall']:.3f}"
+                neg = "-" if m["negative_pass_rate"] is None else f"{m['negative_pass_rate']:.3f}"
+                print(f"{flicker:>8} {flame_sat:>9} {min_area:>8} {recall:>7} {neg:>8} {100 * m['model_fraction']:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
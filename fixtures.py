@@ -0,0 +1,364 @@
+"""Synthetic videos and stub models for reproducible performance runs.
+
+``SyntheticScene`` draws a deterministic station view: a rail band across
+the frame, person-like blobs walking across it (some fall over for a few
+seconds, some carry a weapon), flickering flame-coloured regions and static
+bins. Every object class is drawn in its own colour, and the stub models
+find objects again by colour, so they give consistent answers for whole
+frames, tiles and crops alike, with no weights, network or GPU::
+
+    python fixtures.py video fixtures/station.avi --seconds 60 --people 12 --fires 2 --bins 3
+    python fixtures.py bench --seconds 20 --people 40          # needs a display (e.g. xvfb-run)
+
+``video`` also writes per-event ground truth (``<name>.<event>.labels.json``,
+clip name -> frame ranges, as used by ``recording.py --labels``). ``bench``
+runs each module's ``process_*`` method end to end on a fixture with stub
+models in place of the YOLO models and reports the time per frame.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+
+from inference_server import RemoteResult
+
+# BGR colour of each kind of object; the stubs match within COLOR_TOLERANCE
+COLORS = {
+    "person": (200, 80, 40),
+    "weapon": (255, 0, 255),
+    "band": (70, 70, 70),
+    "rail": (185, 185, 185),
+    "bin_ok": (40, 160, 40),
+    "bin_full": (20, 60, 120),
+}
+COLOR_TOLERANCE = 25
+DUSTBIN_NAMES = ['Broken trash can', 'Close_empty', 'Close_full', 'Healthy trash can', 'Open_empty',
+                 'Open_full', 'Trash flow', 'closed', 'empty', 'full']
+
+
+class SyntheticScene:
+    """Deterministic moving-object scene; the same arguments always give the same frames"""
+
+    def __init__(self, width=640, height=480, fps=30.0, seconds=30.0, people=8, fires=1, bins=2,
+                 fall_rate=0.25, weapon_rate=0.15, seed=0):
+        self.width, self.height = width, height
+        self.fps = fps
+        self.frames = int(round(seconds * fps))
+        rng = np.random.default_rng(seed)
+        self.band = (int(0.55 * height), int(0.72 * height))
+
+        # People walk on straight lines and wrap around the frame edges
+        self.people = [{
+            "start": rng.uniform((0, 0.25 * height), (width, height)),
+            "velocity": rng.uniform(-1, 1, 2) * (0.15 * width, 0.08 * height),
+            "fall": rng.uniform(2, max(2.5, seconds - 4)) if rng.random() < fall_rate else None,
+            "weapon": bool(rng.random() < weapon_rate),
+        } for _ in range(people)]
+        # Fires burn for 6 s out of every 16 s, with staggered phases
+        self.fires = [{"center": rng.uniform((0.1 * width, 0.1 * height), (0.9 * width, 0.45 * height)),
+                       "radius": rng.uniform(0.03, 0.06) * width, "phase": rng.uniform(0, 16)}
+                      for _ in range(fires)]
+        self.bins = []
+        for i in range(bins):
+            x = int((i + 0.5) * width / max(bins, 1))
+            self.bins.append({"box": (x - 0.03 * width, 0.82 * height, x + 0.03 * width, 0.95 * height),
+                              "full": i % 2 == 1})
+        self.background = self._background(rng)
+
+    def _background(self, rng):
+        image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        image[:] = (120, 125, 110)
+        texture = rng.integers(-6, 7, (self.height // 8 + 1, self.width // 8 + 1, 1))
+        image = np.clip(image + np.kron(texture, np.ones((8, 8, 1)))[:self.height, :self.width], 0, 255)
+        image = image.astype(np.uint8)
+        y1, y2 = self.band
+        image[y1:y2] = COLORS["band"]
+        for y in (y1 + (y2 - y1) // 3, y1 + 2 * (y2 - y1) // 3):
+            cv2.line(image, (0, y), (self.width, y), COLORS["rail"], max(2, self.height // 160))
+        return image
+
+    def person_boxes(self, t):
+        """``(box, fallen, armed)`` for every person at time ``t`` (seconds)"""
+        people = []
+        for person in self.people:
+            fallen = person["fall"] is not None and person["fall"] <= t < person["fall"] + 4.0
+            moving_time = min(t, person["fall"]) if fallen else t
+            if person["fall"] is not None and t >= person["fall"] + 4.0:
+                moving_time = t - 4.0
+            x, y = person["start"] + person["velocity"] * moving_time
+            x %= self.width
+            y = 0.25 * self.height + (y - 0.25 * self.height) % (0.75 * self.height)
+            h = self.height * (0.12 + 0.12 * y / self.height)
+            w = 0.4 * h
+            if fallen:
+                w, h = h, 0.4 * h
+            people.append(((x - w / 2, y - h, x + w / 2, y), fallen, person["weapon"] and not fallen))
+        return people
+
+    def fire_boxes(self, t):
+        boxes = []
+        for fire in self.fires:
+            if (t + fire["phase"]) % 16.0 < 6.0:
+                (cx, cy), r = fire["center"], fire["radius"]
+                boxes.append((cx - r, cy - 1.6 * r, cx + r, cy + r))
+        return boxes
+
+    def render(self, index):
+        t = index / self.fps
+        frame = self.background.copy()
+        rng = np.random.default_rng(index)
+        for bin_ in self.bins:
+            x1, y1, x2, y2 = (int(v) for v in bin_["box"])
+            cv2.rectangle(frame, (x1, y1), (x2, y2), COLORS["bin_full" if bin_["full"] else "bin_ok"], -1)
+        for (x1, y1, x2, y2), fallen, armed in self.person_boxes(t):
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), COLORS["person"], -1)
+            if armed:
+                w = x2 - x1
+                cv2.rectangle(frame, (int(x2 - 0.1 * w), int(y1 + 0.4 * (y2 - y1))),
+                              (int(x2 + 0.25 * w), int(y1 + 0.5 * (y2 - y1))), COLORS["weapon"], -1)
+        for x1, y1, x2, y2 in self.fire_boxes(t):
+            # Flicker: jittered flame ellipses in red/orange/yellow
+            for _ in range(4):
+                cx = int((x1 + x2) / 2 + rng.uniform(-0.2, 0.2) * (x2 - x1))
+                cy = int(y2 - rng.uniform(0.2, 0.6) * (y2 - y1))
+                axes = (max(1, int(rng.uniform(0.2, 0.5) * (x2 - x1))), max(1, int(rng.uniform(0.2, 0.5) * (y2 - y1))))
+                cv2.ellipse(frame, (cx, cy), axes, 0, 0, 360, (0, int(rng.uniform(40, 220)), 255), -1)
+        return frame
+
+    def truth(self, index):
+        """Ground truth at a frame: people (with on-track/fallen/armed flags), fires and bins"""
+        t = index / self.fps
+        y1, y2 = self.band
+        people = [{"box": box, "on_track": y1 <= (box[1] + box[3]) / 2 < y2, "fallen": fallen, "armed": armed}
+                  for box, fallen, armed in self.person_boxes(t)]
+        return {"people": people, "fires": self.fire_boxes(t), "bins": self.bins}
+
+    def event_ranges(self):
+        """Frame ranges per event kind (trespassing, fall, weapon, fire)"""
+        ranges = {kind: [] for kind in ("trespassing", "fall", "weapon", "fire")}
+        open_since = {}
+        for index in range(self.frames + 1):
+            truth = self.truth(index) if index < self.frames else None
+            active = set()
+            if truth is not None:
+                if any(p["on_track"] for p in truth["people"]):
+                    active.add("trespassing")
+                if any(p["fallen"] for p in truth["people"]):
+                    active.add("fall")
+                if any(p["armed"] for p in truth["people"]):
+                    active.add("weapon")
+                if truth["fires"]:
+                    active.add("fire")
+            for kind in ranges:
+                if kind in active and kind not in open_since:
+                    open_since[kind] = index
+                elif kind not in active and kind in open_since:
+                    ranges[kind].append([open_since.pop(kind), index - 1])
+        return ranges
+
+    def write(self, path):
+        """Write the video (MJPG) and its ground-truth label files next to it"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), self.fps, (self.width, self.height))
+        for index in range(self.frames):
+            writer.write(self.render(index))
+        writer.release()
+        stem, name = os.path.splitext(path)[0], os.path.basename(path)
+        for kind, ranges in self.event_ranges().items():
+            with open(f"{stem}.{kind}.labels.json", "w") as f:
+                json.dump({name: ranges}, f)
+        return path
+
+
+def _as_image(source):
+    """BGR uint8 image from an array or a (1, 3, H, W) RGB float tensor"""
+    if hasattr(source, "cpu"):
+        source = (source[0].permute(1, 2, 0).cpu().numpy() * 255).astype(np.uint8)[..., ::-1]
+    return np.ascontiguousarray(source)
+
+
+def color_boxes(image, color, min_area=30):
+    """Boxes and pixel areas of the connected regions of ``color``"""
+    color = np.array(color, dtype=np.int16)
+    mask = cv2.inRange(image, np.clip(color - COLOR_TOLERANCE, 0, 255), np.clip(color + COLOR_TOLERANCE, 0, 255))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    stats = stats[1:count]
+    stats = stats[stats[:, cv2.CC_STAT_AREA] >= min_area]
+    x, y, w, h = (stats[:, i].astype(np.float32) for i in range(4))
+    return np.stack([x, y, x + w, y + h], axis=1), stats[:, cv2.CC_STAT_AREA].astype(np.float32)
+
+
+def flame_boxes(image, min_area=30):
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, (0, 200, 200), (35, 255, 255))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    stats = stats[1:count]
+    stats = stats[stats[:, cv2.CC_STAT_AREA] >= min_area]
+    x, y, w, h = (stats[:, i].astype(np.float32) for i in range(4))
+    return np.stack([x, y, x + w, y + h], axis=1), stats[:, cv2.CC_STAT_AREA].astype(np.float32)
+
+
+class StubModel:
+    """Callable like a YOLO model; finds the fixture's objects by colour.
+
+    Confidence grows with the region's area, so threshold sliders still
+    change what is kept.
+    """
+
+    device = "cpu"
+
+    def __init__(self, kind, names):
+        self.kind = kind
+        self.names = names
+        self.calls = 0
+
+    def detect(self, image):
+        if self.kind == "person":
+            boxes, area = color_boxes(image, COLORS["person"])
+            return boxes, area, np.zeros(len(boxes))
+        if self.kind == "weapon":
+            boxes, area = color_boxes(image, COLORS["weapon"], min_area=4)
+            return boxes, area, np.zeros(len(boxes))
+        if self.kind == "fall":
+            boxes, area = color_boxes(image, COLORS["person"])
+            wide = (boxes[:, 2] - boxes[:, 0]) > 1.8 * (boxes[:, 3] - boxes[:, 1])
+            return boxes, area, np.where(wide, 0, 1)
+        if self.kind == "fire":
+            boxes, area = flame_boxes(image)
+            return boxes, area, np.zeros(len(boxes))
+        if self.kind == "dustbin":
+            ok, ok_area = color_boxes(image, COLORS["bin_ok"])
+            full, full_area = color_boxes(image, COLORS["bin_full"])
+            return (np.concatenate([ok, full]), np.concatenate([ok_area, full_area]),
+                    np.concatenate([np.full(len(ok), DUSTBIN_NAMES.index('Healthy trash can')),
+                                    np.full(len(full), DUSTBIN_NAMES.index('Open_full'))]))
+        raise ValueError(f"Unknown stub kind {self.kind!r}")
+
+    def predict_one(self, image, conf=0.25, classes=None):
+        if self.kind == "track":
+            band = cv2.inRange(image, np.clip(np.array(COLORS["band"]) - COLOR_TOLERANCE, 0, 255),
+                               np.array(COLORS["band"]) + COLOR_TOLERANCE)
+            # People standing on the band hide it; a row that is mostly band counts as a whole
+            rows = (band > 0).mean(axis=1) > 0.3
+            mask = np.repeat(rows[:, None], image.shape[1], axis=1).astype(np.uint8)
+            return RemoteResult(np.zeros((0, 6), dtype=np.float32), mask if rows.any() else None)
+        boxes, area, cls = self.detect(image)
+        scores = 0.45 + 0.5 * np.minimum(1.0, area / (0.002 * image.shape[0] * image.shape[1] + 1))
+        keep = scores >= conf
+        if classes is not None:
+            keep &= np.isin(cls, classes)
+        data = np.concatenate([boxes, scores[:, None], cls[:, None]], axis=1)[keep].astype(np.float32)
+        return RemoteResult(data.reshape(-1, 6))
+
+    def __call__(self, source, verbose=False, conf=0.25, classes=None, **kwargs):
+        self.calls += 1
+        images = source if isinstance(source, list) else [source]
+        return [self.predict_one(_as_image(image), conf, classes) for image in images]
+
+
+def stub_models():
+    """Stub stand-ins keyed by the app's model attribute names"""
+    person = StubModel("person", {0: "person"})
+    return {
+        "weapon_model": StubModel("weapon", {0: "weapon"}),
+        "track_model": StubModel("track", {0: "track"}),
+        "person_model": person,
+        "crowd_model": person,
+        "fall_model": StubModel("fall", {0: "fall-detected", 1: "nofall"}),
+        "fire_model": StubModel("fire", {0: "Fire", 1: "Smoke"}),
+        "dustbin_model": StubModel("dustbin", dict(enumerate(DUSTBIN_NAMES))),
+    }
+
+
+def bench(video, modules=None):
+    """Time each module's ``process_*`` end to end on ``video`` with stub models"""
+    import tkinter as tk
+    from checkpoint import CheckpointStore
+    from UI import SecuritySystemApp
+
+    class StubApp(SecuritySystemApp):
+        def __init__(self, root):
+            self.stubs = stub_models()
+            self.alerts = []
+            super().__init__(root)
+
+        def model_available(self, name):
+            return True
+
+        def load_model(self, name, path=None):
+            return self.stubs[name.split(":")[0]]
+
+        def add_alert(self, message, is_important=False):
+            self.alerts.append(message)
+
+        def send_backend_alert(self, endpoint):
+            return None
+
+        def post_backend(self, endpoint, payload):
+            return None
+
+    root = tk.Tk()
+    root.withdraw()
+    app = StubApp(root)
+    app.load_pending_models()
+    app.checkpoints = CheckpointStore(tempfile.mkdtemp(prefix="fixture-checkpoints-"))
+    results = {}
+    for name in modules or list(app.modules):
+        module = app.modules[name]
+        module["video_path"] = video
+        app.alerts.clear()
+        app.start_detection(name, 'file')
+        frames, start = 0, time.perf_counter()
+        while module["active"]:
+            frame = app.read_frame()
+            if frame is None:
+                continue
+            app.analyse_frame(frame)
+            frames += 1
+        elapsed = time.perf_counter() - start
+        draw = app.renderer.stats(name).get(name, {})
+        results[name] = {"frames": frames, "ms_per_frame": 1000 * elapsed / max(frames, 1),
+                         "draw_ms": draw.get("mean_ms", 0.0),
+                         "alerts": sum("detected" in a or "Bin" in a for a in app.alerts)}
+    root.destroy()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic station videos and stub-model timing runs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command in ("video", "bench"):
+        p = sub.add_parser(command)
+        if command == "video":
+            p.add_argument("output")
+        else:
+            p.add_argument("--output", help="Fixture to write/use (default: a temporary file)")
+            p.add_argument("--modules", nargs="+")
+        p.add_argument("--width", type=int, default=640)
+        p.add_argument("--height", type=int, default=480)
+        p.add_argument("--fps", type=float, default=30.0)
+        p.add_argument("--seconds", type=float, default=30.0)
+        p.add_argument("--people", type=int, default=8)
+        p.add_argument("--fires", type=int, default=1)
+        p.add_argument("--bins", type=int, default=2)
+        p.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scene = SyntheticScene(args.width, args.height, args.fps, args.seconds, args.people, args.fires,
+                           args.bins, seed=args.seed)
+    output = args.output or os.path.join(tempfile.mkdtemp(prefix="fixture-"), "station.avi")
+    if args.command == "video" or not os.path.exists(output):
+        start = time.perf_counter()
+        scene.write(output)
+        print(f"Wrote {scene.frames} frames to {output} in {time.perf_counter() - start:.1f} s")
+    if args.command == "bench":
+        print(f"{'module':<22} {'frames':>7} {'ms/frame':>9} {'draw ms':>8} {'alerts':>7}")
+        for name, r in bench(output, args.modules).items():
+            print(f"{name:<22} {r['frames']:>7} {r['ms_per_frame']:>9.2f} {r['draw_ms']:>8.2f} {r['alerts']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""Local inference service that owns the models and batches requests.
+
+Several operator consoles (or headless jobs) on one machine would each load
+their own copy of every model. Instead, run one server next to ``api.py``
+and point the UIs at it::
+
+    python inference_server.py serve --port 8001               # or --uds /tmp/inference.sock
+    INFERENCE_SERVER=http://127.0.0.1:8001 python UI.py       # or unix:/tmp/inference.sock
+
+Requests from all clients land in one queue per model file (names that
+share a file, like ``person_model`` and ``crowd_model``, share one loaded
+model and its queue). A batcher thread
+takes the first waiting request, keeps collecting until ``max_batch`` images
+or ``max_wait`` seconds have passed, and runs them through the model in a
+single call (requests with different ``conf``/``imgsz``/``classes`` are run
+as separate groups of the same round). ``bench`` measures client-side p50/p99
+latency and throughput for a grid of batch settings::
+
+    python inference_server.py bench --url http://127.0.0.1:8001 --clients 1 4 8 --batch 1 4 8 --wait 0 5 10
+
+Wire format: a request body is one JSON header line (model, image shapes,
+keyword arguments) followed by the raw uint8 BGR images back to back. A
+response is one ``wire.py`` message with a run of detections per image,
+followed per image by a uint32 mask height and width and, for segmentation
+models, the combined uint8 mask.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from urllib.parse import urlparse
+import numpy as np
+
+from detections import Detections
+from models import MODEL_FILES
+from wire import WireEncoder, WireDecoder
+
+# Height and width of the mask that follows each image's results (0, 0 for none)
+MASK_SHAPE = struct.Struct("<II")
+
+
+def encode_request(model, images, kwargs):
+    images = [np.ascontiguousarray(image, dtype=np.uint8) for image in images]
+    header = {"model": model, "shapes": [list(image.shape) for image in images], "kwargs": kwargs}
+    return b"".join([json.dumps(header).encode(), b"\n"] + [image.tobytes() for image in images])
+
+
+def decode_request(body):
+    end = body.index(b"\n")
+    header = json.loads(body[:end])
+    images, offset = [], end + 1
+    for shape in header["shapes"]:
+        size = int(np.prod(shape))
+        images.append(np.frombuffer(body, dtype=np.uint8, count=size, offset=offset).reshape(shape))
+        offset += size
+    return header, images
+
+
+def encode_results(results):
+    encoder = WireEncoder(delta_time=False)
+    masks = []
+    for index, result in enumerate(results):
+        encoder.add("", index, 0.0, "", Detections.from_result(result))
+        if result.masks is not None and len(result.masks):
+            mask = np.any(result.masks.data.cpu().numpy() > 0.5, axis=0).astype(np.uint8)
+            masks.append(MASK_SHAPE.pack(*mask.shape) + mask.tobytes())
+        else:
+            masks.append(MASK_SHAPE.pack(0, 0))
+    return b"".join([encoder.encode()] + masks)
+
+
+class RemoteBoxes:
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class RemoteMasks:
+    """One combined (H, W) mask in the server's mask resolution, as ``data[None]``"""
+
+    def __init__(self, mask):
+        self.data = mask[None]
+
+    def __len__(self):
+        return len(self.data)
+
+
+class RemoteResult:
+    """The parts of an Ultralytics result the modules read (``boxes.data``, ``masks.data``)"""
+
+    def __init__(self, boxes, masks=None):
+        self.boxes = RemoteBoxes(boxes)
+        self.masks = RemoteMasks(masks) if masks is not None else None
+
+
+def decode_results(body):
+    message, offset = WireDecoder().decode(body)
+    results = []
+    for run in range(len(message)):
+        detections = message.detections(run)
+        data = np.column_stack([detections.xyxy, detections.conf, detections.cls]).astype(np.float32)
+        height, width = MASK_SHAPE.unpack_from(body, offset)
+        offset += MASK_SHAPE.size
+        mask = None
+        if height:
+            mask = np.frombuffer(body, dtype=np.uint8, count=height * width, offset=offset).reshape(height, width)
+            offset += height * width
+        results.append(RemoteResult(data, mask))
+    return results
+
+
+class _Request:
+    __slots__ = ("images", "kwargs", "key", "future", "enqueued")
+
+    def __init__(self, images, kwargs):
+        self.images = images
+        self.kwargs = kwargs
+        self.key = json.dumps(kwargs, sort_keys=True)
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class Batcher:
+    """Dynamic batching for one model.
+
+    The batch closes when it holds ``max_batch`` images or ``max_wait``
+    seconds after its first request arrived, whichever comes first. Both can
+    be changed while running. With a thread ``budget``, batchers that share
+    ``lock`` take turns: the intra-op thread count is process-wide, so one
+    model's switch must not land while another model is running. ``name``
+    is the model file; ``models`` are the names it is served under and
+    ``budget_name`` the one whose thread setting applies.
+    """
+
+    def __init__(self, name, model, max_batch=8, max_wait=0.005, history=4096, budget=None, lock=None,
+                 models=None, budget_name=None):
+        self.name = name
+        self.model = model
+        self.models = list(models or [name])
+        self.budget_name = budget_name or self.models[0]
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.budget = budget
+        self.lock = lock or threading.Lock()
+        self.queue = queue.Queue()
+        self.latencies = deque(maxlen=history)
+        self.batches = deque(maxlen=history)
+        self.thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, images, kwargs):
+        request = _Request(images, kwargs)
+        self.queue.put(request)
+        return request.future
+
+    def _collect(self):
+        first = self.queue.get()
+        batch, size = [first], len(first.images)
+        deadline = first.enqueued + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.images)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+            for requests in groups.values():
+                images = [image for request in requests for image in request.images]
+                try:
+                    with self.lock:
+                        if self.budget is not None:
+                            self.budget.use(self.budget_name)
+                        results = self.model(images, verbose=False, **requests[0].kwargs)
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                done = time.perf_counter()
+                self.batches.append((done, len(images)))
+                start = 0
+                for request in requests:
+                    count = len(request.images)
+                    request.future.set_result(encode_results(results[start:start + count]))
+                    start += count
+                    self.latencies.append(done - request.enqueued)
+
+    def stats(self, window=10.0):
+        now = time.perf_counter()
+        recent = [n for t, n in list(self.batches) if now - t <= window]
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {"models": self.models, "threads_from": self.budget_name,
+                "max_batch": self.max_batch, "max_wait_ms": 1000 * self.max_wait,
+                "queued": self.queue.qsize(), "images_per_s": sum(recent) / window,
+                "mean_batch": float(np.mean(recent)) if recent else 0.0,
+                "p50_ms": 1000 * float(np.percentile(latencies, 50)),
+                "p99_ms": 1000 * float(np.percentile(latencies, 99))}
+
+
+def create_app(batchers):
+    from fastapi import FastAPI, HTTPException, Request, Response
+
+    app = FastAPI()
+
+    @app.get("/models")
+    def models():
+        return {name: {int(k): v for k, v in b.model.names.items()} for name, b in batchers.items()}
+
+    @app.post("/predict")
+    async def predict(request: Request):
+        header, images = decode_request(await request.body())
+        batcher = batchers.get(header["model"])
+        if batcher is None:
+            raise HTTPException(status_code=404, detail=f"Model {header['model']!r} is not loaded")
+        payload = await asyncio.wrap_future(batcher.submit(images, header["kwargs"]))
+        return Response(payload, media_type="application/octet-stream")
+
+    # Names that share a model file share its batcher; stats and settings are per file
+    files = list(dict.fromkeys(batchers.values()))
+
+    @app.get("/stats")
+    def stats():
+        return {b.name: b.stats() for b in files}
+
+    @app.post("/config")
+    def config(max_batch: int = None, max_wait_ms: float = None, model: str = None):
+        for b in files:
+            if model is None or model == b.name or model in b.models:
+                if max_batch is not None:
+                    b.max_batch = max(1, max_batch)
+                if max_wait_ms is not None:
+                    b.max_wait = max(0.0, max_wait_ms / 1000.0)
+        return stats()
+
+    return app
+
+
+def load_batchers(names, max_batch, max_wait):
+    """One Batcher per model file, served under every name that uses the file.
+
+    A loaded model is not safe to call from two threads, so names sharing a
+    file share its batcher thread too.
+    """
+    from ultralytics import YOLO
+    from threads import ThreadBudget
+
+    budget = ThreadBudget.load().single_process()
+    budget.apply()
+    lock = threading.Lock()
+    by_path = {}
+    for name in names:
+        path = MODEL_FILES[name]
+        if not os.path.exists(path):
+            print(f"Warning: {path} not found, {name} will not be served")
+            continue
+        by_path.setdefault(path, []).append(name)
+    batchers = {}
+    for path, served in by_path.items():
+        # One batch serves all of the file's names, so the largest of their thread settings wins
+        batcher = Batcher(os.path.basename(path), YOLO(path), max_batch, max_wait, budget=budget, lock=lock,
+                          models=served, budget_name=max(served, key=budget.threads_for))
+        for name in served:
+            batchers[name] = batcher
+    return batchers
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class InferenceClient:
+    """Client for the inference server; ``url`` is ``http://host:port`` or ``unix:/path/to.sock``.
+
+    Keeps one persistent connection per calling thread.
+    """
+
+    def __init__(self, url, timeout=30.0):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        if self.url.startswith("unix:"):
+            return _UnixConnection(self.url[len("unix:"):], self.timeout)
+        parsed = urlparse(self.url)
+        return http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=self.timeout)
+
+    def _request(self, method, path, body=None):
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = self._connect()
+            try:
+                connection.request(method, path, body=body)
+                response = connection.getresponse()
+                payload = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"Inference server returned {response.status}: {payload[:200]!r}")
+            return payload
+
+    def models(self):
+        return {name: {int(k): v for k, v in names.items()}
+                for name, names in json.loads(self._request("GET", "/models")).items()}
+
+    def predict(self, model, images, **kwargs):
+        return decode_results(self._request("POST", "/predict", encode_request(model, images, kwargs)))
+
+    def stats(self):
+        return json.loads(self._request("GET", "/stats"))
+
+    def configure(self, max_batch=None, max_wait_ms=None):
+        params = [f"{k}={v}" for k, v in (("max_batch", max_batch), ("max_wait_ms", max_wait_ms)) if v is not None]
+        return json.loads(self._request("POST", "/config?" + "&".join(params)))
+
+    def model(self, name, names=None):
+        """A stand-in for a loaded YOLO model, or None when the server does not serve ``name``"""
+        names = names if names is not None else self.models().get(name)
+        return RemoteModel(self, name, names) if names is not None else None
+
+
+class RemoteModel:
+    """Callable like a YOLO model: ``model(source, **kwargs)`` returns a list of results"""
+
+    device = "cpu"
+
+    def __init__(self, client, name, names):
+        self.client = client
+        self.name = name
+        self.names = names
+
+    def __call__(self, source, verbose=False, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        return self.client.predict(self.name, images, **kwargs)
+
+
+def bench(url, clients, batches, waits, duration=10.0, model="person_model", video=None):
+    """Client-side latency and throughput for each (max_batch, max_wait) setting"""
+    from threads import load_frames
+
+    frames = load_frames(video, 16)
+    control = InferenceClient(url)
+    rows = []
+    for max_batch in batches:
+        for wait in waits:
+            control.configure(max_batch=max_batch, max_wait_ms=wait)
+            for count in clients:
+                latencies = []
+                stop = time.perf_counter() + duration
+
+                def run(i):
+                    client = InferenceClient(url)
+                    client.predict(model, [frames[0]])
+                    n = i
+                    while time.perf_counter() < stop:
+                        start = time.perf_counter()
+                        client.predict(model, [frames[n % len(frames)]])
+                        latencies.append(time.perf_counter() - start)
+                        n += 1
+
+                threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+                rows.append((max_batch, wait, count, len(latencies) / duration,
+                             np.percentile(lat, 50), np.percentile(lat, 99)))
+                print(f"{max_batch:>5} {wait:>7.1f} {count:>7} {rows[-1][3]:>9.1f} {rows[-1][4]:>8.1f} {rows[-1][5]:>8.1f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared, dynamically batched model server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Load the models and serve them")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8001)
+    serve.add_argument("--uds", help="Listen on this Unix socket instead of TCP")
+    serve.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES))
+    serve.add_argument("--max-batch", type=int, default=8)
+    serve.add_argument("--max-wait-ms", type=float, default=5.0)
+    run = sub.add_parser("bench", help="Measure latency and throughput against batch settings")
+    run.add_argument("--url", default="http://127.0.0.1:8001")
+    run.add_argument("--model", default="person_model")
+    run.add_argument("--video", help="Clip to take frames from (random frames when omitted)")
+    run.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8])
+    run.add_argument("--batch", type=int, nargs="+", default=[1, 4, 8])
+    run.add_argument("--wait", type=float, nargs="+", default=[0.0, 5.0, 10.0], help="max wait in ms")
+    run.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        print(f"{'batch':>5} {'wait_ms':>7} {'clients':>7} {'req/s':>9} {'p50_ms':>8} {'p99_ms':>8}")
+        bench(args.url, args.clients, args.batch, args.wait, args.duration, args.model, args.video)
+        return
+
+    import uvicorn
+    app = create_app(load_batchers(args.models, args.max_batch, args.max_wait_ms / 1000.0))
+    if args.uds:
+        uvicorn.run(app, uds=args.uds)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Memory budget for loaded models and frame buffers.
+
+Models are registered with a loader instead of being loaded up front. Each
+one is loaded on its first call, and its resident size (weights and buffers)
+is measured then. When the tracked total of loaded models plus registered
+frame buffers goes over the budget, the least recently used models are
+unloaded. They are reloaded the next time they are called.
+
+``python memory.py --budget 1500`` loads every model in ``models.MODEL_FILES``
+once and prints its size, each module's footprint and whether all modules fit
+together in the budget.
+"""
+import argparse
+import gc
+import os
+import time
+from collections import OrderedDict
+
+from models import MODEL_FILES, MODULE_MODELS
+
+MB = 1024 * 1024
+
+
+def model_bytes(model):
+    """Bytes held by a model's parameters and buffers"""
+    module = getattr(model, "model", model)
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def process_rss():
+    """Resident set size of this process in bytes (0 where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class ModelMemory:
+    """Tracks model and buffer memory against ``budget_mb`` (no limit when None).
+
+    ``register`` returns a ``ManagedModel`` that can be used wherever a
+    loaded YOLO model is. Models sharing a weight file share one loaded copy.
+    """
+
+    def __init__(self, budget_mb=None):
+        self.budget_mb = budget_mb
+        self.loaders = {}
+        self.files = {}
+        self.loaded = OrderedDict()
+        self.sizes = {}
+        self.names = {}
+        self.buffers = {}
+        self.loads = 0
+        self.unloads = 0
+
+    def register(self, name, loader, key=None):
+        """Declare a model; ``key`` (e.g. its weight file) groups models that share one copy"""
+        key = key or name
+        self.loaders[key] = loader
+        self.files[name] = key
+        return ManagedModel(self, name)
+
+    def get(self, name):
+        """The loaded model behind ``name``, loading it (and unloading others) if needed"""
+        key = self.files[name]
+        model = self.loaded.get(key)
+        if model is not None:
+            self.loaded.move_to_end(key)
+            return model
+        if key in self.sizes:
+            # Size is known from an earlier load, so make room before loading again
+            self.enforce(extra=self.sizes[key])
+        model = self.loaders[key]()
+        self.loaded[key] = model
+        self.sizes[key] = model_bytes(model)
+        self.names[key] = model.names
+        self.loads += 1
+        self.enforce()
+        return model
+
+    def model_names(self, name):
+        """Class names of ``name`` without keeping the model loaded longer than needed"""
+        key = self.files[name]
+        if key not in self.names:
+            self.get(name)
+        return self.names[key]
+
+    def set_buffer(self, name, nbytes):
+        """Record the current size of a frame buffer (0 drops it)"""
+        grew = int(nbytes) > self.buffers.get(name, 0)
+        if nbytes:
+            self.buffers[name] = int(nbytes)
+        else:
+            self.buffers.pop(name, None)
+        if grew:
+            self.enforce()
+
+    def used_bytes(self):
+        return sum(self.sizes[key] for key in self.loaded) + sum(self.buffers.values())
+
+    def enforce(self, extra=0):
+        """Unload least recently used models until usage plus ``extra`` fits the budget.
+
+        The most recently used model is never unloaded, so one model always
+        stays usable even when the budget is smaller than it.
+        """
+        if self.budget_mb is None:
+            return
+        unloaded = False
+        while len(self.loaded) > (0 if extra else 1) and self.used_bytes() + extra > self.budget_mb * MB:
+            self.loaded.popitem(last=False)
+            self.unloads += 1
+            unloaded = True
+        if unloaded:
+            gc.collect()
+
+    def unload(self, name=None):
+        """Unload one model (or all) now, e.g. when its module stops"""
+        keys = list(self.loaded) if name is None else [self.files[name]]
+        for key in keys:
+            if self.loaded.pop(key, None) is not None:
+                self.unloads += 1
+        gc.collect()
+
+    def usage(self):
+        """Current usage in MB: per loaded model, per buffer, totals and the process RSS"""
+        models = {name: self.sizes[key] / MB for name, key in self.files.items() if key in self.loaded}
+        return {"models": models, "buffers": {k: v / MB for k, v in self.buffers.items()},
+                "used": self.used_bytes() / MB, "budget": self.budget_mb, "rss": process_rss() / MB,
+                "loads": self.loads, "unloads": self.unloads}
+
+    def summary(self):
+        usage = self.usage()
+        text = f"{usage['used']:.0f}"
+        if usage["budget"] is not None:
+            text += f"/{usage['budget']:.0f}"
+        return f"Memory: {text} MB, {len(self.loaded)} model(s) loaded"
+
+
+class ManagedModel:
+    """Callable like a YOLO model; loads through the memory manager on use"""
+
+    def __init__(self, memory, name):
+        self.memory = memory
+        self.name = name
+
+    @property
+    def names(self):
+        return self.memory.model_names(self.name)
+
+    @property
+    def device(self):
+        return self.memory.get(self.name).device
+
+    def __call__(self, source, **kwargs):
+        return self.memory.get(self.name)(source, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure model memory and check which modules fit a budget")
+    parser.add_argument("--budget", type=float, help="Budget in MB")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    sizes = {}
+    print(f"{'model':<16} {'file':<22} {'weights MB':>10} {'RSS +MB':>8} {'load s':>7}")
+    for name, path in MODEL_FILES.items():
+        if not os.path.exists(path):
+            print(f"{name:<16} {path:<22} {'missing':>10}")
+            continue
+        before, start = process_rss(), time.perf_counter()
+        model = YOLO(path)
+        elapsed = time.perf_counter() - start
+        sizes[name] = model_bytes(model) / MB
+        print(f"{name:<16} {path:<22} {sizes[name]:>10.1f} {(process_rss() - before) / MB:>8.1f} {elapsed:>7.2f}")
+        del model
+        gc.collect()
+
+    print(f"\n{'module':<22} {'MB':>8}")
+    for module, names in MODULE_MODELS.items():
+        print(f"{module:<22} {sum(sizes.get(n, 0.0) for n in set(names)):>8.1f}")
+    files = {MODEL_FILES[n]: size for n, size in sizes.items()}
+    total = sum(files.values())
+    print(f"\nAll models (shared files counted once): {total:.1f} MB")
+    if args.budget is not None:
+        verdict = "fit" if total <= args.budget else "do not fit; least recently used models will be unloaded"
+        print(f"Budget {args.budget:.0f} MB: all modules {verdict}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# Weight files loaded by SecuritySystemApp.initialize_models, keyed by the app attribute
+MODEL_FILES = {
+    "weapon_model": "weapon.pt",
+    "track_model": "train_segmented.pt",
+    "person_model": "yolo11n.pt",
+    "crowd_model": "yolo11n.pt",
+    "fall_model": "fall_model.pt",
+    "fire_model": "fire.pt",
+    "dustbin_model": "dustbin.pt",
+}
+
+# Models each module runs (weapon, trespassing and fall also need the person pass)
+MODULE_MODELS = {
+    "weapon_detection": ("person_model", "weapon_model"),
+    "trespassing_detection": ("person_model", "track_model"),
+    "fall_detection": ("person_model", "fall_model"),
+    "crowd_detection": ("crowd_model",),
+    "fire_detection": ("fire_model",),
+    "dustbin_detection": ("dustbin_model",),
+}
+
+# Larger counterparts used by cascade mode (cascade.py); a missing file leaves that model without a cascade
+CASCADE_FILES = {
+    "person_model": "yolo11m.pt",
+    "crowd_model": "yolo11m.pt",
+    "weapon_model": "weapon_large.pt",
+    "fire_model": "fire_large.pt",
+}
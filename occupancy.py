@@ -0,0 +1,213 @@
+"""Station-wide occupancy from the crowd counts of many cameras.
+
+Consoles report per-zone person counts for their camera (``POST /occupancy``
+on ``api.py``; zones are polygons drawn per camera in ``occupancy.json``,
+see ``crowd_density.ZoneMap``). A zone is named ``platform/area``, and the
+same name in two cameras means the same piece of floor seen twice. Each zone
+is counted once, from the camera that sees the most people in it, so people
+standing where views overlap are not counted twice. Platforms sum their
+zones and the station sums its platforms.
+
+Every platform and the station keep a time-weighted mean and peak over
+rolling 1 min, 15 min and 1 h windows, and an EWMA of the count. A window is
+a fixed ring of buckets, so memory does not grow with the number of reports.
+Threshold events are raised on the EWMA with hysteresis, so a count hovering
+at the limit does not flap.
+"""
+import json
+import os
+
+import numpy as np
+
+DEFAULT_PATH = "occupancy.json"
+WINDOWS = {"1m": 60.0, "15m": 900.0, "1h": 3600.0}
+STATION = "station"
+
+
+def load_config(path=DEFAULT_PATH):
+    """``{"cameras": {key: {zone: polygon}}, "thresholds": {area: count}}``; empty when the file is missing"""
+    if not os.path.exists(path):
+        return {"cameras": {}, "thresholds": {}}
+    with open(path) as f:
+        config = json.load(f)
+    config.setdefault("cameras", {})
+    config.setdefault("thresholds", {})
+    return config
+
+
+def platform_of(zone):
+    return zone.split("/", 1)[0]
+
+
+class RollingWindow:
+    """Time-weighted mean and peak of a value over the last ``span`` seconds in ``buckets`` slots"""
+
+    def __init__(self, span, buckets=60):
+        self.span = span
+        self.width = span / buckets
+        self.slot = np.full(buckets, -1, dtype=np.int64)
+        self.weighted = np.zeros(buckets)
+        self.seconds = np.zeros(buckets)
+        self.peak = np.zeros(buckets)
+
+    def add(self, now, value, seconds):
+        """Credit ``value`` held for ``seconds`` up to ``now``"""
+        slot = int(now // self.width)
+        i = slot % len(self.slot)
+        if self.slot[i] != slot:
+            self.slot[i] = slot
+            self.weighted[i] = self.seconds[i] = self.peak[i] = 0.0
+        self.weighted[i] += value * seconds
+        self.seconds[i] += seconds
+        self.peak[i] = max(self.peak[i], value)
+
+    def live(self, now):
+        return self.slot > int(now // self.width) - len(self.slot)
+
+    def mean(self, now):
+        live = self.live(now)
+        seconds = self.seconds[live].sum()
+        return float(self.weighted[live].sum() / seconds) if seconds else 0.0
+
+    def max(self, now):
+        live = self.live(now)
+        return float(self.peak[live].max()) if live.any() else 0.0
+
+
+class Ewma:
+    """Exponentially weighted moving average over irregular updates (``half_life`` in seconds)"""
+
+    def __init__(self, half_life=30.0):
+        self.half_life = half_life
+        self.value = None
+        self.time = None
+
+    def update(self, now, value):
+        if self.value is None:
+            self.value = float(value)
+        else:
+            alpha = 1.0 - 0.5 ** (max(now - self.time, 0.0) / self.half_life)
+            self.value += alpha * (value - self.value)
+        self.time = now
+        return self.value
+
+
+class AreaStats:
+    """Current count, EWMA and rolling windows of one platform (or the station)"""
+
+    def __init__(self, half_life):
+        self.value = 0.0
+        self.since = None
+        self.ewma = Ewma(half_life)
+        self.windows = {label: RollingWindow(span) for label, span in WINDOWS.items()}
+        self.above = False
+
+    def advance(self, now):
+        """Credit the current value to the windows up to ``now``"""
+        if self.since is not None and now > self.since:
+            for window in self.windows.values():
+                window.add(now, self.value, now - self.since)
+        self.since = now
+
+    def set(self, now, value):
+        self.advance(now)
+        self.value = float(value)
+        self.ewma.update(now, value)
+
+    def snapshot(self, now):
+        self.advance(now)
+        return {"count": self.value, "ewma": self.ewma.value if self.ewma.value is not None else 0.0,
+                **{label: {"mean": w.mean(now), "max": w.max(now)} for label, w in self.windows.items()}}
+
+
+class StationOccupancy:
+    """Aggregates per-camera zone counts into platform and station occupancy.
+
+    ``report`` returns the threshold events it caused. A camera's counts are
+    dropped when it has not reported for ``stale`` seconds. ``clear`` is
+    the share of a threshold the EWMA must fall below before it can trigger
+    again.
+    """
+
+    def __init__(self, thresholds=None, half_life=30.0, stale=15.0, clear=0.9):
+        self.thresholds = dict(thresholds or {})
+        self.half_life = half_life
+        self.stale = stale
+        self.clear = clear
+        self.counts = {}
+        self.seen = {}
+        self.areas = {STATION: AreaStats(half_life)}
+        self.events = 0
+
+    def report(self, camera, zones, now):
+        """Record ``{zone: count}`` from ``camera`` at ``now`` (seconds)"""
+        platforms = self.expire(now) | {platform_of(zone) for zone in zones}
+        # Zones this camera stopped reporting leave their platform too
+        for zone in [z for c, z in self.counts if c == camera and z not in zones]:
+            platforms.add(platform_of(zone))
+            del self.counts[(camera, zone)]
+        for zone, count in zones.items():
+            self.counts[(camera, zone)] = count
+        self.seen[camera] = now
+        return self.update(now, platforms)
+
+    def expire(self, now):
+        """Drop cameras that went quiet; returns the platforms they covered"""
+        quiet = {camera for camera, seen in self.seen.items() if now - seen > self.stale}
+        platforms = set()
+        for camera, zone in [key for key in self.counts if key[0] in quiet]:
+            platforms.add(platform_of(zone))
+            del self.counts[(camera, zone)]
+        for camera in quiet:
+            del self.seen[camera]
+        return platforms
+
+    def zone_counts(self):
+        """Each zone counted once: the largest count among the cameras that see it"""
+        zones = {}
+        for (camera, zone), count in self.counts.items():
+            zones[zone] = max(zones.get(zone, 0), count)
+        return zones
+
+    def update(self, now, platforms):
+        totals = {}
+        for zone, count in self.zone_counts().items():
+            totals[platform_of(zone)] = totals.get(platform_of(zone), 0) + count
+        events = []
+        for platform in platforms:
+            area = self.areas.get(platform)
+            if area is None:
+                area = self.areas[platform] = AreaStats(self.half_life)
+            area.set(now, totals.get(platform, 0))
+            events += self.check(platform, area, now)
+        station = self.areas[STATION]
+        station.set(now, sum(totals.values()))
+        return events + self.check(STATION, station, now)
+
+    def check(self, name, area, now):
+        level = self.thresholds.get(name)
+        if level is None:
+            return []
+        smoothed = area.ewma.value
+        if not area.above and smoothed >= level:
+            area.above = True
+        elif area.above and smoothed < level * self.clear:
+            area.above = False
+        else:
+            return []
+        self.events += 1
+        return [{"id": self.events, "time": now, "area": name, "state": "above" if area.above else "below",
+                 "threshold": level, "ewma": smoothed, "count": area.value}]
+
+    def tick(self, now):
+        """Expire cameras that went quiet between reports; returns the events that caused"""
+        expired = self.expire(now)
+        return self.update(now, expired) if expired else []
+
+    def snapshot(self, now, area=None):
+        """Current occupancy of one area, or of the station and every platform"""
+        if area is not None:
+            return self.areas[area].snapshot(now) if area in self.areas else None
+        return {"station": self.areas[STATION].snapshot(now),
+                "platforms": {name: a.snapshot(now) for name, a in self.areas.items() if name != STATION},
+                "cameras": sorted(self.seen)}
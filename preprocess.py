@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class FrameTensorCache:
+    """Per-frame model input shared by every YOLO model that sees the whole frame.
+
+    Ultralytics letterboxes, converts BGR to RGB, normalises and builds a
+    tensor on every call. A frame whose sides are already multiples of the
+    model stride (640x480 here) needs no letterboxing, so the normalised
+    BCHW tensor is built once per frame and device and handed to each model
+    directly; Ultralytics skips its own preprocessing for tensor inputs.
+    Entries belong to one frame and are dropped by ``retire``.
+    """
+
+    def __init__(self, stride=32):
+        self.stride = stride
+        self.frame_id = None
+        self.tensors = {}
+        self.built = 0
+        self.reused = 0
+
+    def usable(self, frame, imgsz=None):
+        """True when ``frame`` can be fed as-is for a model run at ``imgsz``"""
+        height, width = frame.shape[:2]
+        if height % self.stride or width % self.stride:
+            return False
+        return imgsz is None or imgsz == max(height, width)
+
+    def get(self, frame_id, frame, device='cpu'):
+        """Return the (1, 3, H, W) float tensor for ``frame``, building it on first use"""
+        if frame_id != self.frame_id:
+            self.retire()
+            self.frame_id = frame_id
+        key = str(device)
+        tensor = self.tensors.get(key)
+        if tensor is not None:
+            self.reused += 1
+            return tensor
+
+        cpu = self.tensors.get('cpu')
+        if cpu is None:
+            import torch
+            rgb = np.ascontiguousarray(frame[..., ::-1].transpose(2, 0, 1))
+            cpu = torch.from_numpy(rgb).unsqueeze(0).float().div_(255.0)
+            self.tensors['cpu'] = cpu
+        tensor = cpu if key == 'cpu' else cpu.to(device, non_blocking=True)
+        self.tensors[key] = tensor
+        self.built += 1
+        return tensor
+
+    def retire(self, frame_id=None):
+        """Free the cached tensors (only if they belong to ``frame_id`` when given)"""
+        if frame_id is None or frame_id == self.frame_id:
+            self.tensors.clear()
+            self.frame_id = None
+
+    @property
+    def nbytes(self):
+        """Bytes held by the current frame's tensors"""
+        return sum(t.element_size() * t.nelement() for t in self.tensors.values())
+
+    @property
+    def reuse_rate(self):
+        total = self.built + self.reused
+        return self.reused / total if total else 0.0
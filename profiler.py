@@ -0,0 +1,152 @@
+"""Low-overhead sampling profiler that can be switched on in a running app.
+
+A background thread wakes every ``interval`` seconds, reads the Python
+stack of the sampled thread (the UI thread by default) with
+``sys._current_frames`` and counts it under the module and stage the app
+last tagged (e.g. ``fire_detection;inference;fire_model``). Nothing is
+hooked into the interpreter, so the sampled code runs at full speed and the
+cost is the sampler thread's own time, a fraction of a percent of one core
+at the default 200 Hz.
+
+Output is one collapsed-stack file per session (``profiles/<time>.collapsed``,
+one ``frame;frame;... count`` line per distinct stack), which
+``flamegraph.pl`` or https://speedscope.app render directly.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class SamplingProfiler:
+    """Stack sampler with module/stage tags; ``start`` and ``stop`` may be called at any time"""
+
+    def __init__(self, interval=0.005, directory="profiles", max_depth=80):
+        self.interval = interval
+        self.directory = directory
+        self.max_depth = max_depth
+        self.module = None
+        self.stage = None
+        self.counts = Counter()
+        self.samples = 0
+        self.sampler_time = 0.0
+        self.started = None
+        self.path = None
+        self._labels = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._target = None
+        self._all_threads = False
+        self._deadline = None
+        self._on_finish = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def tag(self, module, stage=None):
+        """Attribute the following samples to ``module`` / ``stage`` (None clears)"""
+        self.module = module
+        self.stage = stage
+
+    @contextmanager
+    def staged(self, stage):
+        """Tag a nested stage for the duration of a ``with`` block"""
+        previous = self.stage
+        self.stage = stage
+        try:
+            yield
+        finally:
+            self.stage = previous
+
+    def start(self, duration=30.0, thread=None, all_threads=False, on_finish=None):
+        """Sample ``thread`` (default: the calling thread) for ``duration`` seconds (None = until stopped).
+
+        ``on_finish(path)`` is called from the sampler thread when the profile is written.
+        """
+        if self.running:
+            return False
+        self.counts = Counter()
+        self.samples = 0
+        self.sampler_time = 0.0
+        self.started = time.perf_counter()
+        self._deadline = None if duration is None else self.started + duration
+        self._target = (thread or threading.current_thread()).ident
+        self._all_threads = all_threads
+        self._on_finish = on_finish
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, time.strftime("%Y%m%d-%H%M%S") + ".collapsed")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """End the session early; the profile is written either way"""
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+        return self.path
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            begin = time.perf_counter()
+            if self._deadline is not None and begin >= self._deadline:
+                break
+            tags = (self.module or "idle", self.stage or "-")
+            frames = sys._current_frames()
+            if self._all_threads:
+                me = threading.get_ident()
+                if len(names) != threading.active_count():
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident != me:
+                        root = tags if ident == self._target else (names.get(ident, str(ident)),)
+                        self.counts[";".join(root + tuple(self._stack(frame)))] += 1
+            else:
+                frame = frames.get(self._target)
+                if frame is not None:
+                    self.counts[";".join(tags + tuple(self._stack(frame)))] += 1
+            del frames
+            self.samples += 1
+            self.sampler_time += time.perf_counter() - begin
+        self.write()
+        if self._on_finish is not None:
+            self._on_finish(self.path)
+
+    def write(self, path=None):
+        path = path or self.path
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def overhead(self):
+        """Share of wall time the sampler thread spent sampling"""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return self.sampler_time / elapsed if elapsed else 0.0
+
+    def summary(self, depth=2, top=5):
+        """Largest ``(share, "module;stage")`` groups of the last session"""
+        total = sum(self.counts.values())
+        groups = Counter()
+        for stack, count in self.counts.items():
+            groups[";".join(stack.split(";")[:depth])] += count
+        return [(count / total, group) for group, count in groups.most_common(top)] if total else []
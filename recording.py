@@ -0,0 +1,294 @@
+"""Record raw detections once and re-evaluate confidence thresholds offline.
+
+In record mode every module runs its model at a low floor confidence and
+the unfiltered Detections of each run are appended to a columnar log (a
+directory of flat binary column files plus ``meta.json``). The live UI still
+filters at the slider values, and the log can later be memory-mapped to
+replay any threshold without re-running inference.
+
+``python recording.py LOG --module fire_detection --label fire`` prints
+alert counts per threshold. With ``--labels labels.json`` (clip name ->
+list of ``[first_frame, last_frame]`` event ranges, as for ``fire_gate.py``)
+it also prints frame-level precision and recall, i.e. a PR curve.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+from detections import Detections
+
+VERSION = 1
+
+# Per run of a module on a frame
+RUN_COLUMNS = {
+    "frame_index": np.int64,
+    "time": np.float64,
+    "module": np.uint8,
+    "source": np.uint16,
+    "start": np.int64,
+    "count": np.uint32,
+}
+# Per detection
+DETECTION_COLUMNS = {
+    "xyxy": (np.float32, 4),
+    "conf": (np.float32, 1),
+    "cls": (np.int16, 1),
+}
+
+
+class DetectionRecorder:
+    """Append-only writer for a detection log"""
+
+    def __init__(self, path, floor=0.05):
+        self.path = path
+        self.floor = floor
+        self.modules = []
+        self.sources = []
+        self.classes = {}
+        self.runs = 0
+        self.detections = 0
+        self.created = time.time()
+        # Bumped by every truncate; ``rollbacks`` lists [generation, runs, alerts] kept by each,
+        # so incremental readers (archive_index.py) know what to re-read
+        self.generation = 0
+        self.rollbacks = []
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            # Appending to an existing log keeps its id tables and detection offsets
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.floor, self.modules, self.sources = meta["floor"], meta["modules"], meta["sources"]
+            self.classes, self.created = meta["classes"], meta["created"]
+            self.generation, self.rollbacks = meta.get("generation", 0), meta.get("rollbacks", [])
+            conf_path = os.path.join(path, "det.conf")
+            self.detections = os.path.getsize(conf_path) // np.dtype(np.float32).itemsize if os.path.exists(conf_path) else 0
+            runs_path = os.path.join(path, "run.count")
+            self.runs = os.path.getsize(runs_path) // np.dtype(np.uint32).itemsize if os.path.exists(runs_path) else 0
+        self.files = {name: open(os.path.join(path, f"run.{name}"), "ab") for name in RUN_COLUMNS}
+        self.files.update({name: open(os.path.join(path, f"det.{name}"), "ab") for name in DETECTION_COLUMNS})
+        self.alerts = open(os.path.join(path, "alerts.jsonl"), "ab")
+        self.write_meta()
+
+    def _id(self, table, value):
+        if value not in table:
+            table.append(value)
+            self.write_meta()
+        return table.index(value)
+
+    def add(self, module, frame_index, timestamp, source, detections, names=None):
+        """Append one module run; ``detections`` are in frame coordinates, unfiltered"""
+        if names is not None and module not in self.classes:
+            self.classes[module] = {int(k): v for k, v in dict(names).items()}
+            self.write_meta()
+        run = {
+            "frame_index": frame_index, "time": timestamp,
+            "module": self._id(self.modules, module), "source": self._id(self.sources, str(source)),
+            "start": self.detections, "count": len(detections),
+        }
+        for name, dtype in RUN_COLUMNS.items():
+            self.files[name].write(np.array([run[name]], dtype=dtype).tobytes())
+        self.runs += 1
+        if len(detections):
+            for name, (dtype, _) in DETECTION_COLUMNS.items():
+                self.files[name].write(np.ascontiguousarray(getattr(detections, name), dtype=dtype).tobytes())
+            self.detections += len(detections)
+
+    def add_alert(self, module, frame_index, timestamp, source, message):
+        """Append an alert raised by ``module``; alerts are rare, so they go to a JSON lines file"""
+        record = {"module": module, "frame_index": frame_index, "time": timestamp,
+                  "source": str(source), "message": message}
+        self.alerts.write((json.dumps(record) + "\n").encode())
+
+    def write_meta(self):
+        meta = {"version": VERSION, "floor": self.floor, "modules": self.modules,
+                "sources": self.sources, "classes": self.classes, "created": self.created,
+                "generation": self.generation, "rollbacks": self.rollbacks}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def flush(self):
+        for f in list(self.files.values()) + [self.alerts]:
+            f.flush()
+
+    def position(self):
+        """End of every output after a flush; pass to ``truncate`` to roll back to it"""
+        self.flush()
+        return {"runs": self.runs, "detections": self.detections, "alerts": self.alerts.tell()}
+
+    def truncate(self, position):
+        """Drop everything written after ``position`` so a resumed run does not duplicate output"""
+        self.flush()
+        for name, dtype in RUN_COLUMNS.items():
+            self.files[name].truncate(position["runs"] * np.dtype(dtype).itemsize)
+        for name, (dtype, width) in DETECTION_COLUMNS.items():
+            self.files[name].truncate(position["detections"] * np.dtype(dtype).itemsize * width)
+        self.alerts.truncate(position["alerts"])
+        self.runs, self.detections = position["runs"], position["detections"]
+        with open(os.path.join(self.path, "alerts.jsonl"), "rb") as f:
+            alerts = f.read(position["alerts"]).count(b"\n")
+        self.generation += 1
+        self.rollbacks.append([self.generation, self.runs, alerts])
+        self.write_meta()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.alerts.close()
+        self.files = {}
+
+
+def _map(path, dtype, width=1):
+    """Memory-map a column file; empty files give an empty array"""
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if size == 0:
+        return np.zeros((0, width) if width > 1 else 0, dtype=dtype)
+    column = np.memmap(path, dtype=dtype, mode="r")
+    return column.reshape(-1, width) if width > 1 else column
+
+
+class DetectionLog:
+    """Memory-mapped reader for a detection log"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != VERSION:
+            raise ValueError(f"Unsupported detection log version {self.meta['version']}")
+        self.floor = self.meta["floor"]
+        self.runs = {name: _map(os.path.join(path, f"run.{name}"), dtype) for name, dtype in RUN_COLUMNS.items()}
+        # A run row is only complete once its last column has been written
+        n = min(len(c) for c in self.runs.values())
+        self.runs = {name: c[:n] for name, c in self.runs.items()}
+        self.columns = {name: _map(os.path.join(path, f"det.{name}"), dtype, width)
+                        for name, (dtype, width) in DETECTION_COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.runs["frame_index"])
+
+    def module_id(self, module):
+        return self.meta["modules"].index(module)
+
+    def class_ids(self, module, *labels):
+        wanted = {label.lower() for label in labels}
+        names = self.meta["classes"].get(module, {})
+        return np.array([int(k) for k, v in names.items() if v.lower() in wanted], dtype=np.int64)
+
+    def alerts(self):
+        """Alert records in the order they were raised"""
+        path = os.path.join(self.path, "alerts.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def run_indices(self, module, source=None):
+        mask = self.runs["module"] == self.module_id(module)
+        if source is not None:
+            mask &= self.runs["source"] == self.meta["sources"].index(str(source))
+        return np.flatnonzero(mask)
+
+    def detections(self, run):
+        start, count = int(self.runs["start"][run]), int(self.runs["count"][run])
+        end = start + count
+        return Detections(self.columns["xyxy"][start:end], self.columns["conf"][start:end],
+                          self.columns["cls"][start:end])
+
+    def replay(self, module, conf, source=None):
+        """Yield ``(frame_index, time, Detections)`` for ``module`` filtered at ``conf``"""
+        for run in self.run_indices(module, source):
+            yield int(self.runs["frame_index"][run]), float(self.runs["time"][run]), self.detections(run).above(conf)
+
+    def max_conf(self, module, labels=(), source=None):
+        """Highest confidence per run of ``module`` among ``labels`` (all classes when empty)"""
+        conf = np.asarray(self.columns["conf"], dtype=np.float32)
+        if labels:
+            conf = np.where(np.isin(self.columns["cls"], self.class_ids(module, *labels)), conf, 0.0)
+        starts, counts = self.runs["start"], self.runs["count"]
+        best = np.zeros(len(self), dtype=np.float32)
+        # Runs are written back to back, so the non-empty ones tile the detection columns
+        hit = (counts > 0) & (starts + counts <= len(conf))
+        if hit.any():
+            end = int(starts[hit][-1] + counts[hit][-1])
+            best[hit] = np.maximum.reduceat(conf[:end], starts[hit])
+        runs = self.run_indices(module, source)
+        return runs, best[runs]
+
+
+def alert_counts(times, scores, thresholds, cooldown=5.0):
+    """Alerts that would have fired per threshold, honouring the UI's cooldown"""
+    counts = []
+    for threshold in thresholds:
+        fired, last = 0, -np.inf
+        for t in times[scores >= threshold]:
+            if t - last > cooldown:
+                fired += 1
+                last = t
+        counts.append(fired)
+    return np.array(counts)
+
+
+def precision_recall(scores, truth, thresholds):
+    """Frame-level precision and recall for each threshold (vectorized over thresholds)"""
+    predicted = scores[None, :] >= np.asarray(thresholds, dtype=np.float32)[:, None]
+    tp = (predicted & truth[None, :]).sum(axis=1)
+    fp = (predicted & ~truth[None, :]).sum(axis=1)
+    fn = (~predicted & truth[None, :]).sum(axis=1)
+    precision = np.where(tp + fp > 0, tp / np.maximum(tp + fp, 1), 1.0)
+    recall = np.where(tp + fn > 0, tp / np.maximum(tp + fn, 1), 0.0)
+    return precision, recall
+
+
+def ground_truth(log, runs, labels_path):
+    """Per-run truth from a labels.json of clip name -> event frame ranges"""
+    with open(labels_path) as f:
+        labels = json.load(f)
+    sources = log.meta["sources"]
+    truth = np.zeros(len(runs), dtype=bool)
+    frame_index = log.runs["frame_index"][runs]
+    source = log.runs["source"][runs]
+    for clip, ranges in labels.items():
+        ids = [i for i, s in enumerate(sources) if os.path.basename(s) == clip]
+        in_clip = np.isin(source, ids)
+        for first, last in ranges:
+            truth |= in_clip & (frame_index >= first) & (frame_index <= last)
+    return truth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep confidence thresholds over a recorded detection log")
+    parser.add_argument("log", help="Detection log directory")
+    parser.add_argument("--module", required=True, help="e.g. fire_detection")
+    parser.add_argument("--label", nargs="*", default=[], help="Class names that count (default: all)")
+    parser.add_argument("--labels", help="labels.json with event frame ranges per clip")
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[round(t, 2) for t in np.arange(0.1, 0.95, 0.05)])
+    parser.add_argument("--cooldown", type=float, default=5.0)
+    args = parser.parse_args()
+
+    log = DetectionLog(args.log)
+    start = time.perf_counter()
+    runs, scores = log.max_conf(args.module, args.label)
+    times = log.runs["time"][runs]
+    thresholds = [t for t in args.thresholds if t >= log.floor]
+    alerts = alert_counts(times, scores, thresholds, args.cooldown)
+    truth = ground_truth(log, runs, args.labels) if args.labels else None
+    if truth is not None:
+        precision, recall = precision_recall(scores, truth, thresholds)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(runs)} runs of {args.module}, floor {log.floor}, evaluated in {elapsed * 1000:.1f} ms "
+          f"({len(runs) * len(thresholds) / max(elapsed, 1e-9):.0f} frame-thresholds/s)")
+    print(f"{'conf':>6} {'frames':>7} {'alerts':>7}" + (f" {'precision':>9} {'recall':>7}" if truth is not None else ""))
+    for i, threshold in enumerate(thresholds):
+        line = f"{threshold:>6.2f} {int((scores >= threshold).sum()):>7} {alerts[i]:>7}"
+        if truth is not None:
+            line += f" {precision[i]:>9.3f} {recall[i]:>7.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import time
+from collections import OrderedDict, namedtuple
+import cv2
+import numpy as np
+
+Style = namedtuple('Style', 'color thickness font_scale text_color')
+
+# Box and label styles for every module, in one place
+STYLES = {
+    'weapon': Style((255, 0, 255), 3, 0.5, (255, 0, 0)),
+    'person': Style((0, 255, 0), 2, 0.5, (0, 255, 0)),
+    'person_cleared': Style((0, 255, 0), 1, 0.5, (0, 255, 0)),
+    'crowd': Style((0, 255, 255), 2, 0.5, (0, 255, 255)),
+    'fire': Style((0, 69, 255), 3, 0.7, (0, 69, 255)),
+    'smoke': Style((192, 192, 192), 3, 0.7, (192, 192, 192)),
+    'fall': Style((0, 0, 255), 3, 0.7, (0, 0, 255)),
+    'no_fall': Style((0, 255, 0), 2, 0.5, (0, 255, 0)),
+    'bin_ok': Style((0, 255, 0), 2, 0.5, (0, 255, 0)),
+    'bin_problem': Style((0, 0, 255), 2, 0.5, (0, 0, 255)),
+    'hud': Style((255, 255, 0), 2, 1.0, (255, 255, 0)),
+    'hud_small': Style((255, 255, 0), 2, 0.6, (255, 255, 0)),
+}
+
+# Level of detail: full draws everything, boxes drops per-box labels,
+# minimal also drops point markers and thins every box to one pixel
+LOD_LEVELS = ('auto', 'full', 'boxes', 'minimal')
+
+
+class Scene:
+    """Draw list for one frame, filled by a module's process method.
+
+    Layers are only recorded here; ``Renderer.render`` draws them all in one
+    pass so modules never touch pixels themselves.
+    """
+
+    __slots__ = ('overlays', 'boxes', 'points', 'texts')
+
+    def __init__(self):
+        self.overlays = []
+        self.boxes = []
+        self.points = []
+        self.texts = []
+
+    def overlay(self, mask, color, alpha=0.5):
+        """Blend ``color`` (a BGR tuple or an image) into the pixels where ``mask`` is set"""
+        if mask is not None:
+            self.overlays.append((np.ascontiguousarray(mask, dtype=bool), color, alpha))
+
+    def add_boxes(self, xyxy, style, labels=None):
+        """Boxes as an (N, 4) array; ``labels`` is an optional sequence of N strings"""
+        xyxy = np.asarray(xyxy).reshape(-1, 4)
+        if len(xyxy):
+            self.boxes.append((xyxy.astype(np.int32), STYLES[style], labels, True))
+
+    def add_labels(self, xyxy, style, labels):
+        """Labels above each box without drawing the box itself"""
+        xyxy = np.asarray(xyxy).reshape(-1, 4)
+        if len(xyxy):
+            self.boxes.append((xyxy.astype(np.int32), STYLES[style], labels, False))
+
+    def add_points(self, points, style, radius=5):
+        points = np.asarray(points).reshape(-1, 2)
+        if len(points):
+            self.points.append((points.astype(np.int32), STYLES[style], radius))
+
+    def add_text(self, text, org, style):
+        self.texts.append((text, org, STYLES[style]))
+
+    def __len__(self):
+        return sum(len(xyxy) for xyxy, _, _, _ in self.boxes)
+
+
+class Renderer:
+    """Shared annotation renderer.
+
+    Each feed (``key``) gets a reusable output buffer; the frame is copied in
+    once and the scene's overlays, boxes, markers and labels are drawn on top.
+    All boxes of one style go out in a single ``cv2.polylines`` call, and
+    label text is rasterised once into a small sprite that is blitted on later
+    frames. In ``auto`` detail mode labels are dropped above ``label_limit``
+    boxes and boxes are thinned above ``box_limit``. Draw time is kept per
+    feed so it can be reported next to inference time.
+    """
+
+    def __init__(self, lod='auto', label_limit=60, box_limit=300, label_cache=1024, smoothing=0.2):
+        self.lod = lod
+        self.label_limit = label_limit
+        self.box_limit = box_limit
+        self.label_cache = label_cache
+        self.smoothing = smoothing
+        self.buffers = {}
+        self.sprites = OrderedDict()
+        self.fills = {}
+        self.timing = {}
+
+    def level(self, scene):
+        if self.lod != 'auto':
+            return self.lod
+        count = len(scene)
+        if count > self.box_limit:
+            return 'minimal'
+        if count > self.label_limit:
+            return 'boxes'
+        return 'full'
+
+    def sprite(self, text, font_scale, color, thickness=2):
+        """Rasterised label as ``(pixels, mask, ascent)``, cached by text and style"""
+        key = (text, font_scale, color, thickness)
+        cached = self.sprites.get(key)
+        if cached is not None:
+            self.sprites.move_to_end(key)
+            return cached
+        (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        ascent = h + thickness
+        canvas = np.zeros((ascent + baseline + thickness, w + 2 * thickness, 3), dtype=np.uint8)
+        cv2.putText(canvas, text, (thickness, ascent), cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+        cached = (canvas, canvas.any(axis=2).view(np.uint8), ascent)
+        self.sprites[key] = cached
+        if len(self.sprites) > self.label_cache:
+            self.sprites.popitem(last=False)
+        return cached
+
+    def fill(self, shape, color):
+        """Solid colour image, cached per shape and colour"""
+        key = (shape, tuple(color))
+        image = self.fills.get(key)
+        if image is None:
+            image = self.fills[key] = np.empty(shape, dtype=np.uint8)
+            image[:] = color
+        return image
+
+    def blit(self, buffer, text, org, style):
+        """Paste a cached label with its baseline at ``org``, clipped to the buffer"""
+        pixels, mask, ascent = self.sprite(text, style.font_scale, style.text_color)
+        x, y = int(org[0]), int(org[1]) - ascent
+        height, width = buffer.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + pixels.shape[1], width), min(y + pixels.shape[0], height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        sx, sy = x0 - x, y0 - y
+        cv2.copyTo(pixels[sy:sy + y1 - y0, sx:sx + x1 - x0], mask[sy:sy + y1 - y0, sx:sx + x1 - x0],
+                   buffer[y0:y1, x0:x1])
+
+    def render(self, frame, scene, key=None):
+        """Draw ``scene`` over ``frame`` into the feed's buffer and return it"""
+        start = time.perf_counter()
+        buffer, scratch = self.buffers.get(key, (None, None))
+        if buffer is None or buffer.shape != frame.shape:
+            buffer, scratch = np.empty_like(frame), np.empty_like(frame)
+            self.buffers[key] = (buffer, scratch)
+        np.copyto(buffer, frame)
+        level = self.level(scene)
+
+        for mask, color, alpha in scene.overlays:
+            if mask.shape != buffer.shape[:2]:
+                continue
+            if not isinstance(color, np.ndarray):
+                color = self.fill(buffer.shape, color)
+            # Blend the whole frame into scratch, then copy back only the masked pixels
+            cv2.addWeighted(buffer, 1 - alpha, color, alpha, 0, dst=scratch)
+            cv2.copyTo(scratch, mask.view(np.uint8), buffer)
+
+        for xyxy, style, _, outline in scene.boxes:
+            if not outline:
+                continue
+            corners = xyxy[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+            thickness = 1 if level == 'minimal' else style.thickness
+            cv2.polylines(buffer, list(corners), True, style.color, thickness)
+
+        if level != 'minimal':
+            for points, style, radius in scene.points:
+                for x, y in points:
+                    cv2.circle(buffer, (int(x), int(y)), radius, style.color, -1)
+        if level == 'full':
+            for xyxy, style, labels, _ in scene.boxes:
+                if labels is None:
+                    continue
+                for (x1, y1, _, _), text in zip(xyxy, labels):
+                    self.blit(buffer, text, (x1, y1 - 10), style)
+
+        for text, org, style in scene.texts:
+            self.blit(buffer, text, org, style)
+
+        self.record(key, time.perf_counter() - start, level)
+        return buffer
+
+    def record(self, key, duration, level):
+        stats = self.timing.setdefault(key, {"frames": 0, "total_time": 0.0, "cost": duration, "level": level})
+        stats["frames"] += 1
+        stats["total_time"] += duration
+        stats["cost"] += self.smoothing * (duration - stats["cost"])
+        stats["level"] = level
+
+    def stats(self, key=None):
+        """Draw stage timing per feed: frames, mean_ms, recent_ms and the last detail level"""
+        return {k: {"frames": s["frames"], "mean_ms": 1000.0 * s["total_time"] / s["frames"],
+                    "recent_ms": 1000.0 * s["cost"], "level": s["level"]}
+                for k, s in self.timing.items() if key is None or k == key}
+
+    def nbytes(self):
+        """Bytes held by feed buffers, cached fills and label sprites"""
+        total = sum(b.nbytes + s.nbytes for b, s in self.buffers.values())
+        total += sum(f.nbytes for f in self.fills.values())
+        return total + sum(p.nbytes + m.nbytes for p, m, _ in self.sprites.values())
+
+    def forget(self, key=None):
+        for store in (self.buffers, self.timing):
+            for k in [k for k in store if key is None or k == key]:
+                del store[k]
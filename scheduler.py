@@ -0,0 +1,169 @@
+class ModuleSpec:
+    """Scheduling contract of one detection module.
+
+    ``rate`` is the target number of inference runs per second (None runs on
+    every frame), ``priority`` orders modules competing for the same tick
+    (higher first) and ``deadline`` is how late, in seconds, a run may start
+    after it became due before it counts as a miss.
+    """
+
+    def __init__(self, name, rate=None, priority=0, deadline=None):
+        self.name = name
+        self.rate = rate
+        self.priority = priority
+        if deadline is None:
+            deadline = 1.0 / rate if rate else 0.5
+        self.deadline = deadline
+
+    @property
+    def period(self):
+        return 1.0 / self.rate if self.rate else 0.0
+
+
+class TaskState:
+    """Run bookkeeping for one (module, camera) pair"""
+
+    def __init__(self):
+        self.next_due = None
+        self.requested_due = None
+        self.last_run = None
+        self.runs = 0
+        self.skipped = 0
+        self.deadline_misses = 0
+        self.reported_misses = 0
+        self.miss_flagged = False
+        self.cost = 0.0
+        self.total_time = 0.0
+        self.first_run = None
+
+
+class ModuleScheduler:
+    """Shares inference slots among modules and cameras.
+
+    Every tick the caller offers the (module, camera) tasks that have a fresh
+    frame. Due tasks are ordered by priority and lateness and admitted until
+    the tick's slot count or time budget (estimated from each task's recent
+    run cost) is used up; the highest-priority due task always runs. A task
+    gains one priority level for every deadline it has been kept waiting, so
+    low-priority modules are delayed under load but never starved. Each time
+    a task passes its deadline without running counts as one miss.
+    Time is supplied by the caller, so file sources can be scheduled in
+    video time and live cameras in wall time.
+    """
+
+    def __init__(self, specs=(), max_runs_per_tick=None, budget=None, cost_smoothing=0.2):
+        self.specs = {spec.name: spec for spec in specs}
+        self.max_runs_per_tick = max_runs_per_tick
+        self.budget = budget
+        self.cost_smoothing = cost_smoothing
+        self.tasks = {}
+
+    def register(self, spec):
+        self.specs[spec.name] = spec
+
+    def _state(self, task):
+        state = self.tasks.get(task)
+        if state is None:
+            state = self.tasks[task] = TaskState()
+        return state
+
+    def lateness(self, task, now):
+        """Seconds since ``task`` became due (negative if not yet due)"""
+        state = self._state(task)
+        if state.next_due is None:
+            return 0.0
+        return now - state.next_due
+
+    def urgency(self, task, now):
+        """Sort key: aged priority first, then lateness relative to the deadline"""
+        spec = self.specs[task[0]]
+        overdue = self.lateness(task, now) / max(spec.deadline, 1e-6)
+        return (-(spec.priority + int(max(overdue, 0))), -overdue)
+
+    def plan(self, now, tasks):
+        """Return the subset of ``tasks`` that should run inference at ``now``, in run order"""
+        for task in tasks:
+            state = self._state(task)
+            if state.next_due is None and not self.specs[task[0]].rate:
+                # Every-frame tasks are due when the frame arrives, so a slow source (or a
+                # reduced file analysis rate) does not count the gap between frames as lateness
+                state.next_due = now
+        due = [task for task in tasks if self.lateness(task, now) >= 0]
+        due.sort(key=lambda t: self.urgency(t, now))
+
+        granted, spent = [], 0.0
+        for task in due:
+            state = self._state(task)
+            if granted and ((self.max_runs_per_tick is not None and len(granted) >= self.max_runs_per_tick)
+                            or (self.budget is not None and spent + state.cost > self.budget)):
+                state.skipped += 1
+                if not state.miss_flagged and self.lateness(task, now) > self.specs[task[0]].deadline:
+                    state.deadline_misses += 1
+                    state.miss_flagged = True
+                continue
+            granted.append(task)
+            spent += state.cost
+        return granted
+
+    def completed(self, task, now, duration):
+        """Record that ``task`` ran at ``now`` and took ``duration`` seconds"""
+        spec = self.specs[task[0]]
+        state = self._state(task)
+        if not state.miss_flagged and state.next_due is not None and now - state.next_due > spec.deadline:
+            state.deadline_misses += 1
+        state.miss_flagged = False
+        state.cost = duration if state.runs == 0 else (
+            (1 - self.cost_smoothing) * state.cost + self.cost_smoothing * duration)
+        state.runs += 1
+        state.total_time += duration
+        if state.first_run is None:
+            state.first_run = now
+        state.last_run = now
+
+        if state.requested_due is not None:
+            state.next_due, state.requested_due = state.requested_due, None
+        elif not spec.rate:
+            state.next_due = None
+        elif state.next_due is None or now - state.next_due > spec.period:
+            # Too far behind to catch up; don't burst, restart the cadence
+            state.next_due = now + spec.period
+        else:
+            state.next_due += spec.period
+
+    def set_next_due(self, task, when):
+        """Let a module move its own next run, e.g. for a warm-up burst.
+
+        Called while the task is running, it replaces the cadence-based due
+        time that ``completed`` would otherwise set.
+        """
+        self._state(task).requested_due = when
+
+    def forget(self, name=None, camera=None):
+        """Drop run state of matching tasks (all tasks by default)"""
+        for task in [t for t in self.tasks if (name is None or t[0] == name) and (camera is None or t[1] == camera)]:
+            del self.tasks[task]
+
+    def new_misses(self):
+        """Return ``{task: count}`` of deadline misses since the last call"""
+        misses = {}
+        for task, state in self.tasks.items():
+            if state.deadline_misses > state.reported_misses:
+                misses[task] = state.deadline_misses - state.reported_misses
+                state.reported_misses = state.deadline_misses
+        return misses
+
+    def stats(self, name=None):
+        """Per-task run counts, achieved rate, mean cost and deadline misses"""
+        report = {}
+        for task, state in self.tasks.items():
+            if name is not None and task[0] != name:
+                continue
+            span = (state.last_run - state.first_run) if state.runs > 1 else 0.0
+            report[task] = {
+                "runs": state.runs,
+                "skipped": state.skipped,
+                "deadline_misses": state.deadline_misses,
+                "rate": (state.runs - 1) / span if span > 0 else 0.0,
+                "mean_ms": 1000.0 * state.total_time / state.runs if state.runs else 0.0,
+            }
+        return report
@@ -0,0 +1,241 @@
+"""CPU thread budget for the YOLO models, and the sweep that tunes it.
+
+PyTorch, OpenCV and the BLAS behind NumPy each size their thread pools to
+the whole machine, so several models and cameras in one box oversubscribe
+the CPU. ``ThreadBudget`` caps every pool, gives each model its own
+intra-op thread count and can pin worker processes to disjoint cores.
+
+Run ``python threads.py [--video clip.mp4]`` to time every model in
+``models.MODEL_FILES`` on this machine. The sweep first finds each model's
+thread scaling knee, then tries splitting the cores between 1, 2, 4, ...
+pinned workers, and writes the best split to ``thread_budget.json``, which
+the UI loads at start-up.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+import cv2
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+from models import MODEL_FILES
+
+DEFAULT_PATH = "thread_budget.json"
+
+
+def cpu_cores():
+    """Cores this process may run on"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+class ThreadBudget:
+    """Thread pool sizes and core pinning for one process (or each of ``workers``).
+
+    ``model_threads`` maps a model attribute name to its intra-op thread
+    count; models not listed get ``default_threads`` (all cores of the worker
+    when None). Inter-op, OpenCV and BLAS pools are fixed process-wide by
+    ``apply``.
+    """
+
+    def __init__(self, model_threads=None, default_threads=None, interop_threads=1,
+                 opencv_threads=1, blas_threads=1, workers=1, pin=False):
+        self.model_threads = dict(model_threads or {})
+        self.default_threads = default_threads
+        self.interop_threads = interop_threads
+        self.opencv_threads = opencv_threads
+        self.blas_threads = blas_threads
+        self.workers = workers
+        self.pin = pin
+        self.worker = 0
+        self._blas_limits = None
+        # Model and intra-op threads last set through this budget, so ``use`` only works on a switch
+        self._model = None
+        self._threads = None
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        """Budget saved by the sweep, or the defaults when there is none"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, path=DEFAULT_PATH):
+        config = {"model_threads": self.model_threads, "default_threads": self.default_threads,
+                  "interop_threads": self.interop_threads, "opencv_threads": self.opencv_threads,
+                  "blas_threads": self.blas_threads, "workers": self.workers, "pin": self.pin}
+        with open(path, "w") as f:
+            json.dump(config, f, indent=2)
+
+    def single_process(self):
+        """The same per-model threads for one process that has the whole machine.
+
+        ``workers`` and ``pin`` describe a split for parallel jobs
+        (``distributed.py``); the UI and the inference server run as one
+        process and would otherwise be pinned to one worker's share.
+        """
+        return ThreadBudget(self.model_threads, self.default_threads, self.interop_threads,
+                            self.opencv_threads, self.blas_threads)
+
+    def cores_for(self, worker=0):
+        """The slice of cores that belongs to ``worker``"""
+        cores = cpu_cores()
+        share = max(1, len(cores) // max(1, self.workers))
+        start = (worker % max(1, self.workers)) * share
+        return cores[start:start + share] or cores
+
+    def threads_for(self, model_name):
+        threads = self.model_threads.get(model_name, self.default_threads)
+        return max(1, min(threads or len(self.cores_for(self.worker)), len(self.cores_for(self.worker))))
+
+    def apply(self, worker=0):
+        """Size every pool for this process; call once, before any model runs"""
+        # torch is imported here rather than at module level so the UI starts without it
+        import torch
+        self.worker = worker
+        cv2.setNumThreads(self.opencv_threads)
+        self._blas_limits = threadpool_limits(limits=self.blas_threads, user_api="blas")
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError:
+            # Only settable before the first parallel op; keep whatever is in place
+            pass
+        self._model = None
+        self._threads = len(self.cores_for(worker)) if self.default_threads is None else self.default_threads
+        torch.set_num_threads(self._threads)
+        if self.pin and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cores_for(worker))
+
+    def use(self, model_name):
+        """Switch the intra-op pool to ``model_name``'s share before it runs"""
+        if model_name == self._model:
+            return
+        self._model = model_name
+        threads = self.threads_for(model_name)
+        if threads == self._threads:
+            return
+        import torch
+        torch.set_num_threads(threads)
+        self._threads = threads
+
+
+def load_frames(video=None, count=32, size=(640, 480)):
+    """First ``count`` frames of ``video``, or random frames when no clip is given"""
+    frames = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < count:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(cv2.resize(frame, size))
+        cap.release()
+    rng = np.random.default_rng(0)
+    while len(frames) < count:
+        frames.append(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8))
+    return frames
+
+
+def load_models():
+    from ultralytics import YOLO
+    return {name: YOLO(path) for name, path in MODEL_FILES.items() if os.path.exists(path)}
+
+
+def time_models(models, frames, budget):
+    """Seconds per frame for each model under ``budget``, after one warm-up call"""
+    timings = {}
+    for name, model in models.items():
+        budget.use(name)
+        model(frames[0], verbose=False)
+        start = time.perf_counter()
+        for frame in frames:
+            model(frame, verbose=False)
+        timings[name] = (time.perf_counter() - start) / len(frames)
+    return timings
+
+
+def scaling_sweep(frames, thread_options):
+    """Per-model seconds per frame at each intra-op thread count (single process)"""
+    budget = ThreadBudget()
+    budget.apply()
+    models = load_models()
+    table = {name: {} for name in models}
+    for threads in thread_options:
+        budget.default_threads = threads
+        for name, seconds in time_models(models, frames, budget).items():
+            table[name][threads] = seconds
+    return table
+
+
+def knee(timings, tolerance=0.1):
+    """Fewest threads within ``tolerance`` of the model's best time"""
+    best = min(timings.values())
+    return min(t for t, seconds in timings.items() if seconds <= best * (1 + tolerance))
+
+
+def _worker(args):
+    config, worker, frames, barrier = args
+    budget = ThreadBudget(**config)
+    budget.apply(worker)
+    models = load_models()
+    time_models(models, frames[:2], budget)
+    barrier.wait()
+    start = time.perf_counter()
+    time_models(models, frames, budget)
+    return time.perf_counter() - start
+
+
+def split_sweep(frames, model_threads, worker_options, pin_options=(False, True)):
+    """Aggregate frames/s (every model on every frame) for each worker split"""
+    results = []
+    cores = len(cpu_cores())
+    for workers in worker_options:
+        share = max(1, cores // workers)
+        threads = {name: min(t, share) for name, t in model_threads.items()}
+        for pin in pin_options:
+            config = {"model_threads": threads, "workers": workers, "pin": pin}
+            manager = mp.Manager()
+            barrier = manager.Barrier(workers)
+            with mp.get_context("spawn").Pool(workers) as pool:
+                elapsed = pool.map(_worker, [(config, w, frames, barrier) for w in range(workers)])
+            manager.shutdown()
+            results.append((workers * len(frames) / max(elapsed), config))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the best CPU thread split for the surveillance models")
+    parser.add_argument("--video", help="Clip to time on (random frames when omitted)")
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    cores = len(cpu_cores())
+    options = sorted({1 << i for i in range(cores.bit_length()) if 1 << i <= cores} | {cores})
+
+    table = scaling_sweep(frames, options)
+    print(f"{'model':<16}" + "".join(f"{t:>8}" for t in options) + f"{'knee':>6}")
+    model_threads = {}
+    for name, timings in table.items():
+        model_threads[name] = knee(timings)
+        print(f"{name:<16}" + "".join(f"{1000 * timings[t]:>6.1f}ms" for t in options) + f"{model_threads[name]:>6}")
+
+    print(f"\n{'workers':>7} {'pin':>5} {'frames/s':>9}")
+    results = split_sweep(frames, model_threads, [w for w in options if w <= cores])
+    for throughput, config in results:
+        print(f"{config['workers']:>7} {str(config['pin']):>5} {throughput:>9.1f}")
+
+    throughput, config = max(results, key=lambda r: r[0])
+    # Save the uncapped knees; each worker's threads are capped to its share when applied
+    ThreadBudget(**{**config, "model_threads": model_threads}).save(args.output)
+    print(f"\nBest: {config['workers']} worker(s), pin={config['pin']} ({throughput:.1f} frames/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
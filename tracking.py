@@ -0,0 +1,77 @@
+from collections import deque
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) x1, y1, x2, y2 arrays"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    iw = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    ih = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+class Track:
+    """One tracked object with a short box history"""
+
+    def __init__(self, track_id, box, now, history):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.history = deque([(now, self.box)], maxlen=history)
+        self.missed = 0
+        self.hits = 1
+
+    def update(self, box, now):
+        self.box = np.asarray(box, dtype=np.float32)
+        self.history.append((now, self.box))
+        self.missed = 0
+        self.hits += 1
+
+
+class IoUTracker:
+    """Greedy IoU tracker; cheap enough to run on every person pass"""
+
+    def __init__(self, match_iou=0.3, max_missed=10, history=30):
+        self.match_iou = match_iou
+        self.max_missed = max_missed
+        self.history = history
+        self.tracks = {}
+        self._next_id = 1
+
+    def update(self, xyxy, now):
+        """Associate this frame's boxes with tracks; returns one track id per box"""
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        ids = np.full(len(xyxy), -1, dtype=np.int64)
+        tracks = list(self.tracks.values())
+        if tracks and len(xyxy):
+            ious = iou_matrix([t.box for t in tracks], xyxy)
+            pairs = np.argwhere(ious >= self.match_iou)
+            order = np.argsort(-ious[pairs[:, 0], pairs[:, 1]])
+            used_tracks, used_boxes = set(), set()
+            for ti, bi in pairs[order]:
+                if ti in used_tracks or bi in used_boxes:
+                    continue
+                used_tracks.add(ti)
+                used_boxes.add(bi)
+                tracks[ti].update(xyxy[bi], now)
+                ids[bi] = tracks[ti].track_id
+
+        seen = set(ids[ids >= 0].tolist())
+        for track in tracks:
+            if track.track_id not in seen:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    del self.tracks[track.track_id]
+
+        for bi in np.flatnonzero(ids < 0):
+            track = Track(self._next_id, xyxy[bi], now, self.history)
+            self._next_id += 1
+            self.tracks[track.track_id] = track
+            ids[bi] = track.track_id
+        return ids
+
+    def reset(self):
+        self.tracks.clear()
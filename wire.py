@@ -0,0 +1,347 @@
+"""Compact binary messages for detections and alerts, for IPC and files.
+
+A message is a 32-byte header followed by four sections:
+
+- dictionary entries: module, source, class and alert-message names, each
+  sent only the first time an encoder uses it;
+- run records (one per module run on a frame): frame index, time, module id,
+  source id and detection count;
+- detection records: ``x1 y1 x2 y2 conf`` as float32, class id and track id;
+- alert records: frame index, time, module, source and message id.
+
+Records are fixed width and little-endian, so each section is read with one
+``np.frombuffer`` and nothing is copied or parsed per detection. With
+``delta_time`` run times are sent as microsecond deltas from the previous
+run, starting at the header's base time (20-byte instead of 24-byte runs).
+The encoder falls back to absolute float64 times when two consecutive runs
+are more than 35 minutes apart.
+
+Dictionaries belong to the stream. A decoder must see a stream's (or file's)
+messages in order. A file is messages back to back (``WireWriter``), and
+``read_file`` memory-maps it.
+
+``python wire.py bench --cameras 24 --people 20`` compares message size and
+encode/decode time with JSON. ``python wire.py export LOG out.detw`` converts
+a ``recording.py`` detection log into one wire file, and ``python wire.py
+dump out.detw`` prints one.
+"""
+import argparse
+import json
+import mmap
+import struct
+import time
+
+import numpy as np
+
+from detections import Detections
+
+MAGIC = b"DETW"
+VERSION = 1
+DELTA_TIME = 0x01
+# magic, version, flags, dictionary entries, body bytes, runs, detections, alerts, base time
+HEADER = struct.Struct("<4sBBHIIIId")
+# table, owner (module id for class names), id, name length
+ENTRY = struct.Struct("<BHHH")
+MODULES, SOURCES, CLASSES, MESSAGES = range(4)
+
+RUN_DTYPE = np.dtype([("frame_index", "<i8"), ("time", "<f8"), ("module", "<u2"),
+                      ("source", "<u2"), ("count", "<u4")])
+RUN_DELTA_DTYPE = np.dtype([("frame_index", "<i8"), ("time", "<i4"), ("module", "<u2"),
+                            ("source", "<u2"), ("count", "<u4")])
+DETECTION_DTYPE = np.dtype([("xyxy", "<f4", (4,)), ("conf", "<f4"), ("cls", "<i2"), ("track_id", "<i4")])
+ALERT_DTYPE = np.dtype([("frame_index", "<i8"), ("time", "<f8"), ("module", "<u2"),
+                        ("source", "<u2"), ("message", "<u2")])
+MAX_DELTA_US = np.iinfo(np.int32).max
+# Alert texts often carry counts, so the message dictionary is restarted instead of growing without bound
+MAX_MESSAGES = 4096
+
+
+class WireEncoder:
+    """Collects runs and alerts and packs them into one message per ``encode``"""
+
+    def __init__(self, delta_time=True):
+        self.delta_time = delta_time
+        self.ids = [{} for _ in range(4)]
+        self.entries = []
+        self.runs = []
+        self.detections = []
+        self.alerts = []
+
+    def _id(self, table, name, owner=0, id=None):
+        ids = self.ids[table]
+        # Class names come with their model's ids; other names are numbered as they appear
+        key = (owner, name) if id is None else (owner, id, name)
+        if key not in ids:
+            ids[key] = len(ids) if id is None else id
+            self.entries.append((table, owner, ids[key], name))
+        return ids[key]
+
+    def add(self, module, frame_index, timestamp, source, detections, names=None):
+        """Queue one module run; ``names`` (the model's class names) are sent once per module"""
+        module_id = self._id(MODULES, module)
+        if names is not None:
+            for cls, name in dict(names).items():
+                self._id(CLASSES, name, module_id, int(cls))
+        self.runs.append((frame_index, timestamp, module_id, self._id(SOURCES, str(source)), len(detections)))
+        if len(detections):
+            self.detections.append(detections)
+
+    def add_alert(self, module, frame_index, timestamp, source, message):
+        self.alerts.append((frame_index, timestamp, self._id(MODULES, module),
+                            self._id(SOURCES, str(source)), self._id(MESSAGES, message)))
+
+    def encode(self):
+        """The queued runs and alerts as one message (the queue is emptied)"""
+        flags, base = 0, 0.0
+        runs = np.array(self.runs, dtype=RUN_DTYPE) if self.runs else np.zeros(0, RUN_DTYPE)
+        if self.delta_time and len(runs):
+            base = float(runs["time"][0])
+            micros = np.round((runs["time"] - base) * 1e6).astype(np.int64)
+            deltas = np.diff(micros, prepend=0)
+            if (np.abs(deltas) <= MAX_DELTA_US).all():
+                packed = np.empty(len(runs), RUN_DELTA_DTYPE)
+                for field in RUN_DTYPE.names:
+                    packed[field] = deltas if field == "time" else runs[field]
+                runs, flags = packed, DELTA_TIME
+
+        detections = Detections.concat(self.detections)
+        records = np.empty(len(detections), DETECTION_DTYPE)
+        records["xyxy"] = detections.xyxy
+        records["conf"] = detections.conf
+        records["cls"] = detections.cls
+        records["track_id"] = detections.track_id
+        alerts = np.array(self.alerts, dtype=ALERT_DTYPE) if self.alerts else np.zeros(0, ALERT_DTYPE)
+
+        entries = []
+        for table, owner, id, name in self.entries:
+            text = name.encode()
+            entries.append(ENTRY.pack(table, owner, id, len(text)) + text)
+        body = b"".join(entries) + runs.tobytes() + records.tobytes() + alerts.tobytes()
+        header = HEADER.pack(MAGIC, VERSION, flags, len(entries), len(body), len(runs), len(records), len(alerts), base)
+        self.entries, self.runs, self.detections, self.alerts = [], [], [], []
+        if len(self.ids[MESSAGES]) >= MAX_MESSAGES:
+            # Between messages, so every message's ids refer to one set of names
+            self.ids[MESSAGES] = {}
+        return header + body
+
+
+class WireMessage:
+    """Decoded message; ``runs``, ``records`` and ``alert_records`` are views into the buffer"""
+
+    def __init__(self, names, runs, records, alert_records, times):
+        self.names = names
+        self.runs = runs
+        self.records = records
+        self.alert_records = alert_records
+        self.times = times
+        self.starts = np.concatenate([[0], np.cumsum(runs["count"], dtype=np.int64)[:-1]]) if len(runs) else runs["count"]
+
+    def __len__(self):
+        return len(self.runs)
+
+    def name(self, table, id, owner=0):
+        return self.names.get((table, owner, int(id)), "")
+
+    def class_names(self, module):
+        """``{class id: name}`` sent for ``module`` so far in the stream"""
+        module_id = next((id for (table, _, id), name in self.names.items() if table == MODULES and name == module), None)
+        return {id: name for (table, owner, id), name in self.names.items() if table == CLASSES and owner == module_id}
+
+    def detections(self, run):
+        start = int(self.starts[run])
+        rows = self.records[start:start + int(self.runs["count"][run])]
+        return Detections(rows["xyxy"], rows["conf"], rows["cls"], rows["track_id"])
+
+    def __iter__(self):
+        """``(module, frame_index, time, source, Detections)`` per run"""
+        for run, row in enumerate(self.runs):
+            yield (self.name(MODULES, row["module"]), int(row["frame_index"]), float(self.times[run]),
+                   self.name(SOURCES, row["source"]), self.detections(run))
+
+    def alerts(self):
+        """Alerts as the dicts ``DetectionRecorder.add_alert`` writes"""
+        return [{"module": self.name(MODULES, a["module"]), "frame_index": int(a["frame_index"]),
+                 "time": float(a["time"]), "source": self.name(SOURCES, a["source"]),
+                 "message": self.name(MESSAGES, a["message"])} for a in self.alert_records]
+
+
+class WireDecoder:
+    """Decodes the messages of one stream, keeping its dictionaries"""
+
+    def __init__(self):
+        self.names = {}
+
+    def decode(self, buffer, offset=0):
+        """Decode the message at ``offset``; returns it and the offset of the next one"""
+        magic, version, flags, entries, size, runs, records, alerts, base = HEADER.unpack_from(buffer, offset)
+        if magic != MAGIC:
+            raise ValueError("Not a detection wire message")
+        if version != VERSION:
+            raise ValueError(f"Unsupported detection wire version {version}")
+        position = offset + HEADER.size
+        if entries:
+            # Copy on change, so earlier messages keep the names they were decoded with
+            self.names = dict(self.names)
+            for _ in range(entries):
+                table, owner, id, length = ENTRY.unpack_from(buffer, position)
+                position += ENTRY.size
+                self.names[(table, owner, id)] = bytes(buffer[position:position + length]).decode()
+                position += length
+        run_dtype = RUN_DELTA_DTYPE if flags & DELTA_TIME else RUN_DTYPE
+        run_rows = np.frombuffer(buffer, run_dtype, runs, position)
+        position += runs * run_dtype.itemsize
+        detection_rows = np.frombuffer(buffer, DETECTION_DTYPE, records, position)
+        position += records * DETECTION_DTYPE.itemsize
+        alert_rows = np.frombuffer(buffer, ALERT_DTYPE, alerts, position)
+        position += alerts * ALERT_DTYPE.itemsize
+        if position != offset + HEADER.size + size:
+            raise ValueError("Corrupt detection wire message")
+        times = base + np.cumsum(run_rows["time"], dtype=np.int64) / 1e6 if flags & DELTA_TIME else run_rows["time"]
+        return WireMessage(self.names, run_rows, detection_rows, alert_rows, times), position
+
+    def messages(self, buffer, offset=0):
+        """Every message from ``offset`` to the end of ``buffer``"""
+        end = len(buffer)
+        while offset + HEADER.size <= end:
+            message, offset = self.decode(buffer, offset)
+            yield message
+
+
+class WireWriter:
+    """Appends messages to a file; call ``flush`` to write out what was added"""
+
+    def __init__(self, path, delta_time=True):
+        self.path = path
+        self.encoder = WireEncoder(delta_time)
+        self.file = open(path, "ab")
+
+    def add(self, module, frame_index, timestamp, source, detections, names=None):
+        self.encoder.add(module, frame_index, timestamp, source, detections, names)
+
+    def add_alert(self, module, frame_index, timestamp, source, message):
+        self.encoder.add_alert(module, frame_index, timestamp, source, message)
+
+    def flush(self):
+        if self.encoder.runs or self.encoder.alerts:
+            self.file.write(self.encoder.encode())
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_file(path):
+    """Memory-map a wire file and yield its messages"""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    yield from WireDecoder().messages(buffer)
+
+
+def export_log(log_path, path, runs_per_message=1024):
+    """Write a ``recording.py`` detection log (directory) as one wire file"""
+    from recording import DetectionLog
+    log = DetectionLog(log_path)
+    modules, sources, classes = log.meta["modules"], log.meta["sources"], log.meta["classes"]
+    writer = WireWriter(path)
+    for run in range(len(log)):
+        module = modules[int(log.runs["module"][run])]
+        writer.add(module, int(log.runs["frame_index"][run]), float(log.runs["time"][run]),
+                   sources[int(log.runs["source"][run])], log.detections(run),
+                   {int(k): v for k, v in classes.get(module, {}).items()})
+        if (run + 1) % runs_per_message == 0:
+            writer.flush()
+    for alert in log.alerts():
+        writer.add_alert(alert["module"], alert["frame_index"], alert["time"], alert["source"], alert["message"])
+    writer.close()
+    return len(log)
+
+
+def to_json(runs):
+    """The same runs as JSON, the format this replaces (for the benchmark)"""
+    return json.dumps([{"module": module, "frame_index": frame_index, "time": timestamp, "source": source,
+                        "boxes": d.xyxy.tolist(), "conf": d.conf.tolist(), "cls": d.cls.tolist(),
+                        "track_id": d.track_id.tolist()} for module, frame_index, timestamp, source, d in runs]).encode()
+
+
+def from_json(body):
+    return [(r["module"], r["frame_index"], r["time"], r["source"],
+             Detections(r["boxes"], r["conf"], r["cls"], r["track_id"])) for r in json.loads(body)]
+
+
+def bench(cameras=24, people=20, seconds=10, fps=30):
+    """Bytes and encode/decode time per second of traffic, one message per frame tick"""
+    rng = np.random.default_rng(0)
+    ticks = []
+    for tick in range(seconds * fps):
+        runs = []
+        for camera in range(cameras):
+            n = int(rng.poisson(people))
+            xy = rng.uniform(0, 600, (n, 2)).astype(np.float32)
+            d = Detections(np.hstack([xy, xy + 40]), rng.uniform(0.25, 1, n), np.zeros(n), np.arange(n))
+            runs.append(("crowd_detection", tick, 1.7e9 + tick / fps, f"camera:{camera}", d))
+        ticks.append(runs)
+
+    results = {}
+    for label, delta in (("wire", False), ("wire+delta", True)):
+        encoder, decoder = WireEncoder(delta), WireDecoder()
+        start, messages = time.perf_counter(), []
+        for runs in ticks:
+            for module, frame_index, timestamp, source, d in runs:
+                encoder.add(module, frame_index, timestamp, source, d, {0: "person"})
+            messages.append(encoder.encode())
+        encoded = time.perf_counter() - start
+        start = time.perf_counter()
+        for body in messages:
+            message, _ = decoder.decode(body)
+            for run in range(len(message)):
+                message.detections(run)
+        results[label] = (sum(map(len, messages)), encoded, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    messages = [to_json(runs) for runs in ticks]
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+    for body in messages:
+        from_json(body)
+    results["json"] = (sum(map(len, messages)), encoded, time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection wire format tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench", help="Compare with JSON")
+    b.add_argument("--cameras", type=int, default=24)
+    b.add_argument("--people", type=int, default=20, help="Mean detections per camera frame")
+    b.add_argument("--seconds", type=int, default=10)
+    b.add_argument("--fps", type=int, default=30)
+    d = sub.add_parser("dump", help="Print the runs and alerts of a wire file")
+    d.add_argument("path")
+    e = sub.add_parser("export", help="Convert a recording.py detection log to a wire file")
+    e.add_argument("log")
+    e.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        results = bench(args.cameras, args.people, args.seconds, args.fps)
+        print(f"{args.cameras} cameras x {args.fps} fps, ~{args.people} detections per frame, per second of traffic:")
+        print(f"{'format':<11} {'MB/s':>7} {'encode ms':>10} {'decode ms':>10}")
+        for label, (size, encoded, decoded) in results.items():
+            print(f"{label:<11} {size / args.seconds / 1e6:>7.2f} {1000 * encoded / args.seconds:>10.1f} "
+                  f"{1000 * decoded / args.seconds:>10.1f}")
+    elif args.command == "export":
+        runs = export_log(args.log, args.path)
+        print(f"{runs} runs written to {args.path}")
+    else:
+        for message in read_file(args.path):
+            for module, frame_index, timestamp, source, detections in message:
+                print(f"{timestamp:.3f} {source} {module} frame {frame_index}: {len(detections)} detections")
+            for alert in message.alerts():
+                print(f"{alert['time']:.3f} {alert['source']} {alert['module']} ALERT {alert['message']}")
+
+
+if __name__ == "__main__":
+    main()